@@ -0,0 +1,49 @@
+"""
+    Lex malformed input of growing size and check that the time needed
+    grows linearly with the size of the input
+"""
+from common import best_of, report
+
+from pyjsparser.lexer import Lexer
+
+# Allowed growth of time per byte between the smallest and largest input,
+# generous to absorb timer noise
+MAX_SLOWDOWN = 3.0
+
+CASES = {
+    'unterminated string': lambda n: 'x = "' + '\\x41' * n,
+    'unterminated comment': lambda n: 'x = 1; ' + '/* ' * n,
+    'unterminated class': lambda n: 'x = /[' + 'a/' * n,
+    'repeated class': lambda n: 'x = ' + '(/[' * (n // 3),
+    'brace division': lambda n: 'x = ' + '{}/[' * (n // 4),
+    'blank lines': lambda n: 'x\n' + ' \n' * n + '\n++x',
+}
+
+
+def lex(source):
+    lexer = Lexer()
+    lexer.input(source)
+    try:
+        for token in lexer:
+            pass
+    except TypeError:
+        pass
+
+
+def main():
+    lex('')  # Build the lexer tables outside of the timings
+    for name, generate in sorted(CASES.items()):
+        per_byte = []
+        for n in (10000, 40000, 160000):
+            source = generate(n)
+            seconds = best_of(lambda: lex(source))
+            report('%s (%d bytes)' % (name, len(source)), seconds)
+            per_byte.append(seconds / len(source))
+
+        slowdown = per_byte[-1] / max(per_byte[0], 1e-9)
+        assert slowdown < MAX_SLOWDOWN, \
+            "%s scales superlinearly (%.1fx per byte)" % (name, slowdown)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+    Latency of pyjsparser.aio under concurrent load, compared to parsing
+    the same requests one after another in the calling thread.
+
+    The longest stall shows how long the calling thread (e.g. an event
+    loop) can't do anything else.
+"""
+import cPickle
+import multiprocessing
+import time
+import zlib
+
+from common import sample_source
+
+from pyjsparser import aio
+from pyjsparser.parser import Parser
+
+
+def show(name, latencies, stall):
+    latencies = sorted(latencies)
+    print "%-24s p50 %6.0fms  p95 %6.0fms  longest stall %6.0fms" % (
+        name, latencies[len(latencies) // 2] * 1000,
+        latencies[int(len(latencies) * 0.95)] * 1000, stall * 1000)
+
+
+def main():
+    # Mostly small requests with a few large ones in between
+    sources = [sample_source(50 if n % 8 == 0 else 2) for n in range(32)]
+
+    parser = Parser()
+    latencies = []
+    stall = 0
+    start = time.time()
+    for source in sources:
+        before = time.time()
+        parser.parse(source)
+        stall = max(stall, time.time() - before)
+        latencies.append(time.time() - start)
+    show('calling thread', latencies, stall)
+
+    for processes in sorted(set([1, 2, multiprocessing.cpu_count()])):
+        pool = aio.ParsePool(processes)
+        # Wait for the workers to start
+        for request in [pool.submit('1;') for i in range(processes)]:
+            request.result()
+
+        latencies = []
+        requests = []
+        for source in sources:
+            request = pool.submit(source)
+            request.add_done_callback(lambda request, start=time.time():
+                                      latencies.append(time.time() - start))
+            requests.append(request)
+
+        # Poll like an event loop would
+        stall = 0
+        last = time.time()
+        while not all(request.done() for request in requests):
+            time.sleep(0.001)
+            stall = max(stall, time.time() - last)
+            last = time.time()
+        show('pool of %d processes' % processes, latencies, stall)
+        pool.close()
+
+    pickled = cPickle.dumps(parser.parse(sources[0]),
+                            cPickle.HIGHEST_PROTOCOL)
+    print "result of %d KB source: %d KB pickle, %d KB compressed" % (
+        len(sources[0]) // 1024, len(pickled) // 1024,
+        len(zlib.compress(pickled, 1)) // 1024)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+    Build dict nodes directly with a Builder compared to converting the
+    ast nodes after parsing
+"""
+from common import best_of, report, sample_source
+
+from pyjsparser import ast
+from pyjsparser.builder import Builder
+from pyjsparser.parser import Parser
+
+
+class DictBuilder(Builder):
+    def create(self, name, fields):
+        fields['type'] = name
+        return fields
+
+
+def convert(value):
+    """Convert ast nodes to dicts after parsing"""
+    if isinstance(value, list):
+        return [convert(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(convert(item) for item in value)
+    if isinstance(value, ast.Node):
+        result = {'type': value.__class__.__name__}
+        for key, item in vars(value).iteritems():
+            if not key.startswith('_'):
+                result[key] = convert(item)
+        return result
+    return value
+
+
+def main():
+    source = sample_source(200)
+    parser = Parser()
+    dict_parser = Parser(builder=DictBuilder())
+
+    report('parse (ast)', best_of(lambda: parser.parse(source)), len(source))
+    report('parse + convert to dicts',
+           best_of(lambda: convert(parser.parse(source))), len(source))
+    report('parse with DictBuilder',
+           best_of(lambda: dict_parser.parse(source)), len(source))
+
+
+if __name__ == '__main__':
+    main()
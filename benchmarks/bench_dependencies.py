@@ -0,0 +1,48 @@
+"""
+    Compare extract_dependencies_batch with parsing and walking the trees
+"""
+from common import best_of, report, sample_source
+
+from pyjsparser import ast, extract_dependencies_batch
+from pyjsparser.parser import Parser
+
+HEADER = """
+define('module', ['jquery', 'lib/util'], function($, util) {
+    var extra = require('lib/extra');
+});
+"""
+
+
+def walk_dependencies(parser, sources):
+    results = []
+    for source in sources:
+        dependencies = []
+        for node in ast.walk(parser.parse(source)):
+            if isinstance(node, ast.FuncCall) and \
+               getattr(node.node, 'name', None) in ('require', 'define'):
+                dependencies.append(node)
+        results.append(dependencies)
+    return results
+
+
+def main():
+    sources = [HEADER + sample_source(2) for i in xrange(100)]
+    size = sum(len(source) for source in sources)
+    parser = Parser()
+
+    report('parse and walk',
+           best_of(lambda: walk_dependencies(parser, sources)), size)
+    report('extract_dependencies_batch',
+           best_of(lambda: extract_dependencies_batch(sources)), size)
+
+    # Top-level calls with a require() nested in each, the calls have to be
+    # closed as they end for this to take linear time
+    nested = ["define(['m'], function() { return require('a'); });\n" * n
+              for n in (500, 1000, 2000)]
+    for source in nested:
+        report('nested require (%d bytes)' % len(source),
+               best_of(lambda: extract_dependencies_batch([source])))
+
+
+if __name__ == '__main__':
+    main()
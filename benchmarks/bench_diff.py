@@ -0,0 +1,29 @@
+"""
+    Measure ast.diff on growing files with a small change, the time per
+    byte should stay about the same
+"""
+from common import best_of, report, sample_source
+
+from pyjsparser import ast
+from pyjsparser.hashing import HashBuilder
+from pyjsparser.parser import Parser
+
+
+def main():
+    # The structural hashes are computed while parsing
+    parser = Parser(builder=HashBuilder())
+    for copies in (25, 50, 100, 200):
+        old = sample_source(copies)
+        middle = old.index('var module%d ' % (copies // 2))
+        new = old[:middle] + 'var added = 1;\n' + \
+            old[middle:].replace('i * 2', 'i * 3', 1)
+        old_tree, new_tree = parser.parse(old), parser.parse(new)
+
+        edits = ast.diff(old_tree, new_tree)
+        assert sorted(edit[0] for edit in edits) == ['insert', 'update']
+        report('diff %d KB' % (len(old) // 1024),
+               best_of(lambda: ast.diff(old_tree, new_tree)), len(old))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+    Peak memory of Parser.parse_events compared with building the full AST
+    for a large bundle.
+
+    Usage: python benchmarks/bench_events.py [size in MB, default 50]
+"""
+import sys
+
+from common import best_of, peak_memory, report, sample_source
+
+from pyjsparser.parser import Parser
+
+
+class Counter(object):
+    def __init__(self):
+        self.count = 0
+
+    def node(self, kind, fields):
+        self.count += 1
+
+
+def main():
+    size = float(sys.argv[1]) if len(sys.argv) > 1 else 50
+    snippet = sample_source(1)
+    source = sample_source(int(size * 1024 * 1024 / len(snippet)) or 1)
+    parser = Parser()
+    print "bundle size: %.1f MB" % (len(source) / 1024.0 / 1024)
+
+    print "peak memory parse:        %8d KB" % peak_memory(
+        lambda: parser.parse(source))
+    print "peak memory parse_events: %8d KB" % peak_memory(
+        lambda: parser.parse_events(source, Counter()))
+
+    report('parse', best_of(lambda: parser.parse(source), 1), len(source))
+    report('parse_events',
+           best_of(lambda: parser.parse_events(source, Counter()), 1),
+           len(source))
+
+
+if __name__ == '__main__':
+    main()
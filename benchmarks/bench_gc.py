@@ -0,0 +1,55 @@
+"""
+    Wall time and garbage collector pauses of parsing a large input with
+    and without Parser(pause_gc=True), and the time to free the tree.
+
+    The pauses are measured in a separate run, as gc.DEBUG_STATS slows
+    down the collections.
+"""
+import gc
+import re
+import sys
+import time
+from StringIO import StringIO
+
+from common import best_of, report, sample_source
+
+from pyjsparser.parser import Parser
+
+
+def pauses(parser, source):
+    """Return the duration of the collections during a parse"""
+    stderr = sys.stderr
+    sys.stderr = StringIO()
+    gc.set_debug(gc.DEBUG_STATS)
+    try:
+        parser.parse(source)
+    finally:
+        gc.set_debug(0)
+        output, sys.stderr = sys.stderr.getvalue(), stderr
+    return [float(pause) for pause in re.findall(r'([0-9.]+)s elapsed',
+                                                 output)]
+
+
+def teardown(parser, source):
+    program = parser.parse(source)
+    start = time.time()
+    del program
+    return time.time() - start
+
+
+def main():
+    source = sample_source(1000)
+    for name, parser in (('gc enabled', Parser()),
+                         ('pause_gc', Parser(pause_gc=True))):
+        gc.collect()
+        report(name, best_of(lambda: parser.parse(source), repeat=2),
+               len(source))
+        collections = pauses(parser, source)
+        print "%d collections, %.0fms in total, longest %.0fms" % (
+            len(collections), sum(collections) * 1000,
+            max(collections or [0]) * 1000)
+        print "freeing the tree: %.0fms" % (teardown(parser, source) * 1000)
+
+
+if __name__ == '__main__':
+    main()
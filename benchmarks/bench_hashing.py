@@ -0,0 +1,40 @@
+"""
+    Compare structural hashing while parsing with hashing afterwards, and
+    the memory saved by sharing leaves on generated code
+"""
+from common import best_of, peak_memory, report, sample_source
+
+from pyjsparser import ast
+from pyjsparser.hashing import HashBuilder, structural_hash
+from pyjsparser.parser import Parser
+
+
+def hash_after(parser, source):
+    program = parser.parse(source)
+    structural_hash(program)
+    return program
+
+
+def main():
+    source = sample_source(100)
+    generated = 'var data = [%s];' % ', '.join(
+        ['{id: %d, kind: "item", active: true, parent: null}' % (n % 10)
+         for n in xrange(10000)])
+    parser = Parser()
+    hash_parser = Parser(builder=HashBuilder())
+
+    # Measure memory first, before earlier parses have grown the heap
+    print "peak memory generated code:                %8d KB" % peak_memory(
+        lambda: Parser(builder=HashBuilder()).parse(generated))
+    print "peak memory generated code, shared leaves: %8d KB" % peak_memory(
+        lambda: Parser(builder=HashBuilder(True)).parse(generated))
+
+    report('parse', best_of(lambda: parser.parse(source)), len(source))
+    report('parse, hash afterwards',
+           best_of(lambda: hash_after(parser, source)), len(source))
+    report('parse with HashBuilder',
+           best_of(lambda: hash_parser.parse(source)), len(source))
+
+
+if __name__ == '__main__':
+    main()
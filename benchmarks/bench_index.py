@@ -0,0 +1,38 @@
+"""
+    Cost of Parser(index=True) and the time of finding all nodes of a few
+    classes with the index compared to walking the tree for each of them
+"""
+from common import best_of, report, sample_source
+
+from pyjsparser import ast
+from pyjsparser.parser import Parser
+
+CLASSES = [ast.FuncCall, ast.FuncDecl, ast.Assign, ast.New]
+
+
+def main():
+    source = sample_source(100)
+    plain = Parser()
+    indexed = Parser(index=True)
+    seconds = best_of(lambda: plain.parse(source))
+    report('parse', seconds, len(source))
+    with_index = best_of(lambda: indexed.parse(source))
+    report('parse with index', with_index, len(source))
+    print "overhead: %.1f%%" % ((with_index / seconds - 1) * 100)
+
+    program = indexed.parse(source)
+    def walk():
+        return [[node for node in ast.walk(program)
+                 if node.__class__ is cls] for cls in CLASSES]
+    def lookup():
+        return [program.index[cls] for cls in CLASSES]
+    assert [map(id, nodes) for nodes in walk()] == \
+           [map(id, nodes) for nodes in lookup()]
+    walking = best_of(walk)
+    report('%d queries walking the tree' % len(CLASSES), walking)
+    print "%d queries with the index: %.1fus" % (
+        len(CLASSES), best_of(lookup) * 10 ** 6)
+
+
+if __name__ == '__main__':
+    main()
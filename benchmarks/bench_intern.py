@@ -0,0 +1,95 @@
+"""
+    Measure interning on a minified bundle: memory of the trees and the
+    speed of comparing names
+"""
+import sys
+
+from common import best_of, peak_memory, report
+
+from pyjsparser import ast
+from pyjsparser.parser import Parser
+
+MINIFIED = (
+    "function(e,t,n){var r=e.length,i=t.prototype,o=n.callee;"
+    "for(var a=0;a<r;a++){if(e[a]===n)return a;i.push(e[a],'length')}"
+    "return o.apply(this,arguments)}"
+)
+
+
+def parse_all(parser, sources):
+    return [parser.parse(source) for source in sources]
+
+
+def identifier_names(programs):
+    return [node.name for program in programs for node in ast.walk(program)
+            if node.__class__ is ast.Identifier]
+
+
+def count_identical(names, name):
+    count = 0
+    for other in names:
+        if other is name:
+            count += 1
+    return count
+
+
+def count_equal(names, name):
+    count = 0
+    for other in names:
+        if other == name:
+            count += 1
+    return count
+
+
+def string_memory(programs):
+    """Return the size in KB of the distinct name and string objects"""
+    strings = {}
+    for program in programs:
+        for node in ast.walk(program):
+            if node.__class__ is ast.Identifier:
+                strings[id(node.name)] = sys.getsizeof(node.name)
+            elif node.__class__ is ast.String:
+                strings[id(node.data)] = sys.getsizeof(node.data)
+    return sum(strings.values()) / 1024
+
+
+def main():
+    sources = ['var m%d=[%s];' % (n, ','.join([MINIFIED] * 50))
+               for n in xrange(20)]
+    size = sum(len(source) for source in sources)
+    parser = Parser(intern_table={})
+    plain_parser = Parser()
+    plain_parser.lexer.intern = False
+
+    # Measure memory first, before earlier parses have grown the heap
+    print "peak memory interned:     %8d KB" % peak_memory(
+        lambda: parse_all(parser, sources))
+    print "peak memory not interned: %8d KB" % peak_memory(
+        lambda: parse_all(plain_parser, sources))
+
+    report('parse interned', best_of(lambda: parse_all(parser, sources)),
+           size)
+    report('parse not interned',
+           best_of(lambda: parse_all(plain_parser, sources)), size)
+
+    programs = parse_all(parser, sources)
+    plain_programs = parse_all(plain_parser, sources)
+    print "strings interned:     %8d KB" % string_memory(programs)
+    print "strings not interned: %8d KB" % string_memory(plain_programs)
+
+    # Downstream passes compare names, time only the comparisons
+    names = identifier_names(programs) * 50
+    plain_names = identifier_names(plain_programs) * 50
+    name = parser.lexer.intern_table['prototype']
+    assert count_identical(names, name) == count_equal(plain_names, name)
+    print "%d name comparisons" % len(names)
+    report('interned, by identity',
+           best_of(lambda: count_identical(names, name)))
+    report('interned, by equality',
+           best_of(lambda: count_equal(names, name)))
+    report('not interned, by equality',
+           best_of(lambda: count_equal(plain_names, name)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+"""
+    Compare a full parse with Parser(lazy_functions=True)
+"""
+from common import best_of, report, sample_source
+
+from pyjsparser import ast
+from pyjsparser.parser import Parser
+
+
+def force(program):
+    for node in ast.walk(program):
+        pass
+
+
+def main():
+    source = sample_source(200)
+    parser = Parser()
+    lazy_parser = Parser(lazy_functions=True)
+
+    report('parse', best_of(lambda: parser.parse(source)), len(source))
+    report('lazy parse', best_of(lambda: lazy_parser.parse(source)),
+           len(source))
+    report('lazy parse, all bodies used',
+           best_of(lambda: force(lazy_parser.parse(source))), len(source))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+"""
+    Cost of enforcing Limits compared to an unlimited parse
+"""
+import time
+
+from common import best_of, report, sample_source
+
+from pyjsparser.limits import Limits
+from pyjsparser.parser import Parser
+
+
+def main():
+    source = sample_source(100)
+    parser = Parser()
+    unlimited = best_of(lambda: parser.parse(source))
+    report('no limits', unlimited, len(source))
+
+    limits = Limits(max_tokens=10 ** 6, max_nodes=10 ** 6, max_depth=10 ** 4,
+                    deadline=time.time() + 3600)
+    seconds = best_of(lambda: parser.parse(source, limits=limits))
+    report('all limits', seconds, len(source))
+    print "overhead: %.1f%%" % ((seconds / unlimited - 1) * 100)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+    Throughput of 40 lint rules run by lint.Linter in one walk, compared to
+    running each rule as its own pass over the tree
+"""
+from common import best_of, report, sample_source
+
+from pyjsparser import ast, lint
+from pyjsparser.parser import Parser
+
+
+class NoCall(lint.Rule):
+    classes = (ast.FuncCall,)
+
+    def __init__(self, function):
+        lint.Rule.__init__(self)
+        self.name = 'no-call-%s' % function
+        self.function = function
+
+    def check(self, node, context):
+        if getattr(node.node, 'name', None) == self.function:
+            self.report(context, node, "%s() is not allowed" % self.function)
+
+
+class NoMethod(NoCall):
+    def check(self, node, context):
+        if isinstance(node.node, ast.DotAccessor) and \
+           node.node.element.name == self.function:
+            self.report(context, node, ".%s() is not allowed" % self.function)
+
+
+class Forbidden(lint.Rule):
+    def __init__(self, cls):
+        lint.Rule.__init__(self)
+        self.name = 'no-%s' % cls.__name__
+        self.classes = (cls,)
+
+    def check(self, node, context):
+        self.report(context, node, "%s is not allowed" % self.name)
+
+
+class LooseEquality(lint.Rule):
+    classes = (ast.BinOp,)
+
+    def check(self, node, context):
+        if node.operator in ('==', '!='):
+            self.report(context, node, "use %s=" % node.operator)
+
+
+class MagicNumber(lint.Rule):
+    classes = (ast.Number,)
+
+    def check(self, node, context):
+        if node.value not in ('0', '1', '2'):
+            self.report(context, node, "magic number %s" % node.value)
+
+
+def make_rules():
+    rules = [LooseEquality(), MagicNumber()]
+    rules.extend([NoCall(name) for name in (
+        'eval', 'alert', 'confirm', 'prompt', 'setTimeout', 'setInterval',
+        'escape', 'unescape', 'lookup', 'fallback', 'require', 'define')])
+    rules.extend([NoMethod(name) for name in (
+        'call', 'apply', 'bind', 'replace', 'write', 'writeln', 'exec',
+        'match', 'split', 'join', 'push', 'pop')])
+    rules.extend([Forbidden(cls) for cls in (
+        ast.With, ast.Debugger, ast.New, ast.Throw, ast.Switch, ast.ForIn,
+        ast.DoWhile, ast.LabelledStatement, ast.Continue, ast.Break,
+        ast.RegEx, ast.Object, ast.UnaryOp, ast.Try)])
+    return rules
+
+
+def sequential(rules, program):
+    context = lint.Context(program)
+    for rule in rules:
+        classes = rule.classes
+        for node in ast.walk(program):
+            if isinstance(node, classes):
+                rule.check(node, context)
+    return context.diagnostics
+
+
+def main():
+    source = sample_source(50)
+    program = Parser().parse(source)
+    rules = make_rules()
+    linter = lint.Linter(rules)
+    assert sorted([(d.rule, id(d.node)) for d in linter.lint(program)]) == \
+           sorted([(d.rule, id(d.node)) for d in sequential(rules, program)])
+    print "%d rules, %d findings" % (len(rules), len(linter.lint(program)))
+
+    report('one pass per rule', best_of(lambda: sequential(rules, program)),
+           len(source))
+    report('single walk', best_of(lambda: linter.lint(program)), len(source))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""
+    Compare the bulk conversion of numbers with converting them one by one
+"""
+import random
+
+from common import best_of, report
+
+from pyjsparser import ast
+from pyjsparser.parser import Parser
+
+
+def main():
+    random.seed(0)
+    table = [str(random.randint(0, 1 << 30)) for n in xrange(20000)]
+    program = Parser().parse('var table = [%s];' % ', '.join(table))
+    numbers = [node for node in ast.walk(program)
+               if isinstance(node, ast.Number)]
+
+    def one_by_one():
+        for number in numbers:
+            number._numeric = None
+        return [node.numeric for node in ast.walk(program)
+                if isinstance(node, ast.Number)]
+
+    def bulk():
+        for number in numbers:
+            number._numeric = None
+        return ast.decode_numbers(program)
+
+    assert one_by_one() == bulk()
+    report('%d integers one by one' % len(numbers), best_of(one_by_one))
+    report('%d integers with decode_numbers' % len(numbers), best_of(bulk))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+"""
+    Compare pyjsparser.outline with a full parse
+"""
+from common import best_of, report, sample_source
+
+from pyjsparser import outline
+from pyjsparser.parser import Parser
+
+
+def main():
+    source = sample_source(200)
+    parser = Parser()
+
+    parse = best_of(lambda: parser.parse(source))
+    report('parse', parse, len(source))
+    seconds = best_of(lambda: outline(source))
+    report('outline', seconds, len(source))
+    print "speedup: %.2fx" % (parse / seconds)
+
+
+if __name__ == '__main__':
+    main()
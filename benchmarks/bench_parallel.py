@@ -0,0 +1,26 @@
+"""
+    Compare pyjsparser.parallel.parse for an increasing number of processes
+"""
+import multiprocessing
+
+from common import best_of, report, sample_source
+
+from pyjsparser import parallel
+from pyjsparser.parser import Parser
+
+
+def main():
+    source = sample_source(500)
+    parser = Parser()
+    sequential = best_of(lambda: parser.parse(source), repeat=1)
+    report('sequential', sequential, len(source))
+
+    for processes in range(1, multiprocessing.cpu_count() + 1):
+        seconds = best_of(lambda: parallel.parse(source, processes),
+                          repeat=1)
+        report('%d processes' % processes, seconds, len(source))
+        print "speedup: %.2fx" % (sequential / seconds)
+
+
+if __name__ == '__main__':
+    main()
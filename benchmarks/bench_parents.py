@@ -0,0 +1,49 @@
+"""
+    Finding the enclosing function of every call with an ast.ParentMap,
+    compared to searching for it from the root for each call, and the
+    memory of the map.
+"""
+from common import best_of, peak_memory, report, sample_source
+
+from pyjsparser import ast
+from pyjsparser.parser import Parser
+
+
+def search(root, target):
+    # Depth-first search keeping the path of functions to the target
+    stack = [(root, None)]
+    while stack:
+        node, function = stack.pop()
+        if node is target:
+            return function
+        if isinstance(node, ast.FuncDecl):
+            function = node
+        stack.extend([(child, function)
+                      for child in ast.iter_child_nodes(node)])
+
+
+def main():
+    program = Parser().parse(sample_source(20))
+    calls = [node for node in ast.walk(program)
+             if isinstance(node, ast.FuncCall)]
+    print "%d nodes, %d calls" % (len(list(ast.walk(program))), len(calls))
+
+    def with_map():
+        parents = ast.ParentMap(program)
+        return [parents.enclosing(call, ast.FuncDecl) for call in calls]
+    def without_map():
+        return [search(program, call) for call in calls]
+    assert map(id, with_map()) == map(id, without_map())
+
+    report('search from the root', best_of(without_map))
+    report('build map', best_of(lambda: ast.ParentMap(program)))
+    report('build map and look up', best_of(with_map))
+
+    program = Parser().parse(sample_source(200))
+    print "memory of the map for %d nodes: %d KB" % (
+        len(list(ast.walk(program))),
+        peak_memory(lambda: ast.ParentMap(program)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+    Selector queries compared to hand-written recursive matchers, on a
+    tree with and without the node index of Parser(index=True)
+"""
+from common import best_of, report, sample_source
+
+from pyjsparser import ast, query
+from pyjsparser.parser import Parser
+
+
+def method_calls(node, name, found):
+    if isinstance(node, ast.FuncCall) and \
+       isinstance(node.node, ast.DotAccessor) and \
+       getattr(node.node.element, 'name', None) == name:
+        found.append(node)
+    for child in ast.iter_child_nodes(node):
+        method_calls(child, name, found)
+    return found
+
+
+def throws_in_catch(node, found, inside=False):
+    if inside and isinstance(node, ast.Throw):
+        found.append(node)
+    inside = inside or isinstance(node, ast.Catch)
+    for child in ast.iter_child_nodes(node):
+        throws_in_catch(child, found, inside)
+    return found
+
+
+QUERIES = [
+    ('FuncCall[node.element.name=replace]',
+     lambda program: method_calls(program, 'replace', [])),
+    ('Catch Throw',
+     lambda program: throws_in_catch(program, [])),
+]
+
+
+def main():
+    source = sample_source(50)
+    plain = Parser().parse(source)
+    indexed = Parser(index=True).parse(source)
+    for selector, naive in QUERIES:
+        compiled = query.compile(selector)
+        expected = map(id, naive(plain))
+        assert map(id, compiled.select(plain)) == expected
+        assert len(compiled.select(indexed)) == len(expected)
+        print "%s: %d nodes" % (selector, len(expected))
+        report('  recursive matcher', best_of(lambda: naive(plain)))
+        report('  selector', best_of(lambda: compiled.select(plain)))
+        report('  selector with index, 100 times', best_of(
+            lambda: [compiled.select(indexed) for i in xrange(100)]))
+    report('compile %d selectors' % len(QUERIES), best_of(
+        lambda: [query.compile(selector) for selector, naive in QUERIES]))
+
+    # Selectors which fail on deeply nested code, each node costs
+    # O(compounds) instead of trying every ancestor for every compound
+    nested = Parser().parse("function f() {\n" * 40 + "x;\n" + "}\n" * 40)
+    for count in xrange(1, 5):
+        selector = 'With ' + 'FuncDecl ' * count + 'Identifier'
+        compiled = query.compile(selector)
+        report('With, %d x FuncDecl, Identifier' % count,
+               best_of(lambda: compiled.select(nested)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+    Parse regex heavy code, modelled after form validation libraries
+"""
+from common import best_of, report
+
+from pyjsparser.lexer import Lexer
+from pyjsparser.parser import Parser
+
+VALIDATOR = r"""
+validators.rule%(n)d = function(value, options) {
+    var email = /^[a-zA-Z0-9._%%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$/i;
+    var path = /^\/[a-z\/]+[^\/]$/;
+    var ratio = (value.length / options.max) / 2;
+    if (!email.test(value) && !/[\d\/]+/.test(value)) {
+        return value.replace(/\s+/g, ' ').split(/[,;\/]/);
+    }
+    return ratio /= 2;
+};
+"""
+
+
+def main():
+    source = ''.join(VALIDATOR % {'n': n} for n in range(500))
+    parser = Parser()
+
+    def lex():
+        lexer = Lexer()
+        lexer.input(source)
+        for token in lexer:
+            pass
+
+    report('lex regex heavy source', best_of(lex), len(source))
+    report('parse regex heavy source',
+           best_of(lambda: parser.parse(source)), len(source))
+
+
+if __name__ == '__main__':
+    main()
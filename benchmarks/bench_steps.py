@@ -0,0 +1,39 @@
+"""
+    Overhead of Parser.parse_steps compared to an uninterrupted parse, and
+    the longest time between two steps
+"""
+import time
+
+from common import best_of, report, sample_source
+
+from pyjsparser.parser import Parser
+
+
+def run_steps(parser, source, max_tokens, slices):
+    del slices[:]
+    last = time.time()
+    for program in parser.parse_steps(source, max_tokens):
+        now = time.time()
+        slices.append(now - last)
+        last = now
+
+
+def main():
+    source = sample_source(100)
+    parser = Parser()
+    uninterrupted = best_of(lambda: parser.parse(source))
+    report('parse', uninterrupted, len(source))
+
+    for max_tokens in (100, 1000, 10000):
+        slices = []
+        seconds = best_of(lambda: run_steps(parser, source, max_tokens,
+                                            slices))
+        report('parse_steps(max_tokens=%d)' % max_tokens, seconds,
+               len(source))
+        print "overhead: %.1f%%, %d slices, longest %.1fms" % (
+            (seconds / uninterrupted - 1) * 100, len(slices),
+            max(slices) * 1000)
+
+
+if __name__ == '__main__':
+    main()
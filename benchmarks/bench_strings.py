@@ -0,0 +1,41 @@
+"""
+    Measure decoding the values of all string literals in a tree
+"""
+from common import best_of, report
+
+from pyjsparser import ast
+from pyjsparser.parser import Parser
+
+
+def main():
+    entries = []
+    for n in xrange(5000):
+        entries.append('"key%d": "Plain message %d"' % (n, n))
+        entries.append('"esc%d": "Caf\\u00e9 \\"%d\\"\\n"' % (n, n))
+    source = 'var messages = {%s};' % ',\n'.join(entries)
+    program = Parser().parse(source)
+    strings = [node for node in ast.walk(program)
+               if isinstance(node, ast.String)]
+
+    def uncached():
+        for node in strings:
+            node._value = None
+        return ast.decode_strings(program)
+
+    def plain():
+        return [ast.decode_string(node.data) for node in strings
+                if '\\' not in node.data]
+
+    def escaped():
+        return [ast.decode_string(node.data) for node in strings
+                if '\\' in node.data]
+
+    report('decode_strings', best_of(uncached))
+    report('decode_strings, cached', best_of(
+        lambda: ast.decode_strings(program)))
+    report('%d plain literals' % len(plain()), best_of(plain))
+    report('%d literals with escapes' % len(escaped()), best_of(escaped))
+
+
+if __name__ == '__main__':
+    main()
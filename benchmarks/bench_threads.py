@@ -0,0 +1,43 @@
+"""
+    Throughput of one Parser per thread for an increasing number of
+    threads, and the cost of creating a Parser
+"""
+import threading
+import time
+
+from common import best_of, report, sample_source
+
+from pyjsparser.parser import Parser
+
+
+def parse_in_threads(source, count, repeat):
+    parsers = [Parser() for i in range(count)]
+
+    def work(parser):
+        for i in range(repeat):
+            parser.parse(source)
+
+    threads = [threading.Thread(target=work, args=(parser,))
+               for parser in parsers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def main():
+    Parser()
+    seconds = best_of(lambda: [Parser() for i in range(100)])
+    print "Parser(): %.2fms" % (seconds * 10)
+
+    source = sample_source(10)
+    single = best_of(lambda: parse_in_threads(source, 1, 8))
+    report('1 thread', single, len(source) * 8)
+    for count in (2, 4, 8):
+        seconds = best_of(lambda: parse_in_threads(source, count, 8))
+        report('%d threads' % count, seconds, len(source) * 8 * count)
+        print "scaling: %.2fx" % (single * count / seconds)
+
+
+if __name__ == '__main__':
+    main()
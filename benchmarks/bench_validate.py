@@ -0,0 +1,25 @@
+"""
+    Compare Parser.validate with a full parse
+"""
+from common import best_of, peak_memory, report, sample_source
+
+from pyjsparser.parser import Parser
+
+
+def main():
+    source = sample_source(200)
+    parser = Parser()
+
+    # Measure memory first, before earlier parses have grown the heap
+    print "peak memory parse:    %8d KB" % peak_memory(
+        lambda: parser.parse(source))
+    print "peak memory validate: %8d KB" % peak_memory(
+        lambda: parser.validate(source))
+
+    assert parser.validate(source) == []
+    report('parse', best_of(lambda: parser.parse(source)), len(source))
+    report('validate', best_of(lambda: parser.validate(source)), len(source))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+    Helpers shared by the benchmark scripts
+
+    Run a benchmark from the repository root, e.g.::
+
+        python benchmarks/bench_regex.py
+
+"""
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def best_of(func, repeat=3):
+    """Return the fastest wall clock time of `repeat` calls to func"""
+    timings = []
+    for i in range(repeat):
+        start = time.time()
+        func()
+        timings.append(time.time() - start)
+    return min(timings)
+
+
+def peak_memory(func):
+    """Run func in a forked child process and return the growth of the peak
+    resident set size in KB (as reported by getrusage on Linux).
+
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        func()
+        after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        os.write(write_fd, str(after - before))
+        os._exit(0)
+
+    os.close(write_fd)
+    result = os.read(read_fd, 64)
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+    return int(result)
+
+
+def sample_source(copies):
+    """Return a program built from `copies` variations of a snippet which
+    uses most of the grammar.
+
+    """
+    return ''.join(SAMPLE % {'n': n} for n in xrange(copies))
+
+
+def report(name, seconds, size=None):
+    if size:
+        print "%-40s %8.3fs %10.1f KB/s" % (
+            name, seconds, size / 1024.0 / seconds)
+    else:
+        print "%-40s %8.3fs" % (name, seconds)
+
+
+SAMPLE = r"""
+/**
+ * Module %(n)d
+ */
+var module%(n)d = (function(global) {
+    var cache = {}, count = 0, name = "module%(n)d";
+
+    function lookup(key, fallback) {
+        if (key in cache && cache[key] !== null) {
+            return cache[key];
+        } else if (typeof fallback == 'function') {
+            return fallback.call(this, key);
+        }
+        return fallback || false;
+    }
+
+    for (var i = 0; i < 10; i++) {
+        count += i * 2 / (i + 1) %% 3;
+    }
+    while (count > 100) {
+        count = count >> 1;
+    }
+
+    switch (name.length) {
+        case 1:
+            break;
+        default:
+            count++;
+    }
+
+    try {
+        lookup(name.replace(/[^a-z0-9]+/gi, '-'), [1, 2, 3]);
+    } catch (e) {
+        throw new Error("lookup failed: " + e.message);
+    }
+
+    return {
+        lookup: lookup,
+        size: function() { return count; },
+        name: name
+    };
+}(this));
+"""
@@ -1,4 +1,9 @@
 from pyjsparser import ast, parser
+from pyjsparser.lexer import LexerError
+from pyjsparser.limits import Limits, ParseLimitExceeded
+from pyjsparser.outliner import outline
+from pyjsparser.dependencies import extract_dependencies, \
+     extract_dependencies_batch
 
 def parse(file):
     p = parser.Parser()
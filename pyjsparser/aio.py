@@ -0,0 +1,365 @@
+"""
+    jsparser.aio
+    ~~~~~~~~~~~~
+
+    Non-blocking parsing in a managed pool of worker processes
+
+    :copyright: Copyright 2009 Michael van Tellingen
+    :license: BSD
+
+"""
+import collections
+import cPickle
+import multiprocessing
+import os
+import select
+import threading
+import time
+import zlib
+
+from pyjsparser.lexer import LexerError
+from pyjsparser.parser import Parser
+
+
+class ParseTimeout(Exception):
+    """The parse didn't finish within its timeout"""
+
+
+class ParseCancelled(Exception):
+    """The parse was cancelled"""
+
+
+class PoolFull(Exception):
+    """The pool already has `max_pending` unfinished parses"""
+
+
+class WorkerError(Exception):
+    """The worker failed on the source with an unexpected error, or its
+    process died. The worker is replaced.
+
+    """
+
+
+class ParseRequest(object):
+    """Future for the result of `ParsePool.submit()`.
+
+    Callbacks added with `add_done_callback()` are called with the request
+    from the thread of the pool once it is done. Event loops can use them
+    to resume the waiting task, e.g. with a thread-safe ``add_callback``.
+
+    """
+
+    def __init__(self, pool, source, timeout):
+        self.pool = pool
+        self.source = source
+        self.timeout = timeout
+        self.deadline = timeout and time.time() + timeout or None
+        self.cancelled = False
+        self._result = None
+        self._error = None
+        self._callbacks = []
+        self._done = threading.Event()
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """Wait for and return the ast.Program, or raise the error of the
+        parse. Raises ParseTimeout if it isn't done within `timeout`.
+
+        """
+        if not self._done.wait(timeout):
+            raise ParseTimeout("Parse not done within %s seconds" % timeout)
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def add_done_callback(self, callback):
+        with self.pool._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def cancel(self):
+        """Cancel the parse, stopping its worker if it already started.
+        Returns False if the request was already done.
+
+        """
+        return self.pool._cancel(self)
+
+    def _finish(self, result=None, error=None):
+        # Under the lock add_done_callback() holds, so a callback is either
+        # added before and called here, or called by add_done_callback()
+        with self.pool._lock:
+            self._result = result
+            self._error = error
+            self.source = None
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+
+class ParsePool(object):
+    """Pool of `processes` worker processes which each hold a ready Parser.
+
+    `submit()` returns a ParseRequest immediately; a thread of the pool
+    hands the sources to idle workers and collects the results, which are
+    sent back as a compressed pickle. A parse which exceeds its timeout or
+    is cancelled stops its worker, which is replaced by a new one, as is a
+    worker whose process died. The timeout counts from `submit()`, so it
+    includes the time the parse waits for an idle worker.
+
+    At most `max_pending` parses can be unfinished at once, `submit()`
+    raises PoolFull beyond that.
+
+    """
+
+    def __init__(self, processes=None, max_pending=None, tracking=False):
+        self.processes = processes or multiprocessing.cpu_count()
+        self.max_pending = max_pending
+        self.tracking = tracking
+        self._lock = threading.Lock()
+        self._queue = collections.deque()
+        self._pending = 0
+        self._closed = False
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        self._workers = [_Worker(tracking) for i in xrange(self.processes)]
+        self._thread = threading.Thread(target=self._dispatch)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, source, timeout=None):
+        """Parse `source` in a worker, stopping it after `timeout` seconds"""
+        with self._lock:
+            if self._closed:
+                raise ValueError("The pool is closed")
+            if self.max_pending and self._pending >= self.max_pending:
+                raise PoolFull("%d parses are pending" % self._pending)
+            request = ParseRequest(self, source, timeout)
+            self._queue.append(request)
+            self._pending += 1
+        self._wakeup()
+        return request
+
+    def close(self):
+        """Stop the workers, unfinished parses are cancelled"""
+        with self._lock:
+            self._closed = True
+        self._wakeup()
+        self._thread.join()
+
+    def _cancel(self, request):
+        with self._lock:
+            if request.done() or request.cancelled:
+                return False
+            request.cancelled = True
+            if request in self._queue:
+                self._queue.remove(request)
+                self._pending -= 1
+                finished = True
+            else:
+                # Running, the dispatcher stops the worker
+                finished = False
+        if finished:
+            request._finish(error=ParseCancelled("Parse cancelled"))
+        else:
+            self._wakeup()
+        return True
+
+    def _wakeup(self):
+        os.write(self._wakeup_write, 'x')
+
+    def _dispatch(self):
+        # Only this thread uses the workers, the lock guards the queue and
+        # the counters. The results are received and the workers started
+        # without it, so submit() and cancel() don't wait for them.
+        while True:
+            with self._lock:
+                if self._closed:
+                    break
+            finished = self._start_requests()
+
+            with self._lock:
+                deadlines = [request.deadline for request in self._queue
+                             if request.deadline]
+            deadlines.extend([worker.request.deadline
+                              for worker in self._workers
+                              if worker.request and worker.request.deadline])
+            wait = None
+            if deadlines:
+                wait = max(min(deadlines) - time.time(), 0)
+
+            connections = [worker.connection for worker in self._workers
+                           if worker.request]
+            readable = select.select(
+                connections + [self._wakeup_read], [], [], wait)[0]
+            if self._wakeup_read in readable:
+                os.read(self._wakeup_read, 512)
+
+            received = {}
+            for index, worker in enumerate(self._workers):
+                if worker.request and worker.connection in readable:
+                    received[index] = worker.receive()
+
+            stopped = []
+            with self._lock:
+                now = time.time()
+                for index, worker in enumerate(self._workers):
+                    request = worker.request
+                    if request is None:
+                        continue
+                    if index in received:
+                        finished.append((request, received[index]))
+                    elif request.cancelled:
+                        finished.append((request, (None, ParseCancelled(
+                            "Parse cancelled"))))
+                    elif request.deadline and request.deadline <= now:
+                        finished.append((request, (None, _timeout(request))))
+                    else:
+                        continue
+                    worker.request = None
+                    if index not in received or worker.dead:
+                        stopped.append(index)
+                    self._pending -= 1
+                for request in list(self._queue):
+                    if request.deadline and request.deadline <= now:
+                        self._queue.remove(request)
+                        self._pending -= 1
+                        finished.append((request, (None, _timeout(request))))
+
+            for index in stopped:
+                self._workers[index].stop()
+                self._workers[index] = _Worker(self.tracking)
+            for request, (result, error) in finished:
+                request._finish(result, error)
+
+        # Closed
+        with self._lock:
+            requests = list(self._queue)
+            self._queue.clear()
+        requests.extend([worker.request for worker in self._workers
+                         if worker.request])
+        for worker in self._workers:
+            worker.stop()
+        for request in requests:
+            request._finish(error=ParseCancelled("The pool was closed"))
+        os.close(self._wakeup_read)
+        os.close(self._wakeup_write)
+
+    def _start_requests(self):
+        """Hand queued requests to the idle workers. Returns the failed
+        requests with their (result, error).
+
+        """
+        failed = []
+        for index, worker in enumerate(self._workers):
+            if worker.request is not None:
+                continue
+            with self._lock:
+                if not self._queue:
+                    break
+                request = self._queue.popleft()
+            if not worker.send(request.source):
+                # The process died while it was idle, retry with a new one
+                worker.stop()
+                worker = self._workers[index] = _Worker(self.tracking)
+                if not worker.send(request.source):
+                    with self._lock:
+                        self._pending -= 1
+                    failed.append((request, (None, WorkerError(
+                        "The worker process exited"))))
+                    continue
+            worker.request = request
+        return failed
+
+
+def _timeout(request):
+    return ParseTimeout("Parse not done within %s seconds" % request.timeout)
+
+
+class _Worker(object):
+    """A worker process and the parent's end of its pipe"""
+
+    def __init__(self, tracking):
+        self.request = None
+        self.dead = False
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_work,
+                                               args=(child, tracking))
+        self.process.daemon = True
+        self.process.start()
+        child.close()
+
+    def send(self, source):
+        """Send the source to the process, return False if it died"""
+        try:
+            self.connection.send(source)
+        except (EOFError, IOError):
+            self.dead = True
+            return False
+        return True
+
+    def receive(self):
+        """Return the (result, error) of the finished parse"""
+        try:
+            kind, data = self.connection.recv()
+        except (EOFError, IOError):
+            self.dead = True
+            return None, WorkerError("The worker process exited")
+        if kind == 'result':
+            try:
+                return cPickle.loads(zlib.decompress(data)), None
+            except Exception, e:
+                return None, WorkerError(repr(e))
+        if kind == 'syntax':
+            message, lineno, lexpos = data
+            error = SyntaxError(message)
+            error.lineno = lineno
+            error.lexpos = lexpos
+            return None, error
+        if kind == 'lexer':
+            return None, LexerError(*data)
+        return None, WorkerError(data)
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+
+def _work(connection, tracking):
+    # Create the parser before the first source arrives
+    parser = Parser(tracking=tracking)
+    while True:
+        try:
+            source = connection.recv()
+        except EOFError:
+            break
+        try:
+            program = parser.parse(source)
+            # Deeply nested trees may exceed the recursion limit here
+            result = ('result', zlib.compress(
+                cPickle.dumps(program, cPickle.HIGHEST_PROTOCOL), 1))
+        except SyntaxError, e:
+            # The position attributes don't survive pickling
+            result = ('syntax', (e.msg, e.lineno, e.lexpos))
+        except LexerError, e:
+            result = ('lexer', (e.msg, e.lineno, e.lexpos))
+        except Exception, e:
+            result = ('error', repr(e))
+        connection.send(result)
+
+
+_pool = None
+
+def parse(source, timeout=None):
+    """Submit `source` to a shared ParsePool with a worker per CPU and
+    return the ParseRequest.
+
+    """
+    global _pool
+    if _pool is None:
+        _pool = ParsePool()
+    return _pool.submit(source, timeout)
@@ -1,3 +1,7 @@
+from array import array
+import bisect
+import inspect
+import re
 
 
 class NodeVisitor(object):
@@ -33,6 +37,10 @@ class NodeVisitor(object):
 
 
 class Node(object):
+    # Source span, only set when parsing with tracking enabled
+    lexpos = None
+    endlexpos = None
+
     def __init__(self):
         self._fields = []
         self._repr_args = []
@@ -47,6 +55,9 @@ class Node(object):
             yield field
 
 class Program(Node):
+    # NodeIndex of the nodes, only set when parsing with index enabled
+    index = None
+
     def __init__(self, statements):
         Node.__init__(self)
         self.statements = statements or []
@@ -80,18 +91,41 @@ class Boolean(Node):
 
 
 class Number(Node):
+    # Converted value, cached by the numeric property
+    _numeric = None
+
     def __init__(self, value):
         Node.__init__(self)
         self.value = value
         self._repr_args = ['value']
 
+    @property
+    def numeric(self):
+        """The value of the literal as int or float, see decode_number()"""
+        if self._numeric is None:
+            self._numeric = decode_number(self.value)
+        return self._numeric
+
 
 class String(Node):
+    # Decoded value, cached by the value property
+    _value = None
+
     def __init__(self, data):
         Node.__init__(self)
         self.data = data
         self._repr_args = ['data']
 
+    @property
+    def value(self):
+        """The value of the literal without quotes and with the escape
+        sequences decoded, see decode_string().
+
+        """
+        if self._value is None:
+            self._value = decode_string(self.data)
+        return self._value
+
 
 class Array(Node):
     def __init__(self, items):
@@ -289,6 +323,39 @@ class FuncDecl(Node):
         self._repr_args = ['name', 'parameters']
 
 
+class LazyFuncDecl(FuncDecl):
+    """FuncDecl created by ``Parser(lazy_functions=True)``. Only the span of
+    the body in `source` is stored; `parser` parses it on the first access
+    to `statements`.
+
+    """
+    def __init__(self, node, parameters, source, start, end, parser):
+        # Node.__init__ is skipped, _fields is a property here
+        self.node = node
+        self.parameters = parameters
+        self.source = source
+        self.start = start
+        self.end = end
+        self.parser = parser
+        self._statements = None
+        self._repr_args = ['name', 'parameters']
+
+    @property
+    def parsed(self):
+        return self._statements is not None
+
+    @property
+    def statements(self):
+        if self._statements is None:
+            self._statements = self.parser.parse_body(
+                self.source, self.start, self.end)
+        return self._statements
+
+    @property
+    def _fields(self):
+        return [self.statements]
+
+
 class FuncCall(Node):
     def __init__(self, node, arguments):
         Node.__init__(self)
@@ -360,3 +427,479 @@ class Finally(Node):
 class Debugger(Node):
     def __init__(self):
         Node.__init__(self)
+
+
+
+class NodeIndex(dict):
+    """Maps each node class to the list of its nodes in source order, see
+    ``Parser(index=True)``. Classes without nodes give an empty list.
+    Subclasses aren't included, e.g. ast.LazyFuncDecl nodes are only listed
+    under their own class.
+
+    """
+
+    def __missing__(self, cls):
+        return []
+
+
+# Names of the attributes holding the values of each node class, in the
+# order of the constructor arguments
+_value_names = {}
+
+def _get_value_names(node):
+    names = _value_names.get(node.__class__)
+    if names is None:
+        names = []
+        for name in inspect.getargspec(node.__class__.__init__)[0][1:]:
+            # VariableDeclaration, Assign and If store 'expression' as 'expr'
+            if not hasattr(node, name) and name == 'expression':
+                name = 'expr'
+            names.append(name)
+        _value_names[node.__class__] = names
+    return names
+
+_value_names[LazyFuncDecl] = ['node', 'parameters', 'statements']
+
+def _iter_nodes(value):
+    if isinstance(value, Node):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            for node in _iter_nodes(item):
+                yield node
+
+def iter_child_nodes(node):
+    """Yield the direct child nodes of `node`, in source order. Lists of
+    nodes (e.g. statements) are flattened.
+
+    """
+    for name in _get_value_names(node):
+        for child in _iter_nodes(getattr(node, name)):
+            yield child
+
+def walk(node):
+    """Yield `node` and all its descendants, parents before their
+    children. The order of siblings is kept.
+
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        children = list(iter_child_nodes(node))
+        children.reverse()
+        stack.extend(children)
+
+def walk_paths(node, path):
+    """Yield `node` and all its descendants in walk() order, each with its
+    depth below `node`. The list `path` is updated in place to hold the
+    ancestors of the yielded node from `node` down, followed by the node.
+
+    """
+    del path[:]
+    stack = [(node, 0)]
+    while stack:
+        node, depth = stack.pop()
+        del path[depth:]
+        path.append(node)
+        yield node, depth
+        children = list(iter_child_nodes(node))
+        children.reverse()
+        depth += 1
+        stack.extend([(child, depth) for child in children])
+
+
+class ParentMap(object):
+    """The parents of the nodes in the tree below `root`, collected in one
+    pass over the tree. The nodes are numbered in walk() order and the
+    parent of each is stored as a number in an array, so the nodes don't
+    get parent attributes and the tree stays free of reference cycles.
+
+    Like walk(), this parses the bodies of lazy functions.
+
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.nodes = nodes = []
+        self.parents = parents = array('i')
+        self._numbers = numbers = {}
+        stack = [(root, -1)]
+        while stack:
+            node, parent = stack.pop()
+            number = len(nodes)
+            numbers[id(node)] = number
+            nodes.append(node)
+            parents.append(parent)
+            children = list(iter_child_nodes(node))
+            children.reverse()
+            stack.extend([(child, number) for child in children])
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node):
+        number = self._numbers.get(id(node))
+        return number is not None and self.nodes[number] is node
+
+    def _number(self, node):
+        number = self._numbers.get(id(node))
+        if number is None or self.nodes[number] is not node:
+            raise KeyError(node)
+        return number
+
+    def parent(self, node):
+        """Return the parent of `node`, None for the root"""
+        number = self.parents[self._number(node)]
+        if number < 0:
+            return None
+        return self.nodes[number]
+
+    def ancestors(self, node):
+        """Yield the ancestors of `node`, from its parent up to the root"""
+        nodes = self.nodes
+        parents = self.parents
+        number = parents[self._number(node)]
+        while number >= 0:
+            yield nodes[number]
+            number = parents[number]
+
+    def enclosing(self, node, cls):
+        """Return the nearest ancestor of `node` which is an instance of
+        `cls` (e.g. ast.FuncDecl), or None.
+
+        """
+        for ancestor in self.ancestors(node):
+            if isinstance(ancestor, cls):
+                return ancestor
+        return None
+
+
+def diff(old, new):
+    """Return the edit script which turns the tree `old` into `new`, as a
+    list of (action, old node, new node) tuples:
+
+    - ('delete', node, None) and ('insert', None, node) for subtrees which
+      only exist in one of the trees
+    - ('update', node, node) for nodes whose own values (names, literals,
+      operators) changed; their children are compared separately
+    - ('move', node, node) for identical subtrees at another position
+
+    Subtrees are looked up by their structural hash (see
+    pyjsparser.hashing), and only mismatching regions are recursed into.
+    Equal hashes are confirmed with hashing.same_structure(), so a hash
+    collision can't hide an edit. This walks the matched subtrees, so the
+    time is linear in the size of the trees.
+
+    """
+    from pyjsparser.hashing import structural_hash, same_structure
+
+    hashes = (structural_hash, same_structure)
+    edits = []
+    _diff_node(old, new, edits, hashes)
+
+    # A deleted subtree which is inserted elsewhere has moved, also when it
+    # is part of a larger deleted or inserted subtree
+    deleted = {}
+    for index, (action, removed, added) in enumerate(edits):
+        if action == 'delete':
+            deleted.setdefault(structural_hash(removed), []).append(index)
+    for index, edit in enumerate(edits):
+        if edit is None:
+            # A delete after its insert, already turned into a move
+            continue
+        action, removed, added = edit
+        if action != 'insert':
+            continue
+        old_index = _pop_same(deleted.get(structural_hash(added)), added,
+                              lambda index: edits[index][1], same_structure)
+        if old_index is not None:
+            edits[index] = ('move', edits[old_index][1], added)
+            edits[old_index] = None
+    _find_moves(edits, 'delete', 'insert', hashes)
+    _find_moves(edits, 'insert', 'delete', hashes)
+    return [edit for edit in edits if edit is not None]
+
+def _pop_same(indexes, node, get_node, same):
+    """Remove and return the first of `indexes` whose node (looked up with
+    `get_node`) has the same structure as `node`, None if there isn't one.
+
+    """
+    for position, index in enumerate(indexes or ()):
+        if same(get_node(index), node):
+            del indexes[position]
+            return index
+    return None
+
+def _find_moves(edits, action, inside, hashes):
+    """Turn the `action` edits of subtrees which are found inside a subtree
+    of an `inside` edit into moves.
+
+    """
+    node_hash, same = hashes
+    position = action == 'delete' and 1 or 2
+    pending = {}
+    for index, edit in enumerate(edits):
+        if edit is not None and edit[0] == action:
+            pending.setdefault(node_hash(edit[position]), []).append(index)
+    if not pending:
+        return
+    for edit in list(edits):
+        if edit is None or edit[0] != inside:
+            continue
+        for node in walk(edit[3 - position]):
+            if node is edit[3 - position]:
+                continue
+            index = _pop_same(pending.get(node_hash(node)), node,
+                              lambda index: edits[index][position], same)
+            if index is not None:
+                if action == 'delete':
+                    edits[index] = ('move', edits[index][1], node)
+                else:
+                    edits[index] = ('move', node, edits[index][2])
+
+def _diff_node(old, new, edits, hashes):
+    if hashes[1](old, new):
+        return
+    if old.__class__ is not new.__class__:
+        edits.append(('delete', old, None))
+        edits.append(('insert', None, new))
+        return
+    if _own_values(old) != _own_values(new):
+        edits.append(('update', old, new))
+    _diff_children(list(iter_child_nodes(old)), list(iter_child_nodes(new)),
+                   edits, hashes)
+
+def _own_values(node):
+    values = []
+    for name in _get_value_names(node):
+        value = getattr(node, name)
+        if not isinstance(value, (Node, list, tuple)):
+            values.append(value)
+    return values
+
+def _diff_children(olds, news, edits, hashes):
+    node_hash, same = hashes
+    # Skip the unchanged children at the start and the end
+    start = 0
+    while start < len(olds) and start < len(news) and \
+          same(olds[start], news[start]):
+        start += 1
+    old_end, new_end = len(olds), len(news)
+    while old_end > start and new_end > start and \
+          same(olds[old_end - 1], news[new_end - 1]):
+        old_end -= 1
+        new_end -= 1
+    olds = olds[start:old_end]
+    news = news[start:new_end]
+
+    # Match identical subtrees, the longest run which kept its order is
+    # unchanged and the other matches have moved
+    matches, anchors = _match(olds, news, node_hash, same)
+    anchor_set = set(anchors)
+    for old_index, new_index in matches:
+        if (old_index, new_index) not in anchor_set:
+            edits.append(('move', olds[old_index], news[new_index]))
+
+    for gap_olds, gap_news in _gaps(olds, news, matches, anchors):
+        # Pair the changed nodes with the same label (e.g. the same
+        # variable name), the others by position
+        matches, anchors = _match(gap_olds, gap_news, _label)
+        for old_index, new_index in anchors:
+            _diff_node(gap_olds[old_index], gap_news[new_index], edits,
+                       hashes)
+        for olds_left, news_left in _gaps(gap_olds, gap_news, anchors,
+                                          anchors):
+            for old, new in zip(olds_left, news_left):
+                _diff_node(old, new, edits, hashes)
+            for old in olds_left[len(news_left):]:
+                edits.append(('delete', old, None))
+            for new in news_left[len(olds_left):]:
+                edits.append(('insert', None, new))
+
+def _label(node):
+    """Return the class and own values of `node` and its leaf children,
+    which identify it while its other children changed.
+
+    """
+    label = [node.__class__, tuple(_own_values(node))]
+    for child in iter_child_nodes(node):
+        if not list(iter_child_nodes(child)):
+            label.append((child.__class__, tuple(_own_values(child))))
+    return tuple(label)
+
+def _match(olds, news, key, same=None):
+    """Return the (old index, new index) pairs of nodes with an equal `key`
+    and the longest run of them which kept their order. If given, `same`
+    must confirm the pairs as well.
+
+    """
+    positions = {}
+    for index, node in enumerate(olds):
+        positions.setdefault(key(node), []).append(index)
+    matches = []
+    for index, node in enumerate(news):
+        candidates = positions.get(key(node))
+        if not candidates:
+            continue
+        if same is None:
+            matches.append((candidates.pop(0), index))
+        else:
+            old_index = _pop_same(candidates, node, olds.__getitem__, same)
+            if old_index is not None:
+                matches.append((old_index, index))
+    return matches, _longest_increasing(matches)
+
+def _gaps(olds, news, matches, anchors):
+    """Yield the unmatched nodes of `olds` and `news` between each two
+    anchors.
+
+    """
+    matched_olds = set(old_index for old_index, new_index in matches)
+    matched_news = set(new_index for old_index, new_index in matches)
+    anchors = [(-1, -1)] + anchors + [(len(olds), len(news))]
+    for (old_start, new_start), (old_stop, new_stop) in zip(anchors,
+                                                            anchors[1:]):
+        yield ([olds[index] for index in xrange(old_start + 1, old_stop)
+                if index not in matched_olds],
+               [news[index] for index in xrange(new_start + 1, new_stop)
+                if index not in matched_news])
+
+def _longest_increasing(pairs):
+    """Return the longest subsequence of `pairs` (sorted on the second
+    item) whose first items increase as well.
+
+    """
+    tails = []
+    tail_indexes = []
+    previous = []
+    for index, (key, other) in enumerate(pairs):
+        position = bisect.bisect_left(tails, key)
+        if position == len(tails):
+            tails.append(key)
+            tail_indexes.append(index)
+        else:
+            tails[position] = key
+            tail_indexes[position] = index
+        previous.append(tail_indexes[position - 1] if position else None)
+
+    result = []
+    index = tail_indexes[-1] if tail_indexes else None
+    while index is not None:
+        result.append(pairs[index])
+        index = previous[index]
+    result.reverse()
+    return result
+
+
+_escape_re = re.compile(r"""
+    \\(?:
+        x([0-9a-fA-F]{2}) |
+        u([0-9a-fA-F]{4}) |
+        ([0-3][0-7]{0,2}|[4-7][0-7]?) |     # Octal, including \0
+        (.)
+    )""", re.VERBOSE | re.DOTALL)
+
+_single_escapes = {
+    'b': u'\b', 't': u'\t', 'n': u'\n', 'v': u'\v', 'f': u'\f', 'r': u'\r',
+}
+
+def _decode_escape(match):
+    hex, unicode, octal, char = match.groups()
+    if hex or unicode:
+        return unichr(int(hex or unicode, 16))
+    if octal:
+        return unichr(int(octal, 8))
+    return _single_escapes.get(char, char)
+
+def decode_string(literal):
+    """Return the value of the quoted string `literal` as unicode, with
+    the escape sequences decoded. Byte strings are taken to be UTF-8.
+
+    """
+    value = literal[1:-1]
+    if isinstance(value, str):
+        value = value.decode('utf-8')
+    if '\\' not in value:
+        return value
+    return _escape_re.sub(_decode_escape, value)
+
+def decode_strings(node):
+    """Decode the value of every String in the tree of `node` at once and
+    return the values in document order.
+
+    """
+    values = []
+    for child in walk(node):
+        if isinstance(child, String):
+            value = child._value
+            if value is None:
+                value = child._value = decode_string(child.data)
+            values.append(value)
+    return values
+
+
+# Largest integer up to which all integers are exact as a double
+_max_exact_integer = 2 ** 53
+
+# Comma separated decimal integers below 2 ** 53 without a leading zero
+_decimal_integer = r'(?:[1-9][0-9]{0,14}|0)'
+_decimal_integers_re = re.compile(
+    r'%s(?:,%s)*$' % (_decimal_integer, _decimal_integer))
+
+def decode_number(literal):
+    """Return the value of the numeric `literal` as ECMAScript defines it.
+
+    Integers (decimal, hex and legacy octal like 010) which are exact as a
+    double are returned as int, all other values as float.
+
+    """
+    if literal[:2] in ('0x', '0X'):
+        value = int(literal, 16)
+    elif literal.isdigit():
+        if literal[0] == '0' and '8' not in literal and '9' not in literal:
+            value = int(literal, 8)
+        else:
+            value = int(literal)
+    else:
+        return float(literal)
+
+    if value > _max_exact_integer:
+        try:
+            return float(value)
+        except OverflowError:
+            return float('inf')
+    return value
+
+def decode_numbers(node):
+    """Convert every Number in the tree of `node` at once and return the
+    values in document order.
+
+    Arrays of plain decimal integers (lookup tables, embedded data) are
+    converted with a single check and int() calls, without visiting the
+    numbers one by one.
+
+    """
+    values = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Number):
+            values.append(node.numeric)
+        elif isinstance(node, Array) and node.items and \
+             all(isinstance(item, Number) for item in node.items):
+            values.extend(_decode_number_array(node.items))
+        else:
+            children = list(iter_child_nodes(node))
+            children.reverse()
+            stack.extend(children)
+    return values
+
+def _decode_number_array(numbers):
+    literals = [number.value for number in numbers]
+    if _decimal_integers_re.match(','.join(literals)):
+        values = map(int, literals)
+        for number, value in zip(numbers, values):
+            number._numeric = value
+        return values
+    return [number.numeric for number in numbers]
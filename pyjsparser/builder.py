@@ -0,0 +1,127 @@
+"""
+    jsparser.builder
+    ~~~~~~~~~~~~~~~~
+
+    Base class for creating other kinds of nodes than pyjsparser.ast while
+    parsing
+
+    :copyright: Copyright 2009 Michael van Tellingen
+    :license: BSD
+
+"""
+import inspect
+
+from pyjsparser import ast
+
+
+class Builder(object):
+    """Builder passed as ``Parser(builder=...)``.
+
+    The parser calls the method named after the ast class for every node
+    it creates, with the same arguments as that class. By default these
+    methods pass the arguments as a dict to `create()`, which returns the
+    pyjsparser.ast node.
+
+    Override `create()` to build all nodes differently (e.g. tuples or
+    dicts), or override single methods like ``FuncCall(node, arguments)``.
+    The parser uses the ast module itself when no builder is given, so the
+    default path doesn't go through this class.
+
+    """
+
+    def create(self, name, fields):
+        return getattr(ast, name)(**fields)
+
+
+def _create_method(name, cls):
+    argnames = inspect.getargspec(cls.__init__)[0][1:]
+
+    def method(self, *args, **kwargs):
+        kwargs.update(zip(argnames, args))
+        return self.create(name, kwargs)
+    method.__name__ = name
+    return method
+
+for _name, _value in vars(ast).items():
+    if isinstance(_value, type) and issubclass(_value, ast.Node) and \
+       _value is not ast.Node:
+        setattr(Builder, _name, _create_method(_name, _value))
+del _name, _value
+
+
+class EventBuilder(Builder):
+    """Builder used by Parser.parse_events, which reports every node to
+    ``handler.node(kind, fields)`` instead of building it.
+
+    The parser reduces bottom-up, so a node is reported once it has been
+    parsed completely, after the nodes it contains. Child nodes are None in
+    `fields`; only the leaf values (names, literals, operators) are passed.
+
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    def create(self, name, fields):
+        self.handler.node(name, fields)
+
+
+class IndexBuilder(object):
+    """Wraps the builder of a parser and records the nodes it creates for
+    the ast.NodeIndex of ``Parser(index=True)``.
+
+    The parser creates the nodes bottom-up. Their leaves are created in
+    source order and every node after its children, so sorting the nodes on
+    the first leaf of their subtree, with parents before their children,
+    gives the source order. The first leaf of each node is looked up from
+    its arguments as it is created.
+
+    """
+
+    def __init__(self, builder):
+        self.builder = builder
+        self.count = 0
+        self.firsts = {}
+        self.nodes = {}
+
+    def __getattr__(self, name):
+        method = self._record(getattr(self.builder, name))
+        setattr(self, name, method)
+        return method
+
+    def _record(self, create):
+        firsts = self.firsts
+        nodes = self.nodes
+
+        def method(*args, **kwargs):
+            node = create(*args, **kwargs)
+            self.count += 1
+            first = self.count
+            for value in args + tuple(kwargs.itervalues()):
+                while type(value) is list:
+                    # Lists are in source order, holes in arrays are None
+                    value = _first_item(value)
+                if value is not None:
+                    child = firsts.get(id(value))
+                    if child is not None and child < first:
+                        first = child
+            firsts[id(node)] = first
+            nodes.setdefault(node.__class__, []).append(
+                (first, -self.count, node))
+            return node
+        return method
+
+    def index(self):
+        """Return the ast.NodeIndex of the recorded nodes"""
+        index = ast.NodeIndex()
+        for cls, entries in self.nodes.iteritems():
+            entries.sort()
+            index[cls] = [node for first, count, node in entries]
+        return index
+
+
+def _first_item(items):
+    for item in items:
+        if item is not None:
+            return item
+    return None
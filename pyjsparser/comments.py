@@ -0,0 +1,131 @@
+"""
+    jsparser.comments
+    ~~~~~~~~~~~~~~~~~
+
+    Side table for the comments found while lexing
+
+    :copyright: Copyright 2009 Michael van Tellingen
+    :license: BSD
+
+"""
+import array
+import bisect
+
+from pyjsparser import ast
+
+
+LINE_COMMENT = 0
+BLOCK_COMMENT = 1
+
+
+class CommentTable(object):
+    """Compact table of (start, end, kind) entries for every comment in the
+    source, in document order.
+
+    The lexer only records the offsets; comments are attached to nodes on
+    demand with `leading()` and `trailing()`, which binary search the table.
+    Nodes need position information for this, so parse with
+    ``Parser(tracking=True)``.
+
+    """
+
+    def __init__(self, source=''):
+        self.source = source
+        self.starts = array.array('l')
+        self.ends = array.array('l')
+        self.kinds = array.array('b')
+
+    def append(self, start, end, kind):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.kinds.append(kind)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        return self.starts[index], self.ends[index], self.kinds[index]
+
+    def text(self, index):
+        """Return the source text of the comment at `index`"""
+        return self.source[self.starts[index]:self.ends[index]]
+
+    def node(self, index):
+        """Return the comment at `index` as a LineComment or BlockComment"""
+        if self.kinds[index] == LINE_COMMENT:
+            node = ast.LineComment(self.text(index))
+        else:
+            node = ast.BlockComment(self.text(index))
+        node.lexpos = self.starts[index]
+        node.endlexpos = self.ends[index]
+        return node
+
+    def leading(self, node):
+        """Return the comments directly preceding `node`, only separated
+        from it (and each other) by whitespace.
+
+        """
+        pos = self._position(node, 'lexpos')
+        indexes = []
+        index = bisect.bisect_right(self.ends, pos) - 1
+        while index >= 0 and not self.source[self.ends[index]:pos].strip():
+            indexes.append(index)
+            pos = self.starts[index]
+            index -= 1
+        indexes.reverse()
+
+        # Comments on the same line as the preceding code belong to that code
+        while indexes and self._follows_code(self.starts[indexes[0]]):
+            indexes.pop(0)
+        return [self.node(index) for index in indexes]
+
+    def trailing(self, node):
+        """Return the comments following `node` on the same line as its
+        last token. A separating semicolon or comma is allowed.
+
+        """
+        pos = self._content_end(self._position(node, 'endlexpos'))
+        indexes = []
+        index = bisect.bisect_left(self.starts, pos)
+        while index < len(self.starts):
+            gap = self.source[pos:self.starts[index]]
+            if '\n' in gap or '\r' in gap:
+                break
+            if gap.strip() not in ('', ';', ','):
+                break
+            indexes.append(index)
+            pos = self.ends[index]
+            index += 1
+        return [self.node(index) for index in indexes]
+
+    def _position(self, node, attr):
+        pos = getattr(node, attr, None)
+        if pos is None:
+            raise ValueError("%r has no position information, "
+                             "parse with tracking=True" % node)
+        return pos
+
+    def _follows_code(self, pos):
+        """Return True if `pos` is preceded by anything but whitespace on
+        its line.
+
+        """
+        while pos > 0 and self.source[pos - 1] in ' \t':
+            pos -= 1
+        return pos > 0 and self.source[pos - 1] not in '\r\n'
+
+    def _content_end(self, pos):
+        """Move `pos` back over whitespace and comments so it points directly
+        after the last real token. The parser can report the start of the
+        next token as the end of a statement terminated by an automatic
+        semicolon.
+
+        """
+        while True:
+            while pos > 0 and self.source[pos - 1].isspace():
+                pos -= 1
+            index = bisect.bisect_left(self.ends, pos)
+            if index < len(self.ends) and self.ends[index] == pos:
+                pos = self.starts[index]
+            else:
+                return pos
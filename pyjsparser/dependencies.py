@@ -0,0 +1,213 @@
+"""
+    jsparser.dependencies
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Find the modules loaded with require(), define() and importScripts()
+    from the token stream, without parsing
+
+    :copyright: Copyright 2009 Michael van Tellingen
+    :license: BSD
+
+"""
+from pyjsparser.lexer import Lexer, LexerError
+
+
+def extract_dependencies(source):
+    """Return a tuple (dependencies, fallback) for `source`.
+
+    `dependencies` lists the string arguments of the require(),
+    define() and importScripts() calls in order of appearance, without
+    duplicates. Both ``require('a')`` and the array forms like
+    ``define(['a', 'b'], factory)`` are recognized.
+
+    `fallback` is True when the token stream doesn't give a definite
+    answer and the caller should do a full parse instead: a module name
+    which is computed or contains escapes, one of the functions being
+    passed around instead of called, or a lexer error.
+
+    """
+    return _extract(Lexer(), source)
+
+
+def extract_dependencies_batch(sources):
+    """Return the (dependencies, fallback) tuple for each of `sources`,
+    sharing a single lexer between them.
+
+    """
+    lexer = Lexer()
+    return [_extract(lexer, source) for source in sources]
+
+
+def _extract(lexer, source):
+    lexer.input(source)
+    calls = []          # calls in the order they start
+    open_calls = []     # calls whose arguments are being read, innermost last
+    fallback = False
+    previous = None     # type of the previous token
+    candidate = None    # (name, type before it, is a parameter) of a handler
+    parameters = None   # position in the parameters of a function
+    try:
+        for token in lexer:
+            kind = token.type
+            if open_calls:
+                # The enclosing calls see the token before the innermost
+                # one is closed, so they get its ')' as well
+                finished = open_calls[-1].feed(token)
+                for call in open_calls[:-1]:
+                    call.feed(token)
+                if finished:
+                    fallback = open_calls.pop().finish() or fallback
+
+            if candidate is not None:
+                name, before, parameter = candidate
+                candidate = None
+                if kind == 'LPAREN':
+                    call = _Call(name)
+                    calls.append(call)
+                    open_calls.append(call)
+                elif not (kind == 'PERIOD' or before == 'TYPEOF' or
+                          parameter):
+                    # ``define.amd``, ``typeof define`` and parameters are
+                    # fine, anything else could create an alias which is
+                    # called elsewhere
+                    fallback = True
+
+            # A method of another object, like foo.require(), is skipped
+            if kind == 'ID' and token.value in _call_handlers and \
+               previous != 'PERIOD':
+                candidate = (token.value, previous, parameters == 'list')
+
+            if kind == 'FUNCTION':
+                parameters = 'name'
+            elif parameters == 'name' and kind in ('ID', 'LPAREN'):
+                parameters = kind == 'ID' and 'paren' or 'list'
+            elif parameters == 'paren' and kind == 'LPAREN':
+                parameters = 'list'
+            elif parameters != 'list' or kind not in ('ID', 'COMMA'):
+                parameters = None
+            previous = kind
+    except LexerError:
+        return [], True
+
+    if candidate is not None and not (candidate[1] == 'TYPEOF' or
+                                      candidate[2]):
+        fallback = True
+    while open_calls:
+        # Unterminated calls end with the input
+        fallback = open_calls.pop().finish() or fallback
+
+    dependencies = []
+    seen = set()
+    for call in calls:
+        for name in call.names:
+            if name is None:
+                fallback = True
+            elif name not in seen:
+                seen.add(name)
+                dependencies.append(name)
+    return dependencies, fallback
+
+
+class _Call(object):
+    """Collects the arguments of a call to one of the handlers as the
+    tokens stream by.
+
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.names = []
+        self.arguments = []
+        self.argument = []
+        self.depth = 0
+
+    def feed(self, token):
+        """Add the next token, return True if it ends the call"""
+        kind = token.type
+        if kind in ('LPAREN', 'LBRACKET', 'LBRACE'):
+            self.depth += 1
+        elif kind in ('RPAREN', 'RBRACKET', 'RBRACE'):
+            if not self.depth:
+                return True
+            self.depth -= 1
+        elif kind == 'COMMA' and not self.depth:
+            self.arguments.append(self.argument)
+            self.argument = []
+            return False
+        argument = self.argument
+        # Only arrays need more than two tokens to be classified
+        if len(argument) < 2 or argument[0].type == 'LBRACKET':
+            argument.append(token)
+        return False
+
+    def finish(self):
+        """Set the names of the call, return True if they aren't definite"""
+        if self.argument:
+            self.arguments.append(self.argument)
+        self.names, dynamic = _call_handlers[self.name](
+            [_classify(argument) for argument in self.arguments])
+        self.arguments = self.argument = None
+        return dynamic
+
+
+def _string(token):
+    """Return the value of a string literal, or None if it has escapes"""
+    if '\\' in token.value:
+        return None
+    return token.value[1:-1]
+
+
+def _classify(argument):
+    """Return the kind of an argument ('string', 'array', 'function',
+    'object' or 'dynamic') and the strings it holds.
+
+    """
+    types = [token.type for token in argument]
+    if types == ['STRING_LITERAL']:
+        return 'string', [_string(argument[0])]
+    if types[:1] == ['LBRACKET'] and types[-1:] == ['RBRACKET']:
+        elements = argument[1:-1]
+        if elements and elements[-1].type == 'COMMA':
+            elements.pop()
+        strings = elements[::2]
+        # Strings separated by single commas
+        if all(token.type == 'STRING_LITERAL' for token in strings) and \
+           all(token.type == 'COMMA' for token in elements[1::2]):
+            return 'array', [_string(token) for token in strings]
+        return 'dynamic', []
+    if types[:1] == ['FUNCTION']:
+        return 'function', []
+    if types[:1] == ['LBRACE']:
+        return 'object', []
+    return 'dynamic', []
+
+
+def _require(arguments):
+    # require('a') or require(['a', 'b'], callback)
+    if arguments and arguments[0][0] in ('string', 'array'):
+        return arguments[0][1], False
+    return [], True
+
+def _define(arguments):
+    # define(id?, dependencies?, factory)
+    if arguments and arguments[0][0] == 'string' and len(arguments) > 1:
+        arguments = arguments[1:]
+    if arguments and arguments[0][0] == 'array':
+        return arguments[0][1], False
+    if arguments and arguments[0][0] in ('function', 'object'):
+        return [], False
+    return [], True
+
+def _import_scripts(arguments):
+    names = []
+    for kind, strings in arguments:
+        if kind != 'string':
+            return names, True
+        names.extend(strings)
+    return names, False
+
+_call_handlers = {
+    'require': _require,
+    'define': _define,
+    'importScripts': _import_scripts,
+}
@@ -0,0 +1,184 @@
+"""
+    jsparser.driver
+    ~~~~~~~~~~~~~~~
+
+    Resumable version of the ply LR parsing loop
+
+    :copyright: Copyright 2009 Michael van Tellingen
+    :license: BSD
+
+"""
+from ply.yacc import YaccProduction, YaccSymbol, error_count
+
+
+class Driver(object):
+    """Runs the tables and actions of a ply LRParser like
+    ``LRParser.parse()`` does, but as a generator which yields before every
+    token it reads from the lexer, or before every `step` tokens. This
+    allows the caller to suspend the parse and resume it later with the
+    parser and lexer state intact.
+
+    The value of the start symbol is available as `result` once the
+    generator is exhausted.
+
+    """
+
+    def __init__(self, yacc, lexer, tracking=False, step=1):
+        self.yacc = yacc
+        self.lexer = lexer
+        self.tracking = tracking
+        self.step = step
+        self.result = None
+        self.tokens = 0
+
+    def __iter__(self):
+        yacc = self.yacc
+        lexer = self.lexer
+        tracking = self.tracking
+        actions = yacc.action
+        goto = yacc.goto
+        prod = yacc.productions
+        defaulted_states = yacc.defaulted_states
+        pslice = YaccProduction(None)
+        pslice.lexer = lexer
+        pslice.parser = yacc
+        errorcount = 0
+        step = self.step
+        countdown = 1
+
+        lookahead = None
+        lookaheadstack = []
+        statestack = yacc.statestack = [0]
+        sym = YaccSymbol()
+        sym.type = '$end'
+        symstack = yacc.symstack = [sym]
+        pslice.stack = symstack
+        yacc.token = lexer.token
+        state = 0
+
+        while True:
+            if state not in defaulted_states:
+                if not lookahead:
+                    if not lookaheadstack:
+                        if countdown == 1:
+                            yield
+                            countdown = step
+                        else:
+                            countdown -= 1
+                        self.tokens += 1
+                        lookahead = lexer.token()
+                    else:
+                        lookahead = lookaheadstack.pop()
+                    if not lookahead:
+                        lookahead = YaccSymbol()
+                        lookahead.type = '$end'
+                t = actions[state].get(lookahead.type)
+            else:
+                t = defaulted_states[state]
+
+            if t is not None:
+                if t > 0:
+                    # Shift
+                    statestack.append(t)
+                    state = t
+                    symstack.append(lookahead)
+                    lookahead = None
+                    if errorcount:
+                        errorcount -= 1
+                    continue
+
+                if t < 0:
+                    # Reduce
+                    p = prod[-t]
+                    pname = p.name
+                    plen = p.len
+                    sym = YaccSymbol()
+                    sym.type = pname
+                    sym.value = None
+
+                    if plen:
+                        targ = symstack[-plen - 1:]
+                        targ[0] = sym
+                        if tracking:
+                            t1 = targ[1]
+                            sym.lineno = t1.lineno
+                            sym.lexpos = t1.lexpos
+                            t1 = targ[-1]
+                            sym.endlineno = getattr(t1, 'endlineno', t1.lineno)
+                            sym.endlexpos = getattr(t1, 'endlexpos', t1.lexpos)
+                    else:
+                        targ = [sym]
+                        if tracking:
+                            sym.lineno = lexer.lineno
+                            sym.lexpos = lexer.lexpos
+
+                    pslice.slice = targ
+                    try:
+                        if plen:
+                            del symstack[-plen:]
+                        yacc.state = state
+                        p.callable(pslice)
+                        if plen:
+                            del statestack[-plen:]
+                        symstack.append(sym)
+                        state = goto[statestack[-1]][pname]
+                        statestack.append(state)
+                    except SyntaxError:
+                        # Enter error recovery, like ply does
+                        lookaheadstack.append(lookahead)
+                        symstack.extend(targ[1:-1])
+                        statestack.pop()
+                        state = statestack[-1]
+                        sym.type = 'error'
+                        sym.value = 'error'
+                        lookahead = sym
+                        errorcount = error_count
+                        yacc.errorok = False
+                    continue
+
+                # Accept
+                self.result = getattr(symstack[-1], 'value', None)
+                return
+
+            # Syntax error, give the error function a chance to recover
+            if errorcount == 0 or yacc.errorok:
+                errorcount = error_count
+                yacc.errorok = False
+                errtoken = lookahead
+                if errtoken.type == '$end':
+                    errtoken = None
+                yacc.state = state
+                tok = yacc.errorfunc(errtoken)
+                if yacc.errorok:
+                    lookahead = tok
+                    continue
+            else:
+                errorcount = error_count
+
+            # Fall back to the error symbol rules of the grammar
+            if len(statestack) <= 1 and lookahead.type != '$end':
+                lookahead = None
+                state = 0
+                del lookaheadstack[:]
+                continue
+
+            if lookahead.type == '$end':
+                return
+
+            if lookahead.type != 'error':
+                if symstack[-1].type == 'error':
+                    lookahead = None
+                    continue
+                t = YaccSymbol()
+                t.type = 'error'
+                if hasattr(lookahead, 'lineno'):
+                    t.lineno = t.endlineno = lookahead.lineno
+                if hasattr(lookahead, 'lexpos'):
+                    t.lexpos = t.endlexpos = lookahead.lexpos
+                t.value = lookahead
+                lookaheadstack.append(lookahead)
+                lookahead = t
+            else:
+                symstack.pop()
+                statestack.pop()
+                state = statestack[-1]
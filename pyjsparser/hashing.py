@@ -0,0 +1,163 @@
+"""
+    jsparser.hashing
+    ~~~~~~~~~~~~~~~~
+
+    Structural hashes of nodes, computed while parsing
+
+    :copyright: Copyright 2009 Michael van Tellingen
+    :license: BSD
+
+"""
+import weakref
+
+from pyjsparser import ast
+from pyjsparser.builder import Builder
+
+
+# Leaf nodes which never change after parsing and can be shared
+shareable = frozenset(['Null', 'Boolean', 'Number', 'String'])
+
+
+class HashBuilder(Builder):
+    """Builder which sets `structural_hash` on every node it creates.
+
+    The parser reduces bottom-up, so the hashes of the children already
+    exist and every hash is computed from the node class, the hashes of
+    its children and its leaf values. Positions aren't part of the hash.
+    Use `same_structure()` to compare two subtrees, which tells different
+    subtrees apart in O(1).
+
+    With `share_leaves` identical Null, Boolean, Number and String nodes
+    are created once and shared, which saves memory on repetitive
+    generated code. Shared nodes only have the span of their first
+    occurrence, so don't combine this with ``Parser(tracking=True)``. The
+    table of shared leaves only holds them while a tree uses them.
+
+    A LazyFuncDecl is hashed from the source of its body, which isn't
+    parsed for this. It never has the same structure as the FuncDecl of
+    the same code, so only compare trees parsed with the same
+    `lazy_functions` setting.
+
+    The node methods create the ast nodes directly instead of going
+    through `create()`.
+
+    """
+
+    def __init__(self, share_leaves=False):
+        self.share_leaves = share_leaves
+        self.leaves = weakref.WeakValueDictionary()
+
+    def create(self, name, fields):
+        return getattr(self, name)(**fields)
+
+
+def _create_method(cls):
+    def method(self, *args, **kwargs):
+        node = cls(*args, **kwargs)
+        node.structural_hash = _node_hash(node)
+        return node
+    method.__name__ = cls.__name__
+    return method
+
+def _create_shared_method(cls):
+    def method(self, *args, **kwargs):
+        if not self.share_leaves:
+            node = cls(*args, **kwargs)
+            node.structural_hash = _node_hash(node)
+            return node
+        key = (cls, args, tuple(sorted(kwargs.items())))
+        node = self.leaves.get(key)
+        if node is None:
+            node = cls(*args, **kwargs)
+            node.structural_hash = _node_hash(node)
+            self.leaves[key] = node
+        return node
+    method.__name__ = cls.__name__
+    return method
+
+for _name, _value in vars(ast).items():
+    if isinstance(_value, type) and issubclass(_value, ast.Node) and \
+       _value is not ast.Node:
+        if _name in shareable:
+            setattr(HashBuilder, _name, _create_shared_method(_value))
+        else:
+            setattr(HashBuilder, _name, _create_method(_value))
+del _name, _value
+
+
+def structural_hash(node):
+    """Return the structural hash of `node`, computing it for nodes which
+    weren't created by a HashBuilder.
+
+    """
+    value = getattr(node, 'structural_hash', None)
+    if value is None:
+        value = node.structural_hash = _node_hash(node, structural_hash)
+    return value
+
+
+def same_structure(node, other):
+    """Return True if `node` and `other` have the same structure.
+
+    Different structural hashes give False right away. Equal hashes are
+    confirmed by comparing the subtrees, as different structures may have
+    the same hash. The comparison skips identical (e.g. shared) nodes and
+    stops at the first children whose hashes differ.
+
+    """
+    if node is other:
+        return True
+    if structural_hash(node) != structural_hash(other):
+        return False
+    return _same_values(node, other)
+
+
+def _same_values(node, other):
+    stack = [(node, other)]
+    while stack:
+        value, other = stack.pop()
+        if value is other:
+            continue
+        if isinstance(value, ast.Node):
+            if value.__class__ is not other.__class__ or \
+               structural_hash(value) != structural_hash(other):
+                return False
+            if isinstance(value, ast.LazyFuncDecl):
+                if value.source[value.start:value.end] != \
+                   other.source[other.start:other.end]:
+                    return False
+                names = ['node', 'parameters']
+            else:
+                names = ast._get_value_names(value)
+            for name in names:
+                stack.append((getattr(value, name), getattr(other, name)))
+        elif isinstance(value, (list, tuple)):
+            if not isinstance(other, (list, tuple)) or \
+               len(value) != len(other):
+                return False
+            stack.extend(zip(value, other))
+        elif isinstance(other, (ast.Node, list, tuple)) or value != other:
+            return False
+    return True
+
+
+def _node_hash(node, child_hash=None):
+    if isinstance(node, ast.LazyFuncDecl):
+        # Hash the source of the body instead of parsing it
+        return hash(('LazyFuncDecl', _value_hash(node.node, child_hash),
+                     _value_hash(node.parameters, child_hash),
+                     node.source[node.start:node.end]))
+    values = [node.__class__.__name__]
+    for name in ast._get_value_names(node):
+        values.append(_value_hash(getattr(node, name), child_hash))
+    return hash(tuple(values))
+
+
+def _value_hash(value, child_hash):
+    if isinstance(value, ast.Node):
+        if child_hash is not None:
+            return child_hash(value)
+        return value.structural_hash
+    if isinstance(value, (list, tuple)):
+        return hash(tuple([_value_hash(item, child_hash) for item in value]))
+    return hash(value)
@@ -10,10 +10,30 @@
 """
 import itertools
 import re
+import threading
 import warnings
 
 import ply.lex
 
+from pyjsparser.comments import CommentTable, LINE_COMMENT, BLOCK_COMMENT
+
+
+class LexerError(TypeError):
+    """Raised for input which can't be tokenized, with the position in the
+    `lineno` and `lexpos` attributes. It derives from TypeError, which the
+    lexer raised before.
+
+    """
+
+    def __init__(self, msg, lineno, lexpos):
+        TypeError.__init__(self, msg, lineno, lexpos)
+        self.msg = msg
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+    def __str__(self):
+        return "%s, %d" % (self.msg, self.lineno)
+
 
 class Lexer(object):
 
@@ -35,11 +55,17 @@ class Lexer(object):
         'PUBLIC', 'ENUM', 'INT', 'SHORT'
     )
     
-    # Separate state when parsing a RegularExpressionLiteral
-    states = (
-        ('regex', 'exclusive'),
-    )
-    
+    # Tokens after which a '/' is a division instead of the start of a
+    # RegularExpressionLiteral
+    division_preceding = frozenset([
+        'ID', 'NUMBER_LITERAL', 'STRING_LITERAL', 'REGEX_LITERAL',
+        'RPAREN', 'RBRACKET', 'THIS', 'TRUE', 'FALSE', 'NULL',
+        'INCR', 'DECR',
+    ])
+
+    # Longest string literal (including the quotes) which is interned
+    intern_max_length = 32
+
     # Other tokens
     tokens = (
 
@@ -84,10 +110,10 @@ class Lexer(object):
         # Types
         "STRING_LITERAL",
         "NUMBER_LITERAL",
-        
-        # Regex state tokens, these are only used when the parser is in the
-        # regex state
-        'RE_BODY', 'RE_END',
+        "REGEX_LITERAL",
+
+        # Unparsed function body, see `lazy_functions`
+        "FUNCTION_BODY",
     )
 
     # Regex for identifiers
@@ -95,24 +121,27 @@ class Lexer(object):
 
     
     # StringLiteral
+    #
+    # The alternatives for a character never overlap, so a string which isn't
+    # terminated fails in linear time instead of backtracking.
     t_STRING_LITERAL = r"""
     (
         (?:"    # Double quoted strings
             (?:
                 [^"\\\n\r] |            # No line terminators, escape chars or "
-                \\[-a-zA-Z\\?\'"] |     # Escaped characters 
                 \\x[a-fA-F0-9]{2} |     # Hex chars
-                \\u[a-fA-F0-9]{4}       # Unicode chars
-            )*?
+                \\u[a-fA-F0-9]{4} |     # Unicode chars
+                \\[^xu\n\r]            # Other escaped characters
+            )*
         )"
         |
         (?:'    # Single quoted strings
             (?:
                 [^'\\\n\r] |            # No line terminators, escape chars or '
-                \\[-a-zA-Z\\?'\"] |     # Escaped characters
                 \\x[a-fA-F0-9]{2} |     # Hex chars
-                \\u[a-fA-F0-9]{4}       # Unicode chars
-            )*?
+                \\u[a-fA-F0-9]{4} |     # Unicode chars
+                \\[^xu\n\r]            # Other escaped characters
+            )*
         )'
     )
     """
@@ -121,23 +150,23 @@ class Lexer(object):
     t_NUMBER_LITERAL   = r"""
         (?:
             0[xX][0-9a-fA-F]+ |             # Hex digits
-            [0-9]+e[0-9]+ |                 # Exponent integer
-            [0-9]*\.[0-9]+(?:e?[0-9]+)? |   # .2e20
-            [0-9]+\.(?:e?[0-9]+) |          # 2.e20     
-            [0-9]+                          # integer
+            (?:
+                [0-9]+\.?[0-9]* |           # 2, 2. and 2.5
+                \.[0-9]+                    # .5
+            )
+            (?:[eE][+-]?[0-9]+)?            # Exponent
         )
     """
 
-    # RegexLiteral (only in 'regex' state)
-    regex_first_char  = r'(?:[^\n\r\[\\\/\*]|(?:\\.)|(?:\[[^\]]+\]))'
-    regex_char        = r'(?:[^\n\r\[\\\/]|(?:\\.)|(?:\[[^\]]+\]))'
-    t_regex_RE_BODY      = regex_first_char + regex_char + '*'
-    t_regex_RE_END    = r'/[aig]*'
+    # RegularExpressionLiteral, a '/' inside a character class or escaped
+    # doesn't end the literal. Only matched where the grammar allows a regex,
+    # see t_REGEX_LITERAL
+    regex_class       = r'(?:\[(?:[^\]\\\n\r]|\\.)*\])'
+    regex_first_char  = r'(?:[^\n\r\[\\/*]|\\.|' + regex_class + ')'
+    regex_char        = r'(?:[^\n\r\[\\/]|\\.|' + regex_class + ')'
+    regex_literal     = r'/' + regex_first_char + regex_char + r'*/[a-zA-Z]*'
+    regex_literal_re  = re.compile(regex_literal, re.UNICODE)
 
-    # Comments    
-    t_LINE_COMMENT  = r'//[^\r\n]*'
-    t_BLOCK_COMMENT = r'/\*[^*]*\*+([^/*][^*]*\*+)*/'
-    
     # Punctuators
     t_LPAREN    = r'\('
     t_RPAREN    = r'\)'
@@ -150,7 +179,6 @@ class Lexer(object):
     t_SEMI      = r';'
     t_COLON     = r':'
     t_TIMES_EQUALS      = r'\*='
-    t_DIVIDE_EQUALS     = r'/='
     t_MOD_EQUALS        = r'%='
     t_PLUS_EQUALS       = r'\+='
     t_MINUS_EQUALS      = r'-='
@@ -164,7 +192,6 @@ class Lexer(object):
     t_PLUS              = r'\+'
     t_MINUS             = r'-'
     t_TIMES             = r'\*'
-    t_DIVIDE            = r'/'
     t_MOD               = r'%'
     t_OR                = r'\|'
     t_AND               = r'&'
@@ -188,20 +215,70 @@ class Lexer(object):
     t_INCR              = r'\+\+'
     t_DECR              = r'--'
 
-    def t_INCR_NO_LT(self, t):
-        r'[\r\n]+\s*\+\+'
-        t.value = '++'
+    # The rules below are functions, so they are tried before the string
+    # rules above (in order of definition). Each of them consumes its input
+    # in linear time, also when the input is malformed.
+
+    def t_LINE_TERMINATOR(self, t):
+        r'[\n\r]\s*'
+        t.lexer.lineno += t.value.count('\n')
+
+        # A ++ or -- after a line terminator is always a prefix operator,
+        # emit INCR_NO_LT / DECR_NO_LT instead of the line terminator
+        data, pos = t.lexer.lexdata, t.lexer.lexpos
+        if data.startswith('++', pos):
+            t.type, t.value = 'INCR_NO_LT', '++'
+            t.lexer.lexpos = pos + 2
+        elif data.startswith('--', pos):
+            t.type, t.value = 'DECR_NO_LT', '--'
+            t.lexer.lexpos = pos + 2
         return t
 
-    def t_DECR_NO_LT(self, t):
-        r'[\r\n]+\s*--'
-        t.value = '--'
+    def t_LINE_COMMENT(self, t):
+        r'//[^\r\n]*'
         return t
-    
-    def t_LINE_TERMINATOR(self, t):
-        r'[\n\r]+(?!\s*(?:\+\+)|(?:--))'
-        # Hack for INCR_NO_LT / DECR_NO_LT
-        t.lexer.lineno += len(t.value)
+
+    def t_BLOCK_COMMENT(self, t):
+        r'/\*'
+        end = t.lexer.lexdata.find('*/', t.lexer.lexpos)
+        if end == -1:
+            raise LexerError("Unterminated comment", t.lineno, t.lexpos)
+        t.value = t.lexer.lexdata[t.lexpos:end + 2]
+        t.lexer.lexpos = end + 2
+        t.lexer.lineno += t.value.count('\n')
+        return t
+
+    def t_REGEX_LITERAL(self, t):
+        r'/=?'
+        if not self.regex_allowed:
+            t.type = t.value == '/=' and 'DIVIDE_EQUALS' or 'DIVIDE'
+            return t
+
+        data = t.lexer.lexdata
+        if self._after_brace and t.lexpos < self._regex_failed_until:
+            # A regex after '}' already failed to match on this line
+            t.type = t.value == '/=' and 'DIVIDE_EQUALS' or 'DIVIDE'
+            return t
+
+        match = self.regex_literal_re.match(data, t.lexpos)
+        if not match:
+            if not self._after_brace:
+                raise LexerError("Unterminated regular expression '%s'" %
+                                 data[t.lexpos:t.lexpos + 20], t.lineno,
+                                 t.lexpos)
+            # The '}' may end an object literal or a function expression,
+            # so this is a division. The failed scan may have run to the
+            # end of the line, which isn't scanned again for a later '}/'.
+            end = len(data)
+            for terminator in '\n\r':
+                found = data.find(terminator, t.lexpos, end)
+                if found != -1:
+                    end = found
+            self._regex_failed_until = end
+            t.type = t.value == '/=' and 'DIVIDE_EQUALS' or 'DIVIDE'
+            return t
+        t.value = match.group()
+        t.lexer.lexpos = match.end()
         return t
 
     @ply.lex.TOKEN(identifier)
@@ -209,62 +286,119 @@ class Lexer(object):
         if t.value in self.reserved_keywords_map:
             warnings.warn("The identifier '%s' is a reserved keyword" % t.value)
         t.type = self.keywords_map.get(t.value, "ID")
+        if self.intern:
+            t.value = self.interned.setdefault(t.value, t.value)
         return t
    
     t_ignore = ' \t'
 
     def t_error(self, t):
-        raise TypeError("Unknown text '%s', %d" % (t.value[:20], t.lineno))
-    
-    t_regex_ignore = ''    
-    def t_regex_error(self, t):
-        raise TypeError("Error parsing regular expression '%s', %d" % (
-            t.value[:20], t.lineno))
-    
+        raise LexerError("Unknown text '%s'" % t.value[:20], t.lineno,
+                         t.lexpos)
+
     
     def __init__(self):
         self.lexer = None
         self.next_tokens = []
         self.prev_token = None
         self.curr_token = None
-        self.keywords_map = {}
-        self.reserved_keywords_map = {}
+        self.regex_allowed = True
+        self._after_brace = False
+        self._regex_failed_until = 0
+        self.comments = CommentTable()
 
-        self._prepare_tokens()
-        self.lexer = ply.lex.lex(object=self, debug=0,
-                                 reflags=re.UNICODE|re.VERBOSE,
-                                 optimize=0, lextab='tab_lex')
-        
-    def _prepare_tokens(self):
+        # Skip function bodies and return them as a single FUNCTION_BODY
+        # token whose value is the (start, end) offset of the body
+        self.lazy_functions = False
+        self._function_parens = None
+        self._function_body_next = False
+
+        # Identifiers, keywords and short string literals are interned, so
+        # repeated names share one string. The table is per input, unless a
+        # dict to share between inputs is set as intern_table.
+        self.intern = True
+        self.intern_table = None
+        self.interned = {}
+
+        # A copy of the shared ply lexer with the rules bound to self
+        self.lexer = self._get_rules().clone(self)
+        self.lexer.begin('INITIAL')
+        self.lexer.lexstatestack = []
+
+    @classmethod
+    def _prepare_tokens(cls):
         """Fill the keywords_map and reserved_keywords_map dictionaries
-        and append them to the tokens list
+        and append them to the tokens list, once for the class
         
         """
         # Map the keywords and reserved keywords to a dict lcase => ucase
-        self.keywords_map = {}
-        for value in self.keywords:
-            self.keywords_map[value.lower()] = value
+        cls.keywords_map = {}
+        for value in cls.keywords:
+            cls.keywords_map[value.lower()] = value
         
-        self.reserved_keywords_map = {}
-        for value in self.reserved_keywords:
-            self.reserved_keywords_map[value.lower()] = value
+        cls.reserved_keywords_map = {}
+        for value in cls.reserved_keywords:
+            cls.reserved_keywords_map[value.lower()] = value
         
         # Add other tokens
-        self.tokens = self.keywords + self.tokens
+        cls.tokens = cls.keywords + cls.tokens
+
+    _rules = None
+    _rules_lock = threading.Lock()
+
+    @classmethod
+    def _get_rules(cls):
+        """Return the ply lexer built from the rules of the class.
+
+        It is built once, with the unbound methods, and only used to clone
+        the lexers of the instances from. The compiled regular expressions
+        are shared and never modified.
+
+        """
+        rules = cls.__dict__.get('_rules')
+        if rules is None:
+            with cls._rules_lock:
+                rules = cls.__dict__.get('_rules')
+                if rules is None:
+                    rules = cls._rules = ply.lex.lex(
+                        object=cls, debug=0, reflags=re.UNICODE|re.VERBOSE,
+                        optimize=0, lextab='tab_lex')
+        return rules
     
 
 
 
 
-    def input(self, input):
+    def input(self, input, start=0, end=None):
+        """Set the input, only lexing the part between `start` and `end` if
+        given. Token positions stay relative to the whole input.
+
+        """
+        self.next_tokens = []
+        self.prev_token = None
+        self.curr_token = None
+        self.comments = CommentTable(input)
+        self.regex_allowed = True
+        self._after_brace = False
+        self._regex_failed_until = 0
+        self._function_parens = None
+        self._function_body_next = False
+        if self.intern_table is not None:
+            self.interned = self.intern_table
+        else:
+            self.interned = {}
+        self.lexer.lineno = input.count('\n', 0, start) + 1
         self.lexer.input(input)
+        self.lexer.lexpos = start
+        if end is not None:
+            self.lexer.lexlen = end
     
     def token(self):
         """Return a token from the stream.
         
         This method serves as a proxy to the real lexer and allows us to:
          - Reference the previous token
-         - Ignore tokens
+         - Ignore tokens (comments are recorded in the comments table)
          - Automatically append semi colons after a few keywords which
            do not allow a new-line (continue, break, return throw)
         
@@ -279,6 +413,13 @@ class Lexer(object):
             if self.curr_token is None or self.curr_token.type not in (
                 'LINE_TERMINATOR','LINE_COMMENT', 'BLOCK_COMMENT'):
                 break
+
+            if self.curr_token.type == 'LINE_COMMENT':
+                self.comments.append(self.curr_token.lexpos,
+                                     self.lexer.lexpos, LINE_COMMENT)
+            elif self.curr_token.type == 'BLOCK_COMMENT':
+                self.comments.append(self.curr_token.lexpos,
+                                     self.lexer.lexpos, BLOCK_COMMENT)
             
             # When a token should not be followed by a lineTerminator token
             # then we automatically replace the lineTerminator with a
@@ -286,7 +427,75 @@ class Lexer(object):
             if self.prev_token and self.prev_token.type in [
                 'CONTINUE', 'BREAK', 'RETURN', 'THROW']:
                 return self.create_semicolon_token(self.curr_token)
+
+        if self.curr_token is not None:
+            self.regex_allowed = \
+                self.curr_token.type not in self.division_preceding
+            self._after_brace = self.curr_token.type == 'RBRACE'
+
+            # Used by ply for the end position when tracking is enabled
+            self.curr_token.endlexpos = self.lexer.lexpos
+
+            if self.curr_token.type == 'STRING_LITERAL' and self.intern and \
+               len(self.curr_token.value) <= self.intern_max_length:
+                self.curr_token.value = self.interned.setdefault(
+                    self.curr_token.value, self.curr_token.value)
+
+            if self.lazy_functions:
+                return self._function_token(self.curr_token)
         return self.curr_token
+
+    def _function_token(self, token):
+        """Follow the parameters of a function to replace its body with a
+        FUNCTION_BODY token.
+
+        """
+        if token.type == 'FUNCTION':
+            self._function_parens = 0
+        elif self._function_parens is not None:
+            if token.type == 'LPAREN':
+                self._function_parens += 1
+            elif token.type == 'RPAREN':
+                self._function_parens -= 1
+                if not self._function_parens:
+                    self._function_parens = None
+                    self._function_body_next = True
+        elif self._function_body_next:
+            self._function_body_next = False
+            if token.type == 'LBRACE':
+                return self._skip_function_body(token)
+        return token
+
+    def _skip_function_body(self, lbrace):
+        """Match braces at the token level up to the end of the function
+        body, so braces in strings, regular expressions and comments are
+        ignored. Nested functions are part of the skipped body.
+
+        """
+        self.lazy_functions = False
+        try:
+            depth = 1
+            while depth:
+                token = self.token()
+                if token is None:
+                    error = SyntaxError("Unterminated function body")
+                    error.lineno = lbrace.lineno
+                    error.lexpos = lbrace.lexpos
+                    raise error
+                if token.type == 'LBRACE':
+                    depth += 1
+                elif token.type == 'RBRACE':
+                    depth -= 1
+        finally:
+            self.lazy_functions = True
+
+        body = ply.lex.LexToken()
+        body.type = 'FUNCTION_BODY'
+        body.value = (lbrace.lexpos + 1, token.lexpos)
+        body.lineno = lbrace.lineno
+        body.lexpos = lbrace.lexpos
+        body.endlexpos = token.endlexpos
+        return body
     
     
     def __iter__(self):
@@ -306,8 +515,10 @@ class Lexer(object):
             asi_token.lineno = token.lineno
             asi_token.lexpos = token.lexpos
         else:
-            asi_token.lineno = 0
-            asi_token.lexpos = 0
+            # At the end of the input
+            asi_token.lineno = self.lexer.lineno
+            asi_token.lexpos = min(self.lexer.lexpos,
+                                   len(self.lexer.lexdata))
         return asi_token
         
     def auto_semicolon(self, token):
@@ -321,26 +532,6 @@ class Lexer(object):
         """Return True if the previous token was a line terminator"""
         return self.prev_token and self.prev_token.type == 'LINE_TERMINATOR'
 
-    def scan_regexp(self, start_value):
-        """Read a regular expression literal
-        
-        This method switches the lexer to the 'regex' state and parses
-        the tokens RE_BODY and RE_END.
-        
-        """
-        self.lexer.begin('regex')
-        token = self.token()
-        if token.type == 'RE_BODY':
-            pattern = token.value
-        
-        token = self.token()
-        if token.type != 'RE_END':
-            raise SyntaxError("Invalid Regular Expression")
-        flags = token.value[1:]
-        
-        self.lexer.begin('INITIAL')
-        return pattern, flags
-
     @property
     def lineno(self):
         return self.lexer and self.lexer.lineno
@@ -349,6 +540,8 @@ class Lexer(object):
     def lexpos(self):
         return self.lexer and self.lexer.lexpos
 
+Lexer._prepare_tokens()
+
     
 if __name__ == "__main__":
     lexer = Lexer()
@@ -0,0 +1,99 @@
+"""
+    jsparser.limits
+    ~~~~~~~~~~~~~~~
+
+    Resource budgets for parsing untrusted input
+
+    :copyright: Copyright 2009 Michael van Tellingen
+    :license: BSD
+
+"""
+import time
+
+
+class Limits(object):
+    """Budget for ``Parser.parse(input, limits=...)``, limits which are None
+    aren't checked.
+
+    - `max_tokens`: number of tokens read from the lexer
+    - `max_nodes`: number of values created by the grammar actions, which
+      are the nodes and the lists holding them
+    - `max_depth`: size of the parser stack, which grows with the nesting of
+      the input
+    - `deadline`: ``time.time()`` by which the parse must be done
+
+    """
+
+    def __init__(self, max_tokens=None, max_nodes=None, max_depth=None,
+                 deadline=None):
+        self.max_tokens = max_tokens
+        self.max_nodes = max_nodes
+        self.max_depth = max_depth
+        self.deadline = deadline
+
+
+class ParseLimitExceeded(Exception):
+    """Raised when a parse exceeds one of its Limits. `limit` is the name of
+    the limit, the other attributes give the progress of the parse.
+
+    """
+
+    def __init__(self, limit, tokens, nodes, depth, lineno, lexpos):
+        Exception.__init__(
+            self, "%s exceeded at %d:%d after %d tokens and %d nodes" % (
+                limit, lineno, lexpos, tokens, nodes))
+        self.limit = limit
+        self.tokens = tokens
+        self.nodes = nodes
+        self.depth = depth
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+
+class Budget(object):
+    """The usage of the Limits during a single parse.
+
+    `token` is passed to ply as the token function and checks the token,
+    depth and time limits, `reduced()` is called after every grammar action
+    and counts the new values.
+
+    """
+
+    def __init__(self, limits, lexer, yacc):
+        self.limits = limits
+        self.lexer = lexer
+        self.yacc = yacc
+        self.tokens = 0
+        self.nodes = 0
+
+    def token(self):
+        limits = self.limits
+        self.tokens += 1
+        if limits.max_tokens is not None and self.tokens > limits.max_tokens:
+            self.exceeded('max_tokens')
+        if limits.max_depth is not None and \
+           len(self.yacc.symstack) > limits.max_depth:
+            self.exceeded('max_depth')
+        if limits.deadline is not None and time.time() > limits.deadline:
+            self.exceeded('deadline')
+        return self.lexer.token()
+
+    def reduced(self, p):
+        symbols = p.slice
+        value = symbols[0].value
+        if value is None:
+            return
+        # Rules like ``A : B`` and lists which are appended to pass on an
+        # existing value
+        for index in xrange(1, len(symbols)):
+            if symbols[index].value is value:
+                return
+        self.nodes += 1
+        if self.limits.max_nodes is not None and \
+           self.nodes > self.limits.max_nodes:
+            self.exceeded('max_nodes')
+
+    def exceeded(self, limit):
+        raise ParseLimitExceeded(limit, self.tokens, self.nodes,
+                                 len(self.yacc.symstack), self.lexer.lineno,
+                                 self.lexer.lexpos)
@@ -0,0 +1,106 @@
+"""
+    jsparser.lint
+    ~~~~~~~~~~~~~
+
+    Runs many lint rules in a single walk over the syntax tree
+
+    :copyright: Copyright 2009 Michael van Tellingen
+    :license: BSD
+
+"""
+from pyjsparser import ast
+
+
+class Diagnostic(object):
+    """A finding of the rule named `rule` about `node`"""
+
+    def __init__(self, rule, message, node):
+        self.rule = rule
+        self.message = message
+        self.node = node
+
+    @property
+    def lexpos(self):
+        """Position of the node, only set when parsing with tracking"""
+        return self.node.lexpos
+
+    def __repr__(self):
+        return "<lint.Diagnostic(rule=%r, message=%r)>" % (
+            self.rule, self.message)
+
+
+class Rule(object):
+    """Base class of the lint rules. `classes` are the ast classes whose
+    nodes (including subclasses) are passed to `check()`, ast.Node for all
+    nodes. `name` defaults to the name of the class. Subclasses must set
+    `classes` and override `check()`, Linter refuses rules which don't.
+
+    """
+    name = None
+    classes = ()
+
+    def __init__(self):
+        if self.name is None:
+            self.name = self.__class__.__name__
+
+    def check(self, node, context):
+        """Check the node, findings are added with `report()`. Overridden
+        by the subclasses, or set on the instance.
+
+        """
+
+    def report(self, context, node, message):
+        context.diagnostics.append(Diagnostic(self.name, message, node))
+
+
+class Context(object):
+    """State of a lint run which is passed to the rules. `path` holds the
+    ancestors of the checked node from `root` down, followed by the node.
+
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.path = []
+        self.diagnostics = []
+
+
+class Linter(object):
+    """Runs `rules` over a tree. The rules interested in each node class
+    are looked up once and cached in a dispatch table, so `lint()` walks
+    the tree once and only calls the rules for the nodes they registered.
+
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        for rule in self.rules:
+            if 'check' not in vars(rule) and type(rule).check == Rule.check:
+                raise TypeError("%s doesn't override check()" % rule.name)
+            if not rule.classes:
+                raise ValueError("%s has no classes" % rule.name)
+        self._table = {}
+
+    def _checks(self, cls):
+        checks = self._table.get(cls)
+        if checks is None:
+            checks = self._table[cls] = tuple([
+                rule.check for rule in self.rules
+                if issubclass(cls, rule.classes)])
+        return checks
+
+    def lint(self, root):
+        """Return the list of Diagnostics for the tree below `root`, in the
+        order of ast.walk() and of the rules. This is source order, except
+        that the condition of a do-while loop comes before its body.
+
+        """
+        context = Context(root)
+        table = self._table
+        for node, depth in ast.walk_paths(root, context.path):
+            checks = table.get(node.__class__)
+            if checks is None:
+                checks = self._checks(node.__class__)
+            for check in checks:
+                check(node, context)
+        return context.diagnostics
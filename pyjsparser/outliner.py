@@ -0,0 +1,172 @@
+"""
+    jsparser.outliner
+    ~~~~~~~~~~~~~~~~~
+
+    Outline of the functions, variables and object literal members of a
+    source, built from the token stream without running the parser
+
+    :copyright: Copyright 2009 Michael van Tellingen
+    :license: BSD
+
+"""
+from pyjsparser.lexer import Lexer
+
+
+FUNCTION = 'function'
+VARIABLE = 'variable'
+PROPERTY = 'property'
+
+
+class OutlineEntry(object):
+    """A function, variable or object literal member of the outline.
+
+    `name` is the identifier (or the string / number literal of a property)
+    as written in the source and None for anonymous functions. Functions
+    span from the function keyword to the closing brace, variables and
+    properties from their name to the end of their value.
+
+    """
+
+    def __init__(self, kind, name, lexpos, endlexpos=None):
+        self.kind = kind
+        self.name = name
+        self.lexpos = lexpos
+        self.endlexpos = endlexpos
+        self.children = []
+
+    def __repr__(self):
+        return "<OutlineEntry(kind=%r, name=%r, lexpos=%r, endlexpos=%r)>" % (
+            self.kind, self.name, self.lexpos, self.endlexpos)
+
+
+# Tokens after which a '{' opens a block instead of an object literal,
+# unless the colon belongs to a property or a ?: expression
+block_preceding = frozenset([
+    'SEMI', 'LBRACE', 'RBRACE', 'RPAREN', 'ELSE', 'DO', 'TRY',
+    'FINALLY', 'COLON',
+])
+
+# Tokens which can end an expression and start the next statement, used to
+# find the end of a var declaration with an automatic semicolon
+expression_ending = frozenset([
+    'ID', 'NUMBER_LITERAL', 'STRING_LITERAL', 'REGEX_LITERAL', 'RPAREN',
+    'RBRACKET', 'RBRACE', 'THIS', 'TRUE', 'FALSE', 'NULL', 'INCR', 'DECR',
+])
+statement_starting = frozenset([
+    'ID', 'NUMBER_LITERAL', 'STRING_LITERAL', 'LBRACE', 'THIS', 'TRUE',
+    'FALSE', 'NULL', 'VAR', 'IF', 'FOR', 'WHILE', 'DO', 'RETURN', 'BREAK',
+    'CONTINUE', 'THROW', 'TRY', 'SWITCH', 'FUNCTION', 'NEW', 'DELETE',
+    'TYPEOF', 'VOID', 'WITH', 'DEBUGGER', 'INCR_NO_LT', 'DECR_NO_LT',
+])
+
+openers = {'LBRACE': 'block', 'LPAREN': 'paren', 'LBRACKET': 'bracket'}
+closers = frozenset(['RBRACE', 'RPAREN', 'RBRACKET'])
+
+
+def outline(source):
+    """Return the outline of `source` as a list of OutlineEntry objects,
+    with the entries found inside a function or a value in their
+    `children`.
+
+    Only the lexer is run, with a small state machine which tracks the
+    nesting of brackets. This is several times faster than a full parse,
+    but doesn't detect syntax errors.
+
+    """
+    lexer = Lexer()
+    lexer.input(source)
+    tokens = list(lexer)
+
+    root = OutlineEntry(None, None, 0, len(source))
+    # Open brackets as [type, function entry, pending ?: count]
+    frames = [['block', None, 0]]
+    # Open entries as (entry, depth of the frame it ends in)
+    entries = [(root, None)]
+    var_depth = None
+    expression_colon = False
+    prev = None
+
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        type = token.type
+        depth = len(frames)
+
+        # Close the variables and properties ended by this token
+        while entries[-1][1] == depth:
+            entry = entries[-1][0]
+            if type == 'COMMA' or type == 'SEMI' or type in closers:
+                pass
+            elif entry.kind == VARIABLE and (
+                    type == 'IN' and frames[-1][0] == 'paren' or
+                    _line_break_before(token, prev) and
+                    prev.type in expression_ending and
+                    type in statement_starting):
+                pass
+            else:
+                break
+            entry.endlexpos = prev.endlexpos
+            entries.pop()
+            if entry.kind == VARIABLE and type == 'COMMA':
+                var_depth = depth
+
+        if type == 'VAR':
+            var_depth = depth
+        elif type == 'ID' and var_depth == depth:
+            var_depth = None
+            entry = OutlineEntry(VARIABLE, token.value, token.lexpos)
+            entries[-1][0].children.append(entry)
+            entries.append((entry, depth))
+        elif type == 'FUNCTION':
+            entry = OutlineEntry(FUNCTION, None, token.lexpos)
+            if index + 1 < len(tokens) and tokens[index + 1].type == 'ID':
+                entry.name = tokens[index + 1].value
+            entries[-1][0].children.append(entry)
+            entries.append((entry, None))
+            # Skip the parameters up to the body
+            while index + 1 < len(tokens) and tokens[index].type != 'LBRACE':
+                index += 1
+            frames.append(['function', entry, 0])
+            token = tokens[index]
+        elif type == 'LBRACE' and prev is not None and (
+                prev.type not in block_preceding or
+                prev.type == 'COLON' and expression_colon):
+            frames.append(['object', None, 0])
+        elif type in openers:
+            frames.append([openers[type], None, 0])
+        elif type in closers:
+            if len(frames) > 1:
+                frame = frames.pop()
+                if frame[1] is not None:
+                    frame[1].endlexpos = token.endlexpos
+                    while entries.pop()[0] is not frame[1]:
+                        pass
+        elif type == 'CONDOP':
+            frames[-1][2] += 1
+        elif type == 'COLON':
+            expression_colon = frames[-1][0] == 'object' or frames[-1][2] > 0
+            if frames[-1][2]:
+                frames[-1][2] -= 1
+        elif frames[-1][0] == 'object' and prev.type in ('LBRACE', 'COMMA') \
+             and index + 1 < len(tokens) and \
+             tokens[index + 1].type == 'COLON':
+            entry = OutlineEntry(PROPERTY, token.value, token.lexpos)
+            entries[-1][0].children.append(entry)
+            entries.append((entry, depth))
+
+        prev = token
+        index += 1
+
+    for entry, depth in entries[1:]:
+        if entry.endlexpos is None:
+            entry.endlexpos = prev.endlexpos
+    return root.children
+
+
+def _line_break_before(token, prev):
+    """Return True if a line terminator separates `token` from `prev`"""
+    if token.type in ('INCR_NO_LT', 'DECR_NO_LT'):
+        # These replace the line terminator before them and carry its line
+        # number and position, which are those of the previous line
+        return True
+    return token.lineno > prev.lineno
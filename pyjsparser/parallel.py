@@ -0,0 +1,139 @@
+"""
+    jsparser.parallel
+    ~~~~~~~~~~~~~~~~~
+
+    Parse a single large file in chunks of top-level statements using a
+    pool of processes
+
+    :copyright: Copyright 2009 Michael van Tellingen
+    :license: BSD
+
+"""
+import multiprocessing
+
+from pyjsparser import ast
+from pyjsparser.lexer import Lexer, LexerError
+from pyjsparser.parser import Parser
+
+
+def split_statements(source, size):
+    """Return the offsets at which `source` can be split into chunks of
+    complete top-level statements, each chunk at least `size` characters
+    long. The first offset is 0 and the last is len(source).
+
+    A chunk may only end after a ';' outside of any brackets which isn't
+    followed by 'else' or 'while' (if / do-while statements continue after
+    the semicolon). After a lexer error the rest of the source is a single
+    chunk, its parse reports the error.
+
+    """
+    lexer = Lexer()
+    lexer.input(source)
+    offsets = [0]
+    depth = 0
+    boundary = None
+
+    try:
+        for token in lexer:
+            if boundary is not None:
+                if token.type not in ('ELSE', 'WHILE'):
+                    offsets.append(boundary)
+                boundary = None
+
+            if token.type in ('LBRACE', 'LPAREN', 'LBRACKET'):
+                depth += 1
+            elif token.type in ('RBRACE', 'RPAREN', 'RBRACKET'):
+                depth -= 1
+            elif token.type == 'SEMI' and depth == 0 and \
+                 token.lexpos - offsets[-1] >= size:
+                # Semicolons inserted by the lexer have no end position
+                boundary = getattr(token, 'endlexpos', None)
+    except LexerError:
+        pass
+
+    if boundary is not None:
+        offsets.append(boundary)
+    if offsets[-1] != len(source):
+        offsets.append(len(source))
+    return offsets
+
+
+def parse(source, processes=None, tracking=False, chunks_per_process=4):
+    """Parse `source` into a single ast.Program, parsing chunks of top-level
+    statements in `processes` worker processes (defaults to the number of
+    CPUs). The statements are identical to those of
+    ``Parser(tracking=tracking).parse(source)``, with the node spans
+    relative to the whole source when tracking.
+
+    """
+    processes = processes or multiprocessing.cpu_count()
+    if processes == 1:
+        # Nothing to gain from splitting the source
+        return Parser(tracking=tracking).parse(source)
+
+    size = len(source) // (processes * chunks_per_process) or 1
+    offsets = split_statements(source, size)
+    chunks = []
+    lineno = 0
+    for start, end in zip(offsets, offsets[1:]):
+        chunks.append((source[start:end], start, lineno))
+        lineno += source.count('\n', start, end)
+
+    if len(chunks) == 1:
+        parser = Parser(tracking=tracking)
+        results = [_parse_chunk(chunk, parser) for chunk in chunks]
+    else:
+        pool = multiprocessing.Pool(processes, _init_worker, (tracking,))
+        try:
+            results = pool.map(_parse_chunk, chunks, chunksize=1)
+        finally:
+            pool.terminate()
+
+    statements = []
+    for chunk_statements, error in results:
+        if error:
+            # Raise the first error, like a sequential parse would
+            kind, message, lineno, lexpos = error
+            if kind == 'lexer':
+                raise LexerError(message, lineno, lexpos)
+            error = SyntaxError(message)
+            error.lineno = lineno
+            error.lexpos = lexpos
+            raise error
+        statements.extend(chunk_statements)
+    return ast.Program(statements)
+
+
+# Parser of a worker process of the pool
+_parser = None
+
+def _init_worker(tracking):
+    global _parser
+    _parser = Parser(tracking=tracking)
+
+
+def _parse_chunk(chunk, parser=None):
+    """Parse a chunk with `parser` (the parser of the worker by default)
+    and move the spans of its nodes to the offset of the chunk in the
+    whole source. Returns the statements and the error as
+    ('syntax' or 'lexer', message, lineno, lexpos) if the chunk is
+    invalid; the position attributes of a SyntaxError don't survive
+    pickling.
+
+    """
+    parser = parser or _parser
+    source, offset, lineno = chunk
+    try:
+        program = parser.parse(source)
+    except SyntaxError, e:
+        return None, ('syntax', e.msg, e.lineno + lineno, e.lexpos + offset)
+    except LexerError, e:
+        return None, ('lexer', e.msg, e.lineno + lineno, e.lexpos + offset)
+
+    if parser.tracking and offset:
+        for statement in ast.iter_child_nodes(program):
+            for node in ast.walk(statement):
+                if node.lexpos is not None:
+                    node.lexpos += offset
+                    node.endlexpos += offset
+    return program.statements, None
@@ -8,13 +8,43 @@
     :license: BSD
     
 """
+import copy
+import gc
+import threading
+
 import ply.yacc
 import ply.lex
 import re
 
-from pyjsparser.lexer import Lexer
+from pyjsparser.lexer import Lexer, LexerError
+from pyjsparser.builder import EventBuilder, IndexBuilder
+from pyjsparser.driver import Driver
+from pyjsparser.limits import Budget
 from pyjsparser import ast
 
+
+# Number of parses which paused the garbage collector, the state of the
+# collector before the first of them
+_gc_lock = threading.Lock()
+_gc_pauses = 0
+_gc_was_enabled = False
+
+def _pause_gc():
+    global _gc_pauses, _gc_was_enabled
+    with _gc_lock:
+        if not _gc_pauses:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pauses += 1
+
+def _resume_gc():
+    global _gc_pauses
+    with _gc_lock:
+        _gc_pauses -= 1
+        if not _gc_pauses and _gc_was_enabled:
+            gc.enable()
+
+
 class Parser(object):
     """
     Grammar for ECMAScript 5 (ECMA-262 Final Draft, 5th edition april 2009)
@@ -26,38 +56,96 @@ class Parser(object):
     
     The grammer contains 1 shift/reduce conflict caused by the if/else clause,
     which is harmless.
+
+    Nodes are created through `builder`, which defaults to the ast module.
+    See pyjsparser.builder.Builder for building other types of nodes.
+
+    With `lazy_functions` the bodies of functions are skipped by the lexer
+    and only parsed when the `statements` of the ast.LazyFuncDecl created
+    for them are used.
+
+    Identifier names and short strings are interned per parse, pass a dict
+    as `intern_table` to share them between all inputs of a batch.
+
+    With `pause_gc` the cyclic garbage collector is disabled during
+    `parse()`. The parser creates many container objects, which makes the
+    collector run often and scan the growing tree each time. The tree
+    doesn't contain reference cycles, so reference counting frees it.
+    The collector is enabled again when the last of the parses running at
+    the same time is done, if it was enabled before the first.
+
+    With `index` the nodes are recorded while parsing and `parse()` sets
+    an ast.NodeIndex as the `index` of the Program, which lists the nodes
+    of each class (e.g. ``program.index[ast.FuncCall]``) in source order.
+    The bodies of lazy functions aren't included.
     """
-    def __init__(self, debug=False, tracking=False):
+    def __init__(self, debug=False, tracking=False, builder=None,
+                 lazy_functions=False, intern_table=None, pause_gc=False,
+                 index=False):
         self.lexer = Lexer()
+        self.lexer.lazy_functions = lazy_functions
+        self.lexer.intern_table = intern_table
         self.debug = debug 
         self.tracking = tracking
-        self.tokens = self.lexer.tokens
-        optionals = (
-            'FormalParameterList',
-            'SourceElements',
-            'StatementList',
-            'Elision',
-            'Expression',
-            'ExpressionNoIn',
-            'Identifier',
-            'Initialiser',
-            'InitialiserNoIn',
-            'CaseClauses',
-            
-        )
-        for rulename in optionals:
-            self._create_opt_rule(rulename)
+        self.builder = builder or ast
+        self.pause_gc = pause_gc
+        self.index = index
+        self._retain_statements = True
+        self._top_level = None
+        self._validator = None
+        self._limited = None
+        self._budget = None
+        self._body_parser = None
+        self.yacc = self._bind_grammar()
+        if tracking:
+            self._track_positions()
+
+    tokens = Lexer.tokens
+
+    _grammar = None
+    _grammar_lock = threading.Lock()
+
+    @classmethod
+    def _get_grammar(cls):
+        """Return the ply parser built from the grammar of the class.
+
+        It is built once, with the unbound methods, and only used as a
+        template for the parsers of the instances. The parse tables are
+        shared and never modified.
 
+        """
+        grammar = cls.__dict__.get('_grammar')
+        if grammar is None:
+            with cls._grammar_lock:
+                grammar = cls.__dict__.get('_grammar')
+                if grammar is None:
+                    grammar = cls._grammar = ply.yacc.yacc(
+                        module=cls, start='Program', optimize=0,
+                        tabmodule="tab_yacc")
+        return grammar
+
+    def _bind_grammar(self):
+        """Return a copy of the grammar's ply parser with the actions bound
+        to this instance.
 
-        self.yacc = ply.yacc.yacc(module=self,
-                                  start='Program',
-                                  optimize=0,
-                                  tabmodule="tab_yacc")
-                                  
+        """
+        grammar = self._get_grammar()
+        yacc = copy.copy(grammar)
+        yacc.productions = []
+        for production in grammar.productions:
+            # Only the fields used while parsing, cheaper than a copy
+            production = ply.yacc.MiniProduction(
+                production.str, production.name, production.len,
+                production.func, production.file, production.line)
+            if production.func:
+                production.callable = getattr(self, production.func)
+            yacc.productions.append(production)
+        yacc.errorfunc = self.p_error
+        return yacc
 
-    
     # From plycparser:
-    def _create_opt_rule(self, rulename):
+    @classmethod
+    def _create_opt_rule(cls, rulename):
         """ Given a rule name, creates an optional ply.yacc rule
             for it. The name of the optional rule is
             <rulename>_opt
@@ -69,13 +157,232 @@ class Parser(object):
     
         optrule.__doc__ = '%s : empty\n| %s' % (optname, rulename)
         optrule.__name__ = 'p_%s' % optname
-        setattr(self.__class__, optrule.__name__, optrule)    
+        setattr(cls, optrule.__name__, optrule)    
+
+    def _track_positions(self):
+        """Wrap the grammar actions so that the nodes they create get the
+        lexpos / endlexpos span of the reduced symbol.
+        
+        """
+        for production in self.yacc.productions:
+            if production.callable is not None:
+                production.callable = self._span_action(production.callable)
+
+    def _span_action(self, action):
+        def span_action(p):
+            action(p)
+            value = p[0]
+            if isinstance(value, list):
+                # Lists only get new nodes appended, stop at the first node
+                # which already has a span
+                for node in reversed(value):
+                    if not isinstance(node, ast.Node) or \
+                       node.lexpos is not None:
+                        break
+                    node.lexpos, node.endlexpos = p.lexspan(0)
+            elif isinstance(value, ast.Node) and value.lexpos is None:
+                value.lexpos, value.endlexpos = p.lexspan(0)
+        return span_action
+
+    def parse(self, input, limits=None):
+        """Parse `input` and return the ast.Program.
+
+        With `limits` (a pyjsparser.limits.Limits) the parse raises
+        ParseLimitExceeded once it exceeds one of them.
+
+        """
+        if self.pause_gc:
+            _pause_gc()
+            try:
+                return self._parse(input, limits)
+            finally:
+                _resume_gc()
+        return self._parse(input, limits)
+
+    def _parse(self, input, limits):
+        yacc = self.yacc
+        tokenfunc = None
+        if limits is not None:
+            if self._limited is None:
+                self._limited = self._copy_yacc(self._limited_action)
+            yacc = self._limited
+            self._budget = Budget(limits, self.lexer, yacc)
+            tokenfunc = self._budget.token
+        builder = self.builder
+        # parse_events() doesn't build a tree to index
+        index = self.index and self._retain_statements
+        if index:
+            if self.lexer.lazy_functions:
+                # Before the builder is wrapped
+                self._get_body_parser()
+            self.builder = IndexBuilder(builder)
+        try:
+            program = yacc.parse(input,
+                                 lexer=self.lexer,
+                                 debug=self.debug,
+                                 tracking=self.tracking,
+                                 tokenfunc=tokenfunc)
+            if index:
+                program.index = self.builder.index()
+            return program
+        finally:
+            self.builder = builder
+            self._budget = None
+            # The symbol stack would keep the tree alive until the next parse
+            del yacc.symstack[:]
+
+    def _limited_action(self, action):
+        def limited_action(p):
+            action(p)
+            self._budget.reduced(p)
+        return limited_action
+
+    def parse_body(self, input, start, end):
+        """Parse the function body between `start` and `end` of `input` and
+        return its statements. Used by ast.LazyFuncDecl.
+
+        """
+        statements = []
+        self._top_level = statements
+        self.lexer.input(input, start, end)
+        try:
+            self.yacc.parse(lexer=self.lexer,
+                            debug=self.debug,
+                            tracking=self.tracking)
+        finally:
+            self._top_level = None
+            del self.yacc.symstack[:]
+        return statements
+
+    def iter_parse(self, input):
+        """Generator which yields the top-level statements and function
+        declarations of `input` as soon as they have been parsed. The parser
+        doesn't keep them afterwards.
+
+        """
+        pending = []
+        self._top_level = pending
+        self.lexer.input(input)
+        try:
+            for step in Driver(self.yacc, self.lexer, self.tracking):
+                while pending:
+                    yield pending.pop(0)
+        finally:
+            self._top_level = None
+            del self.yacc.symstack[:]
+        for element in pending:
+            yield element
+
+    def parse_steps(self, input, max_tokens=1000):
+        """Generator which parses `input` in slices of `max_tokens` tokens.
+
+        None is yielded after every slice and the parser and lexer keep
+        their state until the generator is resumed, so an event loop can
+        run other work in between. The last value is the ast.Program.
+
+        """
+        self.lexer.input(input)
+        driver = Driver(self.yacc, self.lexer, self.tracking, max_tokens)
+        try:
+            for index, step in enumerate(driver):
+                # The first step is before any token has been read
+                if index:
+                    yield None
+        finally:
+            del self.yacc.symstack[:]
+        yield driver.result
+
+    def parse_events(self, input, handler):
+        """Parse `input` without building a tree, reporting every node to
+        ``handler.node(kind, fields)`` as soon as it has been reduced.
+
+        Nodes are reported bottom-up (children before their parent). Lists
+        of statements aren't kept either, so memory use doesn't grow with
+        the number of statements. Other lists, such as the elements of an
+        array literal or the arguments of a call, are still built (holding
+        None for each item) until their node is reported.
 
-    def parse(self, input):
-        return self.yacc.parse(input,
-                               lexer=self.lexer,
-                               debug=self.debug,
-                               tracking=self.tracking)
+        """
+        builder = self.builder
+        self.builder = EventBuilder(handler)
+        self._retain_statements = False
+        try:
+            self.parse(input)
+        finally:
+            self.builder = builder
+            self._retain_statements = True
+
+    def validate(self, input):
+        """Check the syntax of `input` without building an AST.
+
+        The same grammar is run with actions that do nothing. Returns a list
+        of (lineno, lexpos, message) tuples, which is empty when the input
+        is valid.
+
+        """
+        if self._validator is None:
+            self._validator = self._create_validator()
+        lazy_functions = self.lexer.lazy_functions
+        self.lexer.lazy_functions = False
+        try:
+            self._validator.parse(input, lexer=self.lexer)
+        except SyntaxError, e:
+            return [(e.lineno, e.lexpos, e.msg)]
+        except LexerError, e:
+            return [(e.lineno, e.lexpos, str(e))]
+        finally:
+            self.lexer.lazy_functions = lazy_functions
+        return []
+
+    def _create_validator(self):
+        """Return a copy of the yacc parser which shares the parse tables,
+        but runs a no-op action for every production.
+
+        """
+        def noop(p):
+            pass
+
+        return self._copy_yacc(lambda action: noop)
+
+    def _copy_yacc(self, wrap):
+        """Return a copy of the yacc parser which shares the parse tables,
+        with ``wrap(action)`` as the action of every production.
+
+        """
+        yacc = copy.copy(self.yacc)
+        yacc.productions = []
+        for production in self.yacc.productions:
+            production = copy.copy(production)
+            if production.callable is not None:
+                production.callable = wrap(production.callable)
+            yacc.productions.append(production)
+        yacc.errorfunc = lambda p: self._handle_error(yacc, p)
+        return yacc
+
+    def _lazy_function(self, p):
+        """Return the LazyFuncDecl for a function with a FUNCTION_BODY"""
+        start, end = p[6]
+        return self.builder.LazyFuncDecl(node=p[2], parameters=p[4],
+                                         source=self.lexer.lexer.lexdata,
+                                         start=start, end=end,
+                                         parser=self._get_body_parser())
+
+    def _get_body_parser(self):
+        if self._body_parser is None:
+            # A separate parser, the bodies may be parsed while this one is
+            # suspended in iter_parse
+            self._body_parser = Parser(debug=self.debug,
+                                       tracking=self.tracking,
+                                       builder=self.builder,
+                                       lazy_functions=True,
+                                       intern_table=self.lexer.intern_table)
+            self._body_parser._body_parser = self._body_parser
+        return self._body_parser
+
+    @property
+    def comments(self):
+        """The CommentTable of the last parsed input"""
+        return self.lexer.comments
     
     # Precedence rules
     precedence = (
@@ -112,15 +419,26 @@ class Parser(object):
         """auto_semicolon : error """
 
     def p_error(self, p):
+        return self._handle_error(self.yacc, p)
+
+    def _handle_error(self, yacc, p):
+        """Insert an automatic semicolon if allowed, raise a SyntaxError
+        with lineno and lexpos attributes otherwise.
+
+        """
         if (p and p.type != 'SEMI') or not p:
             next_token = self.lexer.auto_semicolon(p)
             if next_token:
-                self.yacc.errok()
+                yacc.errok()
                 return next_token
 
-        raise SyntaxError("%r (%s) unexpected at %d:%d (between %r and %r)" % (
-            p.value, p.type, p.lineno, p.lexpos, self.lexer.prev_token,
-            self.lexer.token()))
+        error = SyntaxError(
+            "%r (%s) unexpected at %d:%d (between %r and %r)" % (
+                p.value, p.type, p.lineno, p.lexpos, self.lexer.prev_token,
+                self.lexer.token()))
+        error.lineno = p.lineno
+        error.lexpos = p.lexpos
+        raise error
 
     #
     # 7. Lexical Conventions
@@ -134,11 +452,11 @@ class Parser(object):
         
     def p_SingleLineComment(self, p):
         """SingleLineComment : LINE_COMMENT"""
-        p[0] = ast.LineComment(p[1])
+        p[0] = self.builder.LineComment(p[1])
 
     def p_MultiLineComment(self, p):
         """MultiLineComment : BLOCK_COMMENT"""
-        p[0] = ast.BlockComment(p[1])
+        p[0] = self.builder.BlockComment(p[1])
 
     def p_IdentifierName(self, p):
         """IdentifierName : Identifier"""
@@ -146,41 +464,40 @@ class Parser(object):
 
     def p_Identifier(self, p):
         """Identifier : ID"""
-        p[0] = ast.Identifier(p[1])
+        p[0] = self.builder.Identifier(p[1])
 
-    # TODO: Note that the RegularExpressionLiteral doesn't belong here
-    # according to the ecmascript standard
     def p_Literal(self, p):
         """Literal : NullLiteral
                    | BooleanLiteral
                    | NumericLiteral
                    | StringLiteral
-                   | RegexStart DIVIDE
-                   | RegexStart DIVIDE_EQUALS"""
+                   | RegularExpressionLiteral"""
         p[0] = p[1]
         
     def p_NullLiteral(self, p):
         """NullLiteral : NULL """
-        p[0] = ast.Null()
+        p[0] = self.builder.Null()
 
     def p_BooleanLiteral(self, p):
         """BooleanLiteral : TRUE
                           | FALSE"""
-        p[0] = ast.Boolean(p[1])
+        p[0] = self.builder.Boolean(p[1])
         
     # TODO
     def p_NumericLiteral(self, p):
         """NumericLiteral : NUMBER_LITERAL"""
-        p[0] = ast.Number(p[1])
+        p[0] = self.builder.Number(p[1])
         
     def p_StringLiteral(self, p):
         """StringLiteral : STRING_LITERAL"""
-        p[0] = ast.String(data=p[1])
-
-    def p_RegexStart(self, p): 
-        """RegexStart : """
-        pattern, flags = self.lexer.scan_regexp(start_value='/')
-        p[0] = ast.RegEx(pattern=pattern, flags=flags)
+        p[0] = self.builder.String(data=p[1])
+
+    # The lexer decides between a division and a regular expression based
+    # on the previous token
+    def p_RegularExpressionLiteral(self, p):
+        """RegularExpressionLiteral : REGEX_LITERAL"""
+        end = p[1].rindex('/')
+        p[0] = self.builder.RegEx(pattern=p[1][1:end], flags=p[1][end + 1:])
         
     #
     # 11. Expressions
@@ -205,12 +522,12 @@ class Parser(object):
     # TODO: Elision support is not implemented correctly
     def p_ArrayLiteral_1(self, p):
         """ArrayLiteral : LBRACKET Elision_opt RBRACKET"""
-        p[0] = ast.Array(items=None)
+        p[0] = self.builder.Array(items=None)
         
     def p_ArrayLiteral_2(self, p):
         """ArrayLiteral : LBRACKET ElementList RBRACKET
                         | LBRACKET ElementList COMMA Elision_opt RBRACKET"""
-        p[0] = ast.Array(items=p[2])
+        p[0] = self.builder.Array(items=p[2])
 
     def p_ElementList(self, p):
         """ElementList : Elision_opt AssignmentExpression
@@ -233,7 +550,7 @@ class Parser(object):
         """ObjectLiteral : LBRACE RBRACE
                          | LBRACE PropertyNameAndValueList RBRACE
                          | LBRACE PropertyNameAndValueList COMMA RBRACE"""
-        p[0] = ast.Object(properties=p[2] if len(p) > 3 else [])
+        p[0] = self.builder.Object(properties=p[2] if len(p) > 3 else [])
                          
     def p_PropertyNameAndValueList(self, p):
         """PropertyNameAndValueList : PropertyAssignment 
@@ -250,7 +567,8 @@ class Parser(object):
                               #      LPAREN PropertySetParameterList RPAREN \
                               #      LBRACE FunctionBody RBRACE """
         if len(p) == 4:
-            p[0] = ast.Assign(node=p[1], operator=p[2], expression=p[3])
+            p[0] = self.builder.Assign(node=p[1], operator=p[2],
+                                       expression=p[3])
             
     def p_PropertyName(self, p):
         """PropertyName : IdentifierName
@@ -273,11 +591,11 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         elif p[1] == 'new':
-            p[0] = ast.New(identifier=p[2], arguments=p[3])
+            p[0] = self.builder.New(identifier=p[2], arguments=p[3])
         elif p[2] == '.':
-            p[0] = ast.DotAccessor(node=p[1], element=p[3])
+            p[0] = self.builder.DotAccessor(node=p[1], element=p[3])
         else:
-            p[0] = ast.BracketAccessor(node=p[1], element=p[3])
+            p[0] = self.builder.BracketAccessor(node=p[1], element=p[3])
             
     def p_MemberExpressionNoBF(self, p):
         """MemberExpressionNoBF : PrimaryExpressionNoObj 
@@ -287,11 +605,11 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         elif p[1] == 'new':
-            p[0] = ast.New(identifier=p[2], arguments=p[3])
+            p[0] = self.builder.New(identifier=p[2], arguments=p[3])
         elif p[2] == '.':
-            p[0] = ast.DotAccessor(node=p[1], element=p[3])
+            p[0] = self.builder.DotAccessor(node=p[1], element=p[3])
         else:
-            p[0] = ast.BracketAccessor(node=p[1], element=p[3])
+            p[0] = self.builder.BracketAccessor(node=p[1], element=p[3])
 
     def p_NewExpression(self, p):
         """NewExpression : MemberExpression
@@ -299,7 +617,7 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.New(identifier=p[2])
+            p[0] = self.builder.New(identifier=p[2])
 
     def p_NewExpressionNoBF(self, p):
         """NewExpressionNoBF : MemberExpressionNoBF
@@ -307,33 +625,33 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.New(identifier=p[2])
+            p[0] = self.builder.New(identifier=p[2])
 
     def p_CallExpression_1(self, p):
         """CallExpression : MemberExpression Arguments
                           | CallExpression Arguments"""
-        p[0] = ast.FuncCall(node=p[1], arguments=p[2])
+        p[0] = self.builder.FuncCall(node=p[1], arguments=p[2])
     
     def p_CallExpression_2(self, p):
         """CallExpression : CallExpression LBRACKET Expression RBRACKET
                           | CallExpression PERIOD IdentifierName"""
         if len(p) == 4:
-            p[0] = ast.DotAccessor(node=p[1], element=p[3])
+            p[0] = self.builder.DotAccessor(node=p[1], element=p[3])
         else:
-            p[0] = ast.BracketAccessor(node=p[1], element=p[3])
+            p[0] = self.builder.BracketAccessor(node=p[1], element=p[3])
 
     def p_CallExpressionNoBF_1(self, p):
         """CallExpressionNoBF : MemberExpressionNoBF Arguments
                               | CallExpressionNoBF Arguments"""
-        p[0] = ast.FuncCall(node=p[1], arguments=p[2])
+        p[0] = self.builder.FuncCall(node=p[1], arguments=p[2])
         
     def p_CallExpressionNoBF_2(self, p):
         """CallExpressionNoBF : CallExpressionNoBF LBRACKET Expression RBRACKET
                               | CallExpressionNoBF PERIOD IdentifierName"""
         if p[2] == '.':
-            p[0] = ast.DotAccessor(node=p[1], element=p[3])
+            p[0] = self.builder.DotAccessor(node=p[1], element=p[3])
         else:
-            p[0] = ast.BracketAccessor(node=p[1], element=p[3])
+            p[0] = self.builder.BracketAccessor(node=p[1], element=p[3])
             
     def p_Arguments(self, p):
         """Arguments : LPAREN RPAREN
@@ -364,7 +682,8 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.UnaryOp(operator=p[2], value=p[1], postfix=True)
+            p[0] = self.builder.UnaryOp(operator=p[2], value=p[1],
+                                        postfix=True)
             
     def p_PostfixExpressionNoBF(self, p): 
         """PostfixExpressionNoBF : LeftHandSideExpressionNoBF
@@ -373,7 +692,8 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.UnaryOp(operator=p[2], value=p[1], postfix=True)
+            p[0] = self.builder.UnaryOp(operator=p[2], value=p[1],
+                                        postfix=True)
         
     # 11.4 Unary Operators
     def p_UnaryExpressionCommon(self, p):
@@ -388,7 +708,7 @@ class Parser(object):
                                  | MINUS UnaryExpression   
                                  | NOT UnaryExpression 
                                  | LNOT UnaryExpression """
-        p[0] = ast.UnaryOp(operator=p[1], value=p[2], postfix=False)
+        p[0] = self.builder.UnaryOp(operator=p[1], value=p[2], postfix=False)
     
     def p_UnaryExpression(self, p):
         """UnaryExpression : PostfixExpression
@@ -409,7 +729,7 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
 
     def p_MultiplicativeExpressionNoBF(self, p):
         """MultiplicativeExpressionNoBF : UnaryExpressionNoBF 
@@ -419,7 +739,7 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
 
     # 11.6 Additive Operators
     def p_AdditiveExpression(self, p):
@@ -429,7 +749,7 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
 
 
     def p_AdditiveExpressionNoBF(self, p):
@@ -439,7 +759,7 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
 
     # 11.7 Bitwise Shift Operators
     def p_ShiftExpression(self, p):
@@ -450,7 +770,7 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
             
     def p_ShiftExpressionNoBF(self, p):
         """ShiftExpressionNoBF : AdditiveExpressionNoBF 
@@ -460,7 +780,7 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
             
     # 11.8 Relational Operators
     def p_RelationalExpression(self, p):
@@ -474,7 +794,7 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
 
     def p_RelationalExpressionNoIn(self, p):
         """RelationalExpressionNoIn : ShiftExpression 
@@ -486,7 +806,7 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.BinOp(p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(p[2], left=p[1], right=p[3])
 
 
     def p_RelationalExpressionNoBF(self, p):
@@ -500,7 +820,7 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.BinOp(p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(p[2], left=p[1], right=p[3])
 
     # 11.9 Equality Operators
     def p_EqualityExpression(self, p):
@@ -512,7 +832,7 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.BinOp(p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(p[2], left=p[1], right=p[3])
 
     def p_EqualityExpressionNoIn(self, p):
         """EqualityExpressionNoIn : RelationalExpressionNoIn 
@@ -523,7 +843,7 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.BinOp(p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(p[2], left=p[1], right=p[3])
 
     def p_EqualityExpressionNoBF(self, p):
         """EqualityExpressionNoBF : RelationalExpressionNoBF 
@@ -534,7 +854,7 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.BinOp(p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(p[2], left=p[1], right=p[3])
 
 
     # 11.10 Binary Bitwise Operators
@@ -542,7 +862,7 @@ class Parser(object):
         """BitwiseANDExpression : EqualityExpression 
                                 | BitwiseANDExpression AND EqualityExpression"""
         if len(p) == 4:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
         else:
             p[0] = p[1]
 
@@ -550,7 +870,7 @@ class Parser(object):
         """BitwiseANDExpressionNoIn : EqualityExpressionNoIn 
                                     | BitwiseANDExpressionNoIn AND EqualityExpressionNoIn"""
         if len(p) == 4:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
         else:
             p[0] = p[1]
 
@@ -558,7 +878,7 @@ class Parser(object):
         """BitwiseANDExpressionNoBF : EqualityExpressionNoBF
                                     | BitwiseANDExpressionNoBF AND EqualityExpressionNoIn"""
         if len(p) == 4:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
         else:
             p[0] = p[1]
 
@@ -566,7 +886,7 @@ class Parser(object):
         """BitwiseXORExpression : BitwiseANDExpression 
                                 | BitwiseXORExpression XOR BitwiseANDExpression """
         if len(p) == 4:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
         else:
             p[0] = p[1]
 
@@ -574,7 +894,7 @@ class Parser(object):
         """BitwiseXORExpressionNoIn : BitwiseANDExpressionNoIn 
                                     | BitwiseXORExpressionNoIn XOR BitwiseANDExpressionNoIn """
         if len(p) == 4:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
         else:
             p[0] = p[1]
 
@@ -582,7 +902,7 @@ class Parser(object):
         """BitwiseXORExpressionNoBF : BitwiseANDExpressionNoBF
                                     | BitwiseXORExpressionNoBF XOR BitwiseANDExpressionNoIn """
         if len(p) == 4:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
         else:
             p[0] = p[1]
                                     
@@ -590,7 +910,7 @@ class Parser(object):
         """BitwiseORExpression : BitwiseXORExpression 
                                | BitwiseORExpression OR BitwiseXORExpression """
         if len(p) == 4:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
         else:
             p[0] = p[1]
 
@@ -598,7 +918,7 @@ class Parser(object):
         """BitwiseORExpressionNoIn : BitwiseXORExpressionNoIn 
                                    | BitwiseORExpressionNoIn OR BitwiseXORExpressionNoIn"""
         if len(p) == 4:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
         else:
             p[0] = p[1]
 
@@ -606,7 +926,7 @@ class Parser(object):
         """BitwiseORExpressionNoBF : BitwiseXORExpressionNoBF 
                                    | BitwiseORExpressionNoBF OR BitwiseXORExpressionNoIn"""
         if len(p) == 4:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
         else:
             p[0] = p[1]
 
@@ -615,7 +935,7 @@ class Parser(object):
         """LogicalANDExpression : BitwiseORExpression 
                                 | LogicalANDExpression LAND BitwiseORExpression"""
         if len(p) == 4:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
         else:
             p[0] = p[1]
 
@@ -623,7 +943,7 @@ class Parser(object):
         """LogicalANDExpressionNoIn : BitwiseORExpressionNoIn
                                     | LogicalANDExpressionNoIn LAND BitwiseORExpressionNoIn """
         if len(p) == 4:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
         else:
             p[0] = p[1]
 
@@ -631,7 +951,7 @@ class Parser(object):
         """LogicalANDExpressionNoBF : BitwiseORExpressionNoBF
                                     | LogicalANDExpressionNoBF LAND BitwiseORExpressionNoIn """
         if len(p) == 4:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
         else:
             p[0] = p[1]
 
@@ -639,7 +959,7 @@ class Parser(object):
         """LogicalORExpression : LogicalANDExpression
                                | LogicalORExpression LOR LogicalANDExpression """
         if len(p) == 4:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
         else:
             p[0] = p[1]
 
@@ -647,7 +967,7 @@ class Parser(object):
         """LogicalORExpressionNoIn : LogicalANDExpressionNoIn 
                                    | LogicalORExpressionNoIn LOR LogicalANDExpressionNoIn """
         if len(p) == 4:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
         else:
             p[0] = p[1]
 
@@ -655,7 +975,7 @@ class Parser(object):
         """LogicalORExpressionNoBF : LogicalANDExpressionNoBF 
                                    | LogicalORExpressionNoBF LOR LogicalANDExpressionNoIn """
         if len(p) == 4:
-            p[0] = ast.BinOp(operator=p[2], left=p[1], right=p[3])
+            p[0] = self.builder.BinOp(operator=p[2], left=p[1], right=p[3])
         else:
             p[0] = p[1]
 
@@ -669,7 +989,7 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.If(expression=p[1], true=[p[3]], false=[p[5]])
+            p[0] = self.builder.If(expression=p[1], true=[p[3]], false=[p[5]])
 
     def p_ConditionalExpressionNoIn(self, p):                             
         """ConditionalExpressionNoIn : LogicalORExpressionNoIn 
@@ -679,7 +999,7 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.If(expression=p[1], true=[p[3]], false=[p[5]])
+            p[0] = self.builder.If(expression=p[1], true=[p[3]], false=[p[5]])
 
 
     def p_ConditionalExpressionNoBF(self, p):
@@ -690,7 +1010,7 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.If(expression=p[1], true=[p[3]], false=[p[5]])
+            p[0] = self.builder.If(expression=p[1], true=[p[3]], false=[p[5]])
 
 
 
@@ -702,7 +1022,8 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.Assign(node=p[1], operator=p[2], expression=p[3])
+            p[0] = self.builder.Assign(node=p[1], operator=p[2],
+                                       expression=p[3])
                                 
     def p_AssignmentExpressionNoIn(self, p):
         """AssignmentExpressionNoIn : ConditionalExpressionNoIn
@@ -712,7 +1033,8 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.Assign(node=p[1], operator=p[2], expression=p[3])
+            p[0] = self.builder.Assign(node=p[1], operator=p[2],
+                                       expression=p[3])
 
     def p_AssignmentExpressionNoBF(self, p):
         """AssignmentExpressionNoBF : ConditionalExpressionNoBF
@@ -721,7 +1043,8 @@ class Parser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ast.Assign(node=p[1], operator=p[2], expression=p[3])
+            p[0] = self.builder.Assign(node=p[1], operator=p[2],
+                                       expression=p[3])
             
 
     def p_AssignmentOperator(self, p):
@@ -788,8 +1111,8 @@ class Parser(object):
                          | StatementList Statement
                          | FunctionDeclaration
                          | StatementList FunctionDeclaration"""
-                         
-        p[0] = self.build_list(p, 1, 2)
+        if self._retain_statements:
+            p[0] = self.build_list(p, 1, 2)
             
     # 12.2 Variable Statement
     def p_VariableStatement(self, p):
@@ -797,7 +1120,7 @@ class Parser(object):
                              | VAR VariableDeclarationList auto_semicolon"""
         p[0] = []
         for node, expression in p[2]:
-            p[0].append(ast.VariableDeclaration(node, expression))
+            p[0].append(self.builder.VariableDeclaration(node, expression))
         
     def p_VariableDeclarationList(self, p):
         """VariableDeclarationList : VariableDeclaration
@@ -841,8 +1164,8 @@ class Parser(object):
     def p_IfStatement(self, p):
         """IfStatement : IF LPAREN Expression RPAREN Statement %prec IF_WITHOUT_ELSE 
                        | IF LPAREN Expression RPAREN Statement ELSE Statement"""
-        p[0] = ast.If(expression=p[3], true=p[5],
-                      false=p[7] if len(p) > 6 else None)
+        p[0] = self.builder.If(expression=p[3], true=p[5],
+                               false=p[7] if len(p) > 6 else None)
 
     # 12.6 Iteration Statements   
     def p_IterationStatement_1(self, p):
@@ -850,11 +1173,11 @@ class Parser(object):
                                 SEMI
                               | DO Statement WHILE LPAREN Expression RPAREN \
                                 auto_semicolon"""
-        p[0] = ast.DoWhile(condition=p[5], statement=p[2])
+        p[0] = self.builder.DoWhile(condition=p[5], statement=p[2])
         
     def p_IterationStatement_2(self, p):
         """IterationStatement : WHILE LPAREN Expression RPAREN Statement"""
-        p[0] = ast.While(condition=p[3], statement=p[5])
+        p[0] = self.builder.While(condition=p[3], statement=p[5])
         
     def p_IterationStatement_3(self, p):
         """IterationStatement : FOR LPAREN ExpressionNoIn_opt SEMI \
@@ -864,13 +1187,13 @@ class Parser(object):
                                     Expression_opt SEMI Expression_opt RPAREN \
                                     Statement"""
         if len(p) == 10:
-            p[0] = ast.For(initialisers=p[3], conditions=p[5], increments=p[7],
-                           statement=p[9])
+            p[0] = self.builder.For(initialisers=p[3], conditions=p[5],
+                                    increments=p[7], statement=p[9])
         else:
-            initialisers = [ast.VariableDeclaration(node, expression)
+            initialisers = [self.builder.VariableDeclaration(node, expression)
                             for (node, expression) in p[4]]
-            p[0] = ast.For(initialisers=initialisers, conditions=p[6],
-                           increments=p[8], statement=p[10])
+            p[0] = self.builder.For(initialisers=initialisers, conditions=p[6],
+                                    increments=p[8], statement=p[10])
         
     def p_IterationStatement_4(self, p):
         """IterationStatement : FOR LPAREN LeftHandSideExpression IN \
@@ -878,46 +1201,45 @@ class Parser(object):
                               | FOR LPAREN VAR VariableDeclarationNoIn IN \
                                     Expression RPAREN Statement"""
         if len(p) == 8:
-            p[0] = ast.ForIn(item=p[3], iterator=p[5], statement=p[7])
+            p[0] = self.builder.ForIn(item=p[3], iterator=p[5], statement=p[7])
         else:
-            item = ast.VariableDeclaration(p[4], None)
-            p[0] = ast.ForIn(item=item, iterator=p[6], statement=p[8])
+            item = self.builder.VariableDeclaration(p[4], None)
+            p[0] = self.builder.ForIn(item=item, iterator=p[6], statement=p[8])
         
 
     # 12.7 The continue Statement
     def p_ContinueStatement(self, p):
         """ContinueStatement : CONTINUE Identifier_opt SEMI"""
-        p[0] = ast.Continue(identifier=p[2])
+        p[0] = self.builder.Continue(identifier=p[2])
 
     # 12.8 The break Statement
     def p_BreakStatement(self, p):
         """BreakStatement : BREAK Identifier_opt SEMI"""
-        p[0] = ast.Break(identifier=p[2])
+        p[0] = self.builder.Break(identifier=p[2])
 
     # 12.9 The return Statement
     def p_ReturnStatement(self, p):
         """ReturnStatement : RETURN Expression_opt SEMI
                            | RETURN Expression_opt auto_semicolon"""
-        p[0] = ast.Return(expression=p[2])
+        p[0] = self.builder.Return(expression=p[2])
 
     # 12.10 The with Statement
     def p_WithStatement(self, p):
         """WithStatement : WITH LPAREN Expression RPAREN Statement"""
-        p[0] = ast.With(expression=p[3], statement=p[5])
+        p[0] = self.builder.With(expression=p[3], statement=p[5])
 
     # 12.11 The switch Statement
     def p_SwitchStatement(self, p):
         """SwitchStatement : SWITCH LPAREN Expression RPAREN CaseBlock"""
-        cases = []
+        # CaseBlock is [cases] or [cases, default, cases]
+        block = p[5]
+        cases = list(block[0] or [])
         default = None
+        if len(block) == 3:
+            default = block[1]
+            cases.extend(block[2] or [])
 
-        for item in p[5]:
-            if isinstance(item, list):
-                cases.extend(item)
-            elif isinstance(item, ast.DefaultCase):
-                default = item
-
-        p[0] = ast.Switch(p[3], cases=cases, default=default)
+        p[0] = self.builder.Switch(p[3], cases=cases, default=default)
                 
      
     def p_CaseBlock(self, p):
@@ -933,48 +1255,48 @@ class Parser(object):
 
     def p_CaseClause(self, p):
         """CaseClause : CASE Expression COLON StatementList_opt"""
-        p[0] = ast.Case(identifier=p[2], statements=p[4])
+        p[0] = self.builder.Case(identifier=p[2], statements=p[4])
         
     def p_DefaultClause(self, p):
         """DefaultClause : DEFAULT COLON StatementList_opt"""
-        p[0] = ast.DefaultCase(statements=p[3])
+        p[0] = self.builder.DefaultCase(statements=p[3])
         
     # 12.12 Labelled Statements
     def p_LabelledStatement(self, p):
         """LabelledStatement : Identifier COLON Statement"""
-        p[0] = ast.LabelledStatement(identifier=p[1], statement=p[3])
+        p[0] = self.builder.LabelledStatement(identifier=p[1], statement=p[3])
 
     # 12.13 The throw Statement
     def p_ThrowStatement(self, p):
         """ThrowStatement : THROW Expression SEMI"""
-        p[0] = ast.Throw(expression=p[2])
+        p[0] = self.builder.Throw(expression=p[2])
 
     # 12.14 The try Statement
     def p_TryStatement_1(self, p):
         """TryStatement : TRY Block Catch"""
-        p[0] = ast.Try(statements=p[2], catch=p[3], finally_=None)
+        p[0] = self.builder.Try(statements=p[2], catch=p[3], finally_=None)
 
     def p_TryStatement_2(self, p):
         """TryStatement : TRY Block Finally
                         | TRY Block Catch Finally"""
         if len(p) == 4:
-            p[0] = ast.Try(statements=p[2], catch=None, finally_=p[3])
+            p[0] = self.builder.Try(statements=p[2], catch=None, finally_=p[3])
         else:
-            p[0] = ast.Try(statements=p[2], catch=p[3], finally_=p[4])
+            p[0] = self.builder.Try(statements=p[2], catch=p[3], finally_=p[4])
 
         
     def p_Catch(self, p):
         """Catch : CATCH LPAREN Identifier RPAREN Block"""
-        p[0] = ast.Catch(identifier=p[3], statements=p[5])
+        p[0] = self.builder.Catch(identifier=p[3], statements=p[5])
             
     def p_Finally(self, p):
         """Finally : FINALLY Block"""
-        p[0] = ast.Finally(statements=p[2])
+        p[0] = self.builder.Finally(statements=p[2])
         
     # 12.15 Debugger statement
     def p_DebuggerStatement(self, p):
         """DebuggerStatement : DEBUGGER SEMI"""
-        p[0] = ast.Debugger()
+        p[0] = self.builder.Debugger()
 
     #
     # 13. Function Definition
@@ -982,14 +1304,28 @@ class Parser(object):
     def p_FunctionDeclaration(self, p):
         """FunctionDeclaration : FUNCTION Identifier \
                                     LPAREN FormalParameterList_opt RPAREN \
-                                    LBRACE FunctionBody RBRACE"""
-        p[0] = ast.FuncDecl(node=p[2], parameters=p[4], statements=p[7])
+                                    LBRACE FunctionBody RBRACE
+                               | FUNCTION Identifier \
+                                    LPAREN FormalParameterList_opt RPAREN \
+                                    FUNCTION_BODY"""
+        if len(p) == 7:
+            p[0] = self._lazy_function(p)
+        else:
+            p[0] = self.builder.FuncDecl(node=p[2], parameters=p[4],
+                                         statements=p[7])
         
     def p_FunctionExpression(self, p):
         """FunctionExpression : FUNCTION Identifier_opt \
                                     LPAREN FormalParameterList_opt RPAREN \
-                                    LBRACE FunctionBody RBRACE """
-        p[0] = ast.FuncDecl(node=p[2], parameters=p[4], statements=p[7])
+                                    LBRACE FunctionBody RBRACE
+                              | FUNCTION Identifier_opt \
+                                    LPAREN FormalParameterList_opt RPAREN \
+                                    FUNCTION_BODY"""
+        if len(p) == 7:
+            p[0] = self._lazy_function(p)
+        else:
+            p[0] = self.builder.FuncDecl(node=p[2], parameters=p[4],
+                                         statements=p[7])
         
     def p_FormalParameterList(self, p):
         """FormalParameterList : Identifier
@@ -1005,12 +1341,16 @@ class Parser(object):
     
     def p_Program(self, p):
         """Program : SourceElements_opt"""
-        p[0] = ast.Program(p[1])
+        p[0] = self.builder.Program(p[1])
 
     def p_SourceElements(self, p):
         """SourceElements : SourceElement
                           | SourceElements SourceElement"""
-        p[0] = self.build_list(p, 1, 2)
+        if self._top_level is not None and len(p.stack) == 1:
+            # Hand the element to iter_parse instead of keeping it
+            self._top_level.append(p[len(p) - 1])
+        elif self._retain_statements:
+            p[0] = self.build_list(p, 1, 2)
         
         
     def p_SourceElement(self, p):
@@ -1025,9 +1365,14 @@ class Parser(object):
     
     # TODO ArbitraryInputElements
 
-                
-     
-    
+
+# The grammar is set up once, the instances only bind its actions
+for _rulename in ('FormalParameterList', 'SourceElements', 'StatementList',
+                  'Elision', 'Expression', 'ExpressionNoIn', 'Identifier',
+                  'Initialiser', 'InitialiserNoIn', 'CaseClauses'):
+    Parser._create_opt_rule(_rulename)
+del _rulename
+
 if __name__ == "__main__":
     import sys
     # 
@@ -0,0 +1,406 @@
+"""
+    jsparser.query
+    ~~~~~~~~~~~~~~
+
+    Selectors for finding nodes in the syntax tree, in the spirit of CSS
+    and esquery
+
+    :copyright: Copyright 2009 Michael van Tellingen
+    :license: BSD
+
+"""
+import re
+
+from pyjsparser import ast
+
+
+class SelectorError(ValueError):
+    """Raised for a selector which can't be parsed"""
+
+    def __init__(self, message, selector, pos):
+        ValueError.__init__(self, "%s at %d in %r" % (message, pos, selector))
+        self.selector = selector
+        self.pos = pos
+
+
+def select(root, selector):
+    """Return the nodes below `root` (including it) which match the
+    selector, see compile(). The last compiled selectors are cached.
+
+    """
+    compiled = _cache.get(selector)
+    if compiled is None:
+        if len(_cache) >= _MAXCACHE:
+            # Like the re module, start over instead of tracking use
+            _cache.clear()
+        compiled = _cache[selector] = compile(selector)
+    return compiled.select(root)
+
+
+def compile(selector):
+    """Compile a selector string into a Selector. The syntax is:
+
+    - ``FuncCall``: nodes of the ast class or its subclasses, ``*`` for
+      any node
+    - ``[name]``: nodes with the attribute, which isn't None
+    - ``[name="eval"]``, ``[name!=eval]``: the attribute equals the
+      string (or not); numbers and booleans are compared as strings
+    - ``[name=/^on/i]``: the attribute is a string matching the regex
+    - ``[node.element.name=eval]``: attributes of the attribute values
+    - ``:has(A B)``: nodes with a descendant matching the selector, the
+      selector is relative to the node, so A is a descendant as well;
+      ``:has(> A)`` for a child
+    - ``A B``: B is a descendant of A, ``A > B``: B is a child of A
+
+    The children of a node are those of ast.iter_child_nodes(). For example
+    ``FuncCall[node.element.name=eval]`` finds the calls ``x.eval(...)``.
+
+    """
+    return Selector(selector, *_Reader(selector).read())
+
+
+class Selector(object):
+    """A compiled selector, see compile()"""
+
+    def __init__(self, text, compounds, combinators):
+        self.text = text
+        self._chain = _Chain([pred for cls, pred in compounds], combinators)
+        self._anchor = compounds[0][0]
+        self._single = len(compounds) == 1
+
+    def __repr__(self):
+        return "<query.Selector(%r)>" % self.text
+
+    def match(self, node, ancestors=()):
+        """Return whether `node` matches, `ancestors` are its ancestors
+        from the root down to its parent.
+
+        """
+        chain = self._chain
+        state = None
+        for ancestor in ancestors:
+            state = chain.step(ancestor, state)
+        return chain.matched(chain.step(node, state))
+
+    def select(self, root):
+        """Return the nodes below `root` (including it) which match,
+        ancestors of `root` aren't considered.
+
+        A Program parsed with ``Parser(index=True)`` gives the nodes of the
+        leftmost type of the selector from its index, only their subtrees
+        are searched. The nodes are returned in the order of ast.walk() or
+        of the index, which only differ for the condition of do-while
+        loops.
+
+        """
+        chain = self._chain
+        candidates = self._candidates(getattr(root, 'index', None))
+        if candidates is None:
+            return list(_matches(root, chain))
+        if self._single:
+            return filter(chain.first, candidates)
+        found = []
+        seen = set()
+        for node in candidates:
+            if id(node) not in seen:
+                # Otherwise searched with an enclosing candidate
+                found.extend(_matches(node, chain, seen))
+        return found
+
+    def _candidates(self, index):
+        if index is None or self._anchor is None or \
+           index.get(ast.LazyFuncDecl):
+            # The bodies of lazy functions aren't indexed
+            return None
+        classes = [cls for cls in index if issubclass(cls, self._anchor)]
+        if not classes:
+            return []
+        if len(classes) > 1:
+            # The nodes of several classes can't be put in order
+            return None
+        return index[classes[0]]
+
+
+def _matches(top, chain, seen=None):
+    """Yield the nodes in the subtree of `top` which match the _Chain, the
+    paths start at `top`. The ids of the visited nodes are added to `seen`.
+
+    """
+    if not chain.rest and not chain.anchored:
+        # A single compound doesn't depend on the ancestors
+        for node in ast.walk(top):
+            if seen is not None:
+                seen.add(id(node))
+            if chain.first(node):
+                yield node
+        return
+    states = []
+    for node, depth in ast.walk_paths(top, []):
+        del states[depth:]
+        state = chain.step(node, depth and states[-1] or None)
+        states.append(state)
+        if seen is not None:
+            seen.add(id(node))
+        if chain.matched(state):
+            yield node
+
+
+class _Chain(object):
+    """Matches the compounds of a selector top-down along a path. The state
+    of a node is a pair of bit masks, bit `i` of the first is set if the
+    node matches the compounds up to `i`, with the node as compound `i`.
+    The second has the bits of the node and its ancestors combined. The
+    state of a node is computed from that of its parent in O(compounds).
+    When `anchored` the first compound must match the start of the path.
+
+    """
+
+    def __init__(self, preds, combinators, anchored=False):
+        self.anchored = anchored
+        self.first = preds[0]
+        # (predicate, bit of the previous compound, its combinator is '>')
+        self.rest = [(pred, 1 << index, combinator == '>')
+                     for index, (pred, combinator) in
+                     enumerate(zip(preds[1:], combinators))]
+        self.final = 1 << (len(preds) - 1)
+
+    def step(self, node, parent):
+        """Return the state of `node`, `parent` is the state of its parent
+        or None at the start of the path
+
+        """
+        if parent is None:
+            parent_matched = parent_reach = 0
+        else:
+            parent_matched, parent_reach = parent
+        matched = 0
+        if (parent is None or not self.anchored) and self.first(node):
+            matched = 1
+        for pred, previous, child in self.rest:
+            if child:
+                ready = parent_matched & previous
+            else:
+                ready = parent_reach & previous
+            if ready and pred(node):
+                matched |= previous << 1
+        return matched, parent_reach | matched
+
+    def matched(self, state):
+        return state[0] & self.final
+
+
+def _all(preds):
+    if len(preds) == 1:
+        return preds[0]
+    def pred(node):
+        for check in preds:
+            if not check(node):
+                return False
+        return True
+    return pred
+
+
+def _type(cls):
+    def pred(node):
+        return isinstance(node, cls)
+    return pred
+
+
+def _any(node):
+    return True
+
+
+def _has(chain):
+    def pred(node):
+        for child in ast.iter_child_nodes(node):
+            for found in _matches(child, chain):
+                return True
+        return False
+    return pred
+
+
+_missing = object()
+
+def _attribute(names, operator, value):
+    def resolve(node):
+        for name in names:
+            node = getattr(node, name, _missing)
+            if node is _missing:
+                break
+        return node
+
+    if operator is None:
+        def pred(node):
+            actual = resolve(node)
+            return actual is not None and actual is not _missing
+    elif operator == 'regex':
+        def pred(node):
+            actual = resolve(node)
+            return isinstance(actual, basestring) and \
+                   value.search(actual) is not None
+    else:
+        negate = operator == '!='
+        def pred(node):
+            actual = resolve(node)
+            if actual is _missing:
+                return False
+            return _equals(actual, value) != negate
+    return pred
+
+
+def _equals(actual, value):
+    if isinstance(actual, basestring):
+        return actual == value
+    if isinstance(actual, (bool, int, long, float)):
+        return str(actual) == value
+    return False
+
+
+_token_re = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<regex>/(?:[^/\\]|\\.)+/i?)
+  | (?P<op>!=|[=>\[\]()*])
+  | (?P<pseudo>:[A-Za-z]+)
+  | (?P<name>[\w$.+-]+)
+""", re.VERBOSE)
+
+_escape_re = re.compile(r'\\(.)')
+
+_cache = {}
+_MAXCACHE = 100
+
+
+class _Reader(object):
+    """Parses a selector into a list of (class, predicate) compounds and
+    the combinators between them
+
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = []
+        pos = 0
+        while pos < len(text):
+            match = _token_re.match(text, pos)
+            if match is None:
+                raise SelectorError("Unexpected character", text, pos)
+            self.tokens.append((match.lastgroup, match.group(), pos))
+            pos = match.end()
+        self.tokens.append(('end', '', pos))
+        self.index = 0
+
+    def peek(self):
+        return self.tokens[self.index]
+
+    def next(self):
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def skip_space(self):
+        if self.peek()[0] == 'space':
+            self.index += 1
+
+    def expect(self, text):
+        kind, value, pos = self.next()
+        if value != text:
+            self.error("Expected %r" % text, pos)
+
+    def error(self, message, pos=None):
+        if pos is None:
+            pos = self.peek()[2]
+        raise SelectorError(message, self.text, pos)
+
+    def read(self):
+        self.skip_space()
+        result = self.read_complex()
+        self.skip_space()
+        if self.peek()[0] != 'end':
+            self.error("Unexpected %r" % self.peek()[1])
+        return result
+
+    def read_complex(self):
+        compounds = [self.read_compound()]
+        combinators = []
+        while True:
+            start = self.index
+            self.skip_space()
+            kind, value, pos = self.peek()
+            if value == '>':
+                self.next()
+                self.skip_space()
+                combinators.append('>')
+            elif self.index > start and kind != 'end' and value != ')':
+                combinators.append(' ')
+            else:
+                self.index = start
+                return compounds, combinators
+            compounds.append(self.read_compound())
+
+    def read_compound(self):
+        cls = None
+        preds = []
+        kind, value, pos = self.peek()
+        if value == '*':
+            self.next()
+            preds.append(_any)
+        elif kind == 'name':
+            self.next()
+            cls = getattr(ast, value, None)
+            if not isinstance(cls, type) or not issubclass(cls, ast.Node):
+                self.error("Unknown node type %r" % value, pos)
+            preds.append(_type(cls))
+        while True:
+            kind, value, pos = self.peek()
+            if value == '[':
+                self.next()
+                preds.append(self.read_attribute())
+            elif kind == 'pseudo':
+                self.next()
+                if value != ':has':
+                    self.error("Unknown pseudo class %r" % value, pos)
+                self.expect('(')
+                self.skip_space()
+                anchored = self.peek()[1] == '>'
+                if anchored:
+                    self.next()
+                    self.skip_space()
+                compounds, combinators = self.read_complex()
+                self.skip_space()
+                self.expect(')')
+                preds.append(_has(_Chain([pred for c, pred in compounds],
+                                         combinators, anchored)))
+            else:
+                break
+        if not preds:
+            self.error("Expected a selector", pos)
+        return cls, _all(preds)
+
+    def read_attribute(self):
+        self.skip_space()
+        kind, value, pos = self.next()
+        if kind != 'name':
+            self.error("Expected an attribute name", pos)
+        names = value.split('.')
+        self.skip_space()
+        kind, operator, pos = self.next()
+        if operator == ']':
+            return _attribute(names, None, None)
+        if operator not in ('=', '!='):
+            self.error("Expected '=', '!=' or ']'", pos)
+        self.skip_space()
+        kind, value, pos = self.next()
+        if kind == 'string':
+            value = _escape_re.sub(r'\1', value[1:-1])
+        elif kind == 'regex':
+            if operator != '=':
+                self.error("Regex with %r" % operator, pos)
+            flags = re.IGNORECASE if value.endswith('i') else 0
+            operator = 'regex'
+            value = re.compile(value[1:value.rindex('/')], flags)
+        elif kind != 'name':
+            self.error("Expected a value", pos)
+        self.skip_space()
+        self.expect(']')
+        return _attribute(names, operator, value)
@@ -0,0 +1,130 @@
+import time
+
+from pyjsparser import aio, ast
+from pyjsparser.parser import Parser
+
+INPUT = """
+var foo = 1;
+function qux(a) { return a + foo; }
+qux("bar");
+"""
+
+def dump(program):
+    return [repr(node) for node in ast.walk(program)]
+
+def test_submit():
+    pool = aio.ParsePool(processes=2)
+    try:
+        requests = [pool.submit(INPUT) for i in range(4)]
+        done = []
+        requests[0].add_done_callback(done.append)
+        expected = dump(Parser().parse(INPUT))
+        for request in requests:
+            assert dump(request.result(10)) == expected
+        assert done == [requests[0]]
+    finally:
+        pool.close()
+
+def test_syntax_error():
+    pool = aio.ParsePool(processes=1)
+    try:
+        request = pool.submit("foo();\nvar = 1;")
+        try:
+            request.result(10)
+        except SyntaxError, e:
+            assert e.lineno == 2
+            assert e.lexpos == 11
+        else:
+            assert False, "SyntaxError not raised"
+    finally:
+        pool.close()
+
+def test_timeout_and_cancel():
+    pool = aio.ParsePool(processes=1, max_pending=2)
+    try:
+        slow = pool.submit("foo(1);\n" * 50000, timeout=0.5)
+        queued = pool.submit(INPUT)
+        try:
+            pool.submit(INPUT)
+        except aio.PoolFull:
+            pass
+        else:
+            assert False, "PoolFull not raised"
+        assert queued.cancel()
+        assert not queued.cancel()
+
+        for request, error in ((slow, aio.ParseTimeout),
+                               (queued, aio.ParseCancelled)):
+            try:
+                request.result(10)
+            except error:
+                pass
+            else:
+                assert False, "%s not raised" % error.__name__
+
+        # The stopped worker is replaced
+        assert dump(pool.submit(INPUT).result(10)) == \
+               dump(Parser().parse(INPUT))
+    finally:
+        pool.close()
+
+def test_queued_timeout():
+    pool = aio.ParsePool(processes=1)
+    try:
+        slow = pool.submit("foo(1);\n" * 50000)
+        # Times out while waiting for the busy worker
+        queued = pool.submit(INPUT, timeout=0.2)
+        try:
+            queued.result(10)
+        except aio.ParseTimeout:
+            pass
+        else:
+            assert False, "ParseTimeout not raised"
+        assert not slow.done()
+        assert slow.cancel()
+    finally:
+        pool.close()
+
+def test_worker_error():
+    pool = aio.ParsePool(processes=1)
+    try:
+        # Parses, but exceeds the recursion limit when pickled
+        crash = pool.submit("x = " + "[" * 3000 + "]" * 3000 + ";")
+        try:
+            crash.result(30)
+        except aio.WorkerError:
+            pass
+        else:
+            assert False, "WorkerError not raised"
+        assert dump(pool.submit(INPUT).result(10)) == \
+            dump(Parser().parse(INPUT))
+        assert pool._thread.is_alive()
+    finally:
+        pool.close()
+
+def test_worker_died():
+    pool = aio.ParsePool(processes=1)
+    try:
+        assert pool.submit(INPUT).result(10)
+        # An idle worker which died is replaced
+        pool._workers[0].process.terminate()
+        pool._workers[0].process.join()
+        assert dump(pool.submit(INPUT).result(10)) == \
+            dump(Parser().parse(INPUT))
+
+        # A worker which dies during the parse fails its request
+        request = pool.submit("foo(1);\n" * 50000)
+        while pool._workers[0].request is None:
+            time.sleep(0.01)
+        pool._workers[0].process.terminate()
+        try:
+            request.result(10)
+        except aio.WorkerError:
+            pass
+        else:
+            assert False, "WorkerError not raised"
+        assert dump(pool.submit(INPUT).result(10)) == \
+            dump(Parser().parse(INPUT))
+        assert pool._thread.is_alive()
+    finally:
+        pool.close()
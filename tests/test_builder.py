@@ -0,0 +1,59 @@
+from pyjsparser import ast
+from pyjsparser.builder import Builder
+from pyjsparser.parser import Parser
+
+class TupleBuilder(Builder):
+    def create(self, name, fields):
+        return (name, fields)
+
+class CallCounter(Builder):
+    calls = 0
+
+    def FuncCall(self, node, arguments):
+        self.calls += 1
+        return ast.FuncCall(node, arguments)
+
+def test_default_builder():
+    input = """
+    var foo = bar(1);
+    """
+    parser = Parser()
+    assert parser.builder is ast
+
+    program = Parser(builder=Builder()).parse(input)
+    assert isinstance(program, ast.Program)
+    assert isinstance(program.statements[0][0].expr, ast.FuncCall)
+
+def test_tuple_builder():
+    input = """
+    switch (foo) {
+        case 1:
+            break;
+        default:
+            foo(bar.baz);
+    }
+    """
+    parser = Parser(builder=TupleBuilder())
+    name, fields = parser.parse(input)
+
+    assert name == 'Program'
+    name, fields = fields['statements'][0]
+    assert name == 'Switch'
+    assert len(fields['cases']) == 1
+    assert fields['default'][0] == 'DefaultCase'
+
+    call = fields['default'][1]['statements'][0][0]
+    assert call[0] == 'FuncCall'
+    assert call[1]['arguments'][0] == (
+        'DotAccessor', {'node': ('Identifier', {'name': 'bar'}),
+                        'element': ('Identifier', {'name': 'baz'})})
+
+def test_builder_method():
+    input = """
+    foo(bar());
+    """
+    builder = CallCounter()
+    program = Parser(builder=builder).parse(input)
+
+    assert builder.calls == 2
+    assert isinstance(program.statements[0][0], ast.FuncCall)
@@ -0,0 +1,82 @@
+from pyjsparser import ast
+from pyjsparser.comments import LINE_COMMENT, BLOCK_COMMENT
+from pyjsparser.parser import Parser
+
+def test_comment_table():
+    input = """
+    // line comment
+    var foo = 1; /* block
+    comment */
+    """
+    parser = Parser()
+    program = parser.parse(input)
+
+    assert len(parser.comments) == 2
+    start, end, kind = parser.comments[0]
+    assert kind == LINE_COMMENT
+    assert input[start:end] == '// line comment'
+    assert parser.comments[1][2] == BLOCK_COMMENT
+    assert parser.comments.text(1).startswith('/* block')
+
+def test_leading_comments():
+    input = """/*! license */
+    /**
+     * Documentation for foo
+     */
+    function foo(bar) {
+    }
+    var x = 1; // belongs to x
+    /* first */ /* second */ x = 2;
+    """
+    parser = Parser(tracking=True)
+    program = parser.parse(input)
+
+    func = program.statements[0]
+    leading = parser.comments.leading(func)
+    assert [comment.data[:3] for comment in leading] == ['/*!', '/**']
+    assert isinstance(leading[0], ast.BlockComment)
+
+    assign = program.statements[2][0]
+    leading = parser.comments.leading(assign)
+    assert [comment.data for comment in leading] == [
+        '/* first */', '/* second */']
+
+def test_trailing_comments():
+    input = """
+    var x = 1; // belongs to x
+    foo() // automatic semicolon
+    bar();
+    """
+    parser = Parser(tracking=True)
+    program = parser.parse(input)
+
+    trailing = parser.comments.trailing(program.statements[0][0])
+    assert [comment.data for comment in trailing] == ['// belongs to x']
+    assert isinstance(trailing[0], ast.LineComment)
+
+    trailing = parser.comments.trailing(program.statements[1][0])
+    assert [comment.data for comment in trailing] == ['// automatic semicolon']
+    assert parser.comments.trailing(program.statements[2][0]) == []
+    assert parser.comments.leading(program.statements[2][0]) == []
+
+def test_unterminated_comment():
+    input = """
+    foo(); /* /* /*
+    """
+    parser = Parser()
+    try:
+        parser.parse(input)
+    except TypeError:
+        pass
+    else:
+        assert False, "Unterminated comment was accepted"
+
+def test_comment_line_numbers():
+    input = """/*
+     *
+     */
+    foo;
+    """
+    parser = Parser()
+    parser.lexer.input(input)
+    assert parser.lexer.token().lineno == 4
@@ -0,0 +1,81 @@
+from pyjsparser import ast, dependencies, extract_dependencies, \
+    extract_dependencies_batch
+from pyjsparser.parser import Parser
+
+INPUT = r"""
+// require('commented');
+/* define(['commented']) */
+var a = require('a'), b = require("b");
+var text = "require('in-string')", re = /require\('in-regex'\)/;
+define('module-id', ['c', 'd',], function(require) {
+    var e = require('e');
+    return foo.require('method');
+});
+require(['a', 'f'], function(a, f) {});
+importScripts('g.js', 'h.js');
+if (typeof define === 'function' && define.amd) {
+    define({});
+}
+"""
+
+def test_extract_dependencies():
+    dependencies, fallback = extract_dependencies(INPUT)
+    assert dependencies == ['a', 'b', 'c', 'd', 'e', 'f', 'g.js', 'h.js']
+    assert not fallback
+
+def test_dependencies_match_ast():
+    program = Parser().parse(INPUT)
+    expected = []
+    for node in ast.walk(program):
+        if isinstance(node, ast.FuncCall) and \
+           isinstance(node.node, ast.Identifier):
+            for argument in node.arguments or []:
+                strings = [argument]
+                if isinstance(argument, ast.Array):
+                    strings = argument.items
+                for string in strings:
+                    if isinstance(string, ast.String) and \
+                       string.data[1:-1] not in expected:
+                        expected.append(string.data[1:-1])
+    expected.remove('module-id')
+
+    assert extract_dependencies(INPUT)[0] == expected
+
+def test_dependencies_fallback():
+    for input in ["require(name);",
+                  "require('a' + name);",
+                  "define([name], function() {});",
+                  "importScripts('a.js', name);",
+                  "require('\\x61');",
+                  "var load = require; load('a');",
+                  "require('unterminated);"]:
+        dependencies, fallback = extract_dependencies(input)
+        assert fallback, input
+
+def test_extract_dependencies_batch():
+    results = extract_dependencies_batch(["require('a');", "require(b);"])
+    assert results == [(['a'], False), ([], True)]
+
+def test_extract_dependencies_bundle():
+    input = "define(['base'], function(require) {\n%s});" % ''.join(
+        "var m%d = require('mod%d');\n" % (i, i) for i in xrange(500))
+    dependencies, fallback = extract_dependencies(input)
+    assert dependencies == ['base'] + ['mod%d' % i for i in xrange(500)]
+    assert not fallback
+
+def test_nested_call_closes():
+    finished = []
+    original = dependencies._Call
+    class Call(original):
+        def finish(self):
+            finished.append(self.name)
+            return original.finish(self)
+
+    input = "define(['m'], function() { return require('a'); });\n" * 2
+    dependencies._Call = Call
+    try:
+        assert extract_dependencies(input) == (['m', 'a'], False)
+    finally:
+        dependencies._Call = original
+    # The define is closed before the next one starts
+    assert finished == ['require', 'define', 'require', 'define']
@@ -0,0 +1,73 @@
+from pyjsparser import ast
+from pyjsparser.hashing import structural_hash
+from pyjsparser.parser import Parser
+
+OLD = """
+function first(a) { return a + 1; }
+function second(b) { return b * 2; }
+var x = first(1);
+var y = second(2);
+"""
+
+def edits(old, new):
+    parser = Parser()
+    return [(action, removed and repr(removed), added and repr(added))
+            for action, removed, added in ast.diff(parser.parse(old),
+                                                   parser.parse(new))]
+
+def test_diff_unchanged():
+    assert edits(OLD, OLD) == []
+
+def test_diff_update():
+    new = OLD.replace('b * 2', 'b * 3')
+    assert edits(OLD, new) == [
+        ('update', "<ast.Number(value='2')>", "<ast.Number(value='3')>")]
+
+def test_diff_insert_delete():
+    new = OLD + "var z = 3;"
+    assert edits(OLD, new) == [
+        ('insert', None, "<ast.VariableDeclaration(node="
+                         "<ast.Identifier(name='z')>)>")]
+    assert edits(new, OLD) == [
+        ('delete', "<ast.VariableDeclaration(node="
+                   "<ast.Identifier(name='z')>)>", None)]
+
+def test_diff_move():
+    lines = OLD.strip().splitlines()
+    new = '\n'.join([lines[1], lines[0]] + lines[2:])
+    assert [action for action, removed, added in edits(OLD, new)] == ['move']
+
+    new = OLD.replace('var y = second(2);', '') + \
+        'function third() { var y = second(2); }'
+    assert sorted(action for action, removed, added
+                  in edits(OLD, new)) == ['insert', 'move']
+
+def test_diff_insert_before_update():
+    new = OLD.replace('var y = second(2);',
+                      'var added = 1;\nvar y = second(3);')
+    assert edits(OLD, new) == [
+        ('update', "<ast.Number(value='2')>", "<ast.Number(value='3')>"),
+        ('insert', None, "<ast.VariableDeclaration(node="
+                         "<ast.Identifier(name='added')>)>")]
+
+def test_diff_move_before_delete():
+    old = "function a() { foo(); }\nfunction b() { bar(); baz(); }"
+    new = "function a() { foo(); baz(); }\nfunction b() { bar(); }"
+    parser = Parser()
+    result = ast.diff(parser.parse(old), parser.parse(new))
+
+    assert [action for action, removed, added in result] == ['move']
+    action, removed, added = result[0]
+    assert removed.node.name == added.node.name == 'baz'
+
+def test_diff_hash_collision():
+    parser = Parser()
+    old = parser.parse(OLD)
+    new = parser.parse(OLD.replace('b * 2', 'b * 3'))
+    # Give the nodes of the new tree the hashes of the old one, as if the
+    # changed subtrees collided
+    for old_node, new_node in zip(ast.walk(old), ast.walk(new)):
+        new_node.structural_hash = structural_hash(old_node)
+    assert [(action, repr(removed), repr(added))
+            for action, removed, added in ast.diff(old, new)] == [
+        ('update', "<ast.Number(value='2')>", "<ast.Number(value='3')>")]
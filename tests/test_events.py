@@ -0,0 +1,45 @@
+from pyjsparser import ast
+from pyjsparser.parser import Parser
+
+class Recorder(object):
+    def __init__(self):
+        self.events = []
+
+    def node(self, kind, fields):
+        self.events.append((kind, fields))
+
+def test_parse_events():
+    input = """
+    var foo = "bar";
+    function baz(a) {
+        return a + 1;
+    }
+    """
+    handler = Recorder()
+    parser = Parser()
+    assert parser.parse_events(input, handler) is None
+
+    kinds = [kind for kind, fields in handler.events]
+    assert kinds == [
+        'Identifier', 'String', 'VariableDeclaration',
+        'Identifier', 'Identifier', 'Identifier', 'Number', 'BinOp', 'Return',
+        'FuncDecl', 'Program']
+    assert handler.events[1][1] == {'data': '"bar"'}
+    assert handler.events[-1][1] == {'statements': None}
+
+def test_parse_after_events():
+    parser = Parser()
+    parser.parse_events("foo();", Recorder())
+
+    program = parser.parse("foo(); bar();")
+    assert len(program.statements) == 2
+
+def test_parse_events_index():
+    # Nothing to index without a tree, the parser indexes the next parse
+    parser = Parser(index=True)
+    handler = Recorder()
+    assert parser.parse_events("foo(); bar();", handler) is None
+    assert [kind for kind, fields in handler.events][-1] == 'Program'
+
+    program = parser.parse("foo(); bar();")
+    assert len(program.index[ast.FuncCall]) == 2
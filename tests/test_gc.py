@@ -0,0 +1,88 @@
+import gc
+import weakref
+
+from pyjsparser import ast
+from pyjsparser.builder import Builder
+from pyjsparser.hashing import HashBuilder, shareable
+from pyjsparser.parser import Parser
+
+INPUT = """
+var foo = {a: [1, 2, "x"], b: function (c) { return c * 2; }};
+function bar(d) {
+    for (var i = 0; i < d.length; i++) { foo.b(d[i]); }
+}
+bar(/re/g.exec("y") || []);
+"""
+
+class RecordingBuilder(Builder):
+    def __init__(self):
+        self.enabled = set()
+
+    def create(self, name, fields):
+        self.enabled.add(gc.isenabled())
+        return Builder.create(self, name, fields)
+
+def test_pause_gc():
+    builder = RecordingBuilder()
+    parser = Parser(builder=builder, pause_gc=True)
+    parser.parse(INPUT)
+    assert builder.enabled == set([False])
+    assert gc.isenabled()
+
+    try:
+        parser.parse("var = 1;")
+    except SyntaxError:
+        pass
+    assert gc.isenabled()
+
+    gc.disable()
+    try:
+        parser.parse(INPUT)
+        assert not gc.isenabled()
+    finally:
+        gc.enable()
+
+class NestedBuilder(RecordingBuilder):
+    """Runs another parse with pause_gc in the middle of the parse"""
+
+    def __init__(self):
+        RecordingBuilder.__init__(self)
+        self.nested = Parser(pause_gc=True)
+
+    def create(self, name, fields):
+        if self.nested is not None:
+            nested, self.nested = self.nested, None
+            nested.parse(INPUT)
+        return RecordingBuilder.create(self, name, fields)
+
+def test_pause_gc_overlapping():
+    builder = NestedBuilder()
+    Parser(builder=builder, pause_gc=True).parse(INPUT)
+    # The collector stays disabled after the nested parse is done
+    assert builder.enabled == set([False])
+    assert gc.isenabled()
+
+    gc.disable()
+    try:
+        Parser(builder=NestedBuilder(), pause_gc=True).parse(INPUT)
+        assert not gc.isenabled()
+    finally:
+        gc.enable()
+
+def test_tree_is_acyclic():
+    parsers = [
+        Parser(),
+        Parser(tracking=True),
+        Parser(lazy_functions=True),
+        Parser(builder=HashBuilder(share_leaves=True)),
+    ]
+    for parser in parsers:
+        gc.collect()
+        program = parser.parse(INPUT)
+        # Walking parses the lazy function bodies, the shared leaves stay
+        # in the cache of the HashBuilder
+        refs = [weakref.ref(node) for node in ast.walk(program)
+                if node.__class__.__name__ not in shareable]
+        del program, node
+        assert [ref() for ref in refs if ref() is not None] == []
+        assert gc.collect() == 0
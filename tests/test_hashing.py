@@ -0,0 +1,73 @@
+import gc
+
+from pyjsparser import ast
+from pyjsparser.hashing import HashBuilder, same_structure, structural_hash
+from pyjsparser.parser import Parser
+
+INPUT = """
+function add(a, b) { return a + b * 2; }
+function add(a, b) { return a + b * 2; }
+function add(a, b) { return a - b * 2; }
+var x = [1, 1, "a", "a", null, null, true];
+"""
+
+def test_structural_hash():
+    program = Parser(builder=HashBuilder()).parse(INPUT)
+    first, second, third = program.statements[:3]
+
+    assert first is not second
+    assert same_structure(first, second)
+    assert not same_structure(first, third)
+
+    # The same as hashing a tree after parsing
+    plain = Parser().parse(INPUT)
+    assert [structural_hash(node) for node in ast.walk(plain)] == \
+        [node.structural_hash for node in ast.walk(program)]
+
+def test_share_leaves():
+    builder = HashBuilder(share_leaves=True)
+    program = Parser(builder=builder).parse(INPUT)
+    items = program.statements[3][0].expr.items
+    assert items[0] is items[1]
+    assert items[2] is items[3]
+    assert items[4] is items[5]
+    assert items[0] is not items[2]
+
+    program = Parser(builder=HashBuilder()).parse(INPUT)
+    items = program.statements[3][0].expr.items
+    assert items[0] is not items[1]
+    assert same_structure(items[0], items[1])
+
+def test_same_structure_collision():
+    program = Parser(builder=HashBuilder()).parse(INPUT)
+    first, second, third = program.statements[:3]
+    # Force a collision of the hashes
+    third.structural_hash = first.structural_hash
+
+    assert same_structure(first, second)
+    assert not same_structure(first, third)
+    assert not same_structure(third, first)
+
+def test_shared_leaves_are_freed():
+    builder = HashBuilder(share_leaves=True)
+    program = Parser(builder=builder).parse(INPUT)
+    assert len(builder.leaves) > 0
+
+    gc.disable()
+    try:
+        del program
+        assert len(builder.leaves) == 0
+    finally:
+        gc.enable()
+
+def test_lazy_functions():
+    builder = HashBuilder()
+    lazy = Parser(builder=builder, lazy_functions=True).parse(INPUT)
+    other = Parser(builder=builder, lazy_functions=True).parse(INPUT)
+    full = Parser(builder=builder).parse(INPUT)
+
+    assert same_structure(lazy.statements[0], lazy.statements[1])
+    assert not same_structure(lazy.statements[0], lazy.statements[2])
+    assert same_structure(lazy, other)
+    # The source of lazy bodies is hashed instead of their nodes
+    assert not same_structure(lazy, full)
@@ -0,0 +1,54 @@
+from pyjsparser import ast
+from pyjsparser.parser import Parser
+
+INPUT = """
+var a = f(g(1), function (x) { var y = h(x); return y; }), b = [k()];
+function outer() {
+    function inner() { return m(n()); }
+    do { p(); } while (q(r()));
+}
+for (var i in s(t())) u();
+new V(w());
+"""
+
+def same_nodes(nodes, program, cls):
+    # walk() visits the condition of a do-while before its body, so only
+    # compare which nodes are listed
+    expected = [node for node in ast.walk(program) if node.__class__ is cls]
+    return sorted(map(id, nodes)) == sorted(map(id, expected))
+
+def test_index():
+    program = Parser(index=True).parse(INPUT)
+
+    calls = program.index[ast.FuncCall]
+    assert [call.node.name for call in calls] == [
+        'f', 'g', 'h', 'k', 'm', 'n', 'p', 'q', 'r', 's', 't', 'u', 'w']
+    for cls in (ast.FuncCall, ast.FuncDecl, ast.VariableDeclaration,
+                ast.Identifier, ast.Number, ast.Return, ast.Program):
+        assert same_nodes(program.index[cls], program, cls)
+    assert program.index[ast.FuncDecl][1].node.name == 'outer'
+    assert program.index[ast.Switch] == []
+    assert Parser().parse(INPUT).index is None
+
+def test_index_lazy_functions():
+    parser = Parser(index=True, lazy_functions=True)
+    program = parser.parse(INPUT)
+
+    assert [decl.node and decl.node.name
+            for decl in program.index[ast.LazyFuncDecl]] == [None, 'outer']
+    # Bodies aren't indexed, and are parsed without recording
+    assert [call.node.name for call in program.index[ast.FuncCall]] == \
+           ['f', 'g', 'k', 's', 't', 'u', 'w']
+    outer = program.index[ast.LazyFuncDecl][1]
+    assert len(outer.statements) == 2
+    assert parser.builder is ast
+
+def test_index_source_order():
+    program = Parser(index=True, tracking=True).parse(INPUT)
+    for cls, nodes in program.index.items():
+        if cls is ast.VariableDeclaration:
+            # Tracking gives them the span of the whole var statement
+            continue
+        spans = [(node.lexpos, -node.endlexpos) for node in nodes]
+        # Parents start at or before their children and end after them
+        assert spans == sorted(spans), cls
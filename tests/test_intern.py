@@ -0,0 +1,36 @@
+from pyjsparser import ast
+from pyjsparser.parser import Parser
+
+def names(program):
+    return [node.name for node in ast.walk(program)
+            if isinstance(node, ast.Identifier)]
+
+def test_intern_identifiers():
+    input = """
+        var elem = tmp.length, tmp = elem.length;
+        elem['length'] = "a long string literal which isn't interned";
+        tmp['length'] = "a long string literal which isn't interned";
+    """
+    parser = Parser()
+    program = parser.parse(input)
+
+    elem1, tmp1, length1, tmp2, elem2, length2 = names(program)[:6]
+    assert elem1 is elem2 and tmp1 is tmp2 and length1 is length2
+
+    strings = [node.data for node in ast.walk(program)
+               if isinstance(node, ast.String)]
+    assert strings[0] is strings[2]
+    assert strings[1] == strings[3] and strings[1] is not strings[3]
+
+def test_intern_table():
+    table = {}
+    parser = Parser(intern_table=table)
+    first = names(parser.parse("prototype;"))[0]
+    second = names(Parser(intern_table=table).parse("prototype;"))[0]
+    assert first is second
+    assert table['prototype'] is first
+
+    parser = Parser()
+    first = names(parser.parse("prototype;"))[0]
+    second = names(parser.parse("prototype;"))[0]
+    assert first == second and first is not second
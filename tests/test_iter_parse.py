@@ -0,0 +1,80 @@
+from pyjsparser import ast
+from pyjsparser.parser import Parser
+
+def test_iter_parse():
+    input = """
+    var foo = 1;
+    function bar(baz) {
+        var foo = 2;
+        return baz;
+    }
+    bar(foo);
+    ;
+    """
+    parser = Parser()
+    elements = list(parser.iter_parse(input))
+    program = parser.parse(input)
+
+    assert len(elements) == len(program.statements) == 4
+    assert isinstance(elements[0][0], ast.VariableDeclaration)
+    assert isinstance(elements[1], ast.FuncDecl)
+    assert len(elements[1].statements) == 2
+    assert isinstance(elements[2][0], ast.FuncCall)
+    assert elements[3] is None
+
+def test_iter_parse_is_incremental():
+    input = """
+    foo();
+    bar();
+    var = 1;
+    """
+    parser = Parser()
+    elements = parser.iter_parse(input)
+
+    assert isinstance(elements.next()[0], ast.FuncCall)
+    assert isinstance(elements.next()[0], ast.FuncCall)
+    try:
+        elements.next()
+    except SyntaxError:
+        pass
+    else:
+        assert False, "SyntaxError not raised"
+
+def test_iter_parse_tracking():
+    input = """
+    foo(); bar()
+    """
+    parser = Parser(tracking=True)
+    first, second = parser.iter_parse(input)
+
+    assert input[first[0].lexpos:first[0].endlexpos] == 'foo()'
+    assert input[second[0].lexpos:second[0].endlexpos] == 'bar()'
+
+def test_parse_steps():
+    input = "var foo = [1, 2, 3];\nfunction bar(a) { return a; }\nbar(foo);\n"
+    parser = Parser()
+    expected = [repr(node) for node in ast.walk(parser.parse(input))]
+    other = Parser()
+
+    steps = list(parser.parse_steps(input, max_tokens=5))
+    # 26 tokens and the end of input in slices of 5
+    assert steps[:-1] == [None] * 5
+    assert [repr(node) for node in ast.walk(steps[-1])] == expected
+
+    # Parse another input between the slices
+    steps = parser.parse_steps(input, max_tokens=3)
+    steps.next()
+    other.parse("foo();")
+    for program in steps:
+        pass
+    assert [repr(node) for node in ast.walk(program)] == expected
+
+def test_parse_steps_syntax_error():
+    steps = Parser().parse_steps("foo();\nvar = 1;", max_tokens=2)
+    steps.next()
+    try:
+        list(steps)
+    except SyntaxError, e:
+        assert e.lineno == 2
+    else:
+        assert False, "SyntaxError not raised"
@@ -0,0 +1,59 @@
+from pyjsparser import ast
+from pyjsparser.parser import Parser
+
+INPUT = r"""
+function foo(a, b) {
+    var s = "}" + '{';
+    var r = /[}{]/g;
+    /* } */
+    return {a: 1, b: function() { return {}; }};
+}
+var bar = function() {
+    function baz() { return '{'; }
+    return baz;
+};
+"""
+
+def dump(program):
+    return [(repr(node).replace('LazyFuncDecl', 'FuncDecl'),
+             node.lexpos, node.endlexpos)
+            for statement in ast.iter_child_nodes(program)
+            for node in ast.walk(statement)]
+
+def test_lazy_functions():
+    parser = Parser(tracking=True, lazy_functions=True)
+    program = parser.parse(INPUT)
+
+    foo = program.statements[0]
+    assert isinstance(foo, ast.LazyFuncDecl)
+    assert not foo.parsed
+    assert INPUT[foo.start:foo.end].strip().startswith('var s')
+    assert len(foo.statements) == 3
+    assert foo.parsed
+
+    expected = Parser(tracking=True).parse(INPUT)
+    assert dump(program) == dump(expected)
+
+def test_lazy_function_errors():
+    input = "function foo() {\n    var = 1;\n}\nfoo();"
+    parser = Parser(lazy_functions=True)
+    program = parser.parse(input)
+    assert len(program.statements) == 2
+    try:
+        program.statements[0].statements
+    except SyntaxError, e:
+        assert e.lineno == 2
+        assert input[e.lexpos] == '='
+    else:
+        assert False, "SyntaxError not raised"
+
+    assert len(parser.validate(input)) == 1
+
+def test_unterminated_function_body():
+    parser = Parser(lazy_functions=True)
+    try:
+        parser.parse("function foo() { if (a) { b(); }")
+    except SyntaxError, e:
+        assert e.lexpos == 15
+    else:
+        assert False, "SyntaxError not raised"
@@ -0,0 +1,66 @@
+import time
+
+from pyjsparser import ast
+from pyjsparser.limits import Limits, ParseLimitExceeded
+from pyjsparser.parser import Parser
+
+INPUT = """
+var foo = [1, 2, 3];
+function bar(a) { return a + foo; }
+bar(foo);
+"""
+
+def exceeded(parser, input, limits):
+    try:
+        parser.parse(input, limits=limits)
+    except ParseLimitExceeded, e:
+        return e
+    assert False, "ParseLimitExceeded not raised"
+
+def test_within_limits():
+    parser = Parser()
+    expected = [repr(node) for node in ast.walk(parser.parse(INPUT))]
+    program = parser.parse(INPUT, limits=Limits(
+        max_tokens=100, max_nodes=100, max_depth=100,
+        deadline=time.time() + 60))
+    assert [repr(node) for node in ast.walk(program)] == expected
+
+def test_max_tokens():
+    e = exceeded(Parser(), INPUT, Limits(max_tokens=10))
+    assert e.limit == 'max_tokens'
+    assert e.tokens == 11
+    assert e.lineno == 2
+
+def test_max_nodes():
+    input = "var foo = [%s];" % ', '.join(['1'] * 1000)
+    e = exceeded(Parser(), input, Limits(max_nodes=100))
+    assert e.limit == 'max_nodes'
+    assert e.nodes == 101
+    assert e.tokens < 250
+
+def test_max_depth():
+    parser = Parser()
+    input = "foo(%s1%s);" % ('(' * 50, ')' * 50)
+    parser.parse(input, limits=Limits(max_depth=100))
+    e = exceeded(parser, input.replace('(', '[').replace(')', ']'),
+                 Limits(max_depth=40))
+    assert e.limit == 'max_depth'
+    assert e.depth > 40
+
+def test_deadline():
+    e = exceeded(Parser(), INPUT, Limits(deadline=time.time() - 1))
+    assert e.limit == 'deadline'
+    assert e.tokens == 1
+
+def test_tracking_and_syntax_error():
+    parser = Parser(tracking=True)
+    program = parser.parse(INPUT, limits=Limits(max_nodes=100))
+    statement = program.statements[0][0]
+    assert INPUT[statement.lexpos:statement.endlexpos] == \
+           'var foo = [1, 2, 3];'
+    try:
+        parser.parse("var = 1;", limits=Limits(max_nodes=100))
+    except SyntaxError:
+        pass
+    else:
+        assert False, "SyntaxError not raised"
@@ -0,0 +1,97 @@
+from pyjsparser import ast, lint
+from pyjsparser.parser import Parser
+
+INPUT = """
+eval(code);
+function run(a) {
+    with (a) { debugger; }
+    return function () { eval(a); };
+}
+"""
+
+class NoEval(lint.Rule):
+    classes = (ast.FuncCall,)
+
+    def check(self, node, context):
+        if getattr(node.node, 'name', None) == 'eval':
+            self.report(context, node, "eval() is not allowed")
+
+class NoWith(lint.Rule):
+    name = 'no-with'
+    classes = (ast.With,)
+
+    def check(self, node, context):
+        self.report(context, node, "with is not allowed")
+
+class NestedFunction(lint.Rule):
+    classes = (ast.FuncDecl,)
+
+    def check(self, node, context):
+        for ancestor in context.path[:-1]:
+            if isinstance(ancestor, ast.FuncDecl):
+                self.report(context, node, "nested function")
+
+class Counter(lint.Rule):
+    classes = (ast.Node,)
+
+    def __init__(self):
+        lint.Rule.__init__(self)
+        self.classes_seen = []
+
+    def check(self, node, context):
+        assert context.path[-1] is node
+        self.classes_seen.append(node.__class__)
+
+def test_lint():
+    program = Parser(tracking=True).parse(INPUT)
+    counter = Counter()
+    linter = lint.Linter([NoEval(), NoWith(), NestedFunction(), counter])
+    diagnostics = linter.lint(program)
+
+    assert [(d.rule, d.message) for d in diagnostics] == [
+        ('NoEval', "eval() is not allowed"),
+        ('no-with', "with is not allowed"),
+        ('NestedFunction', "nested function"),
+        ('NoEval', "eval() is not allowed")]
+    assert INPUT[diagnostics[0].lexpos:].startswith('eval(code)')
+    assert counter.classes_seen == [
+        node.__class__ for node in ast.walk(program)]
+
+    # The dispatch table is reused, the diagnostics are per run
+    assert len(linter.lint(program)) == 4
+
+def test_lint_subclasses():
+    # LazyFuncDecl nodes are checked by rules for FuncDecl
+    program = Parser(lazy_functions=True).parse(INPUT)
+    diagnostics = lint.Linter([NestedFunction(), NoEval()]).lint(program)
+
+    assert [d.rule for d in diagnostics] == [
+        'NoEval', 'NestedFunction', 'NoEval']
+    assert isinstance(diagnostics[1].node, ast.LazyFuncDecl)
+
+def test_lint_do_while():
+    program = Parser().parse("do { eval(a); } while (eval(b));")
+    diagnostics = lint.Linter([NoEval()]).lint(program)
+    # The condition is checked before the body, like ast.walk()
+    assert [d.node.arguments[0].name for d in diagnostics] == ['b', 'a']
+
+def test_invalid_rules():
+    class NoCheck(lint.Rule):
+        classes = (ast.FuncCall,)
+
+    class NoClasses(lint.Rule):
+        def check(self, node, context):
+            pass
+
+    # A check set on the instance is fine
+    rule = NoCheck()
+    rule.check = lambda node, context: None
+    lint.Linter([rule])
+
+    for rule, error in ((NoCheck(), TypeError), (NoClasses(), ValueError)):
+        try:
+            lint.Linter([NoEval(), rule])
+        except error, e:
+            assert rule.name in str(e)
+        else:
+            assert False, "%s not raised for %s" % (error.__name__, rule.name)
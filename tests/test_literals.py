@@ -1,3 +1,6 @@
+# -*- coding: utf-8 -*-
+from pyjsparser import ast
+from pyjsparser.lexer import LexerError
 from pyjsparser.parser import Parser
 
 def test_comments():
@@ -64,6 +67,30 @@ def test_string():
     program = parser.parse(input)
 
 
+def test_string_escapes():
+    input = r"""
+    "<\/script>";
+    '\0\x41\u0041\$';
+    """
+    parser = Parser()
+    program = parser.parse(input)
+
+    assert program.statements[0][0].data == r'"<\/script>"'
+
+
+def test_unterminated_string():
+    input = r"""
+    var foo = "\x41\x41\x41\x41\x41\x41\x41\x41\x41\x41\x41\x41;
+    """
+    parser = Parser()
+    try:
+        parser.parse(input)
+    except TypeError:
+        pass
+    else:
+        assert False, "Unterminated string was accepted"
+
+
 def test_regex():
     input = """
     /foo/ai;
@@ -73,6 +100,63 @@ def test_regex():
     """
     parser = Parser()
     program = parser.parse(input)
+
+
+def test_regex_value():
+    input = r"""
+    foo = /a[/\]]b\/c/gi;
+    """
+    parser = Parser()
+    program = parser.parse(input)
+
+    regex = program.statements[0][0].expr
+    assert isinstance(regex, ast.RegEx)
+    assert regex.pattern == r'a[/\]]b\/c'
+    assert regex.flags == 'gi'
+
+
+def test_regex_or_division():
+    input = r"""
+    a = (b) / 2 / c;
+    a = b[0] / 2 / c;
+    a /= 2 / c;
+    a = typeof /x/;
+    if (/^[a-z]+$/.test(a)) {}
+    """
+    parser = Parser()
+    program = parser.parse(input)
+
+    for statement in program.statements[:2]:
+        division = statement[0].expr
+        assert isinstance(division, ast.BinOp)
+        assert isinstance(division.left, ast.BinOp)
+        assert division.operator == division.left.operator == '/'
+
+    assert program.statements[2][0].operator == '/='
+    assert isinstance(program.statements[3][0].expr.value, ast.RegEx)
+
+
+def test_division_after_brace():
+    input = r"""
+    x = {} / 2;
+    var f = function(){} / 2;
+    """
+    parser = Parser()
+    program = parser.parse(input)
+
+    division = program.statements[0][0].expr
+    assert isinstance(division, ast.BinOp)
+    assert division.operator == '/'
+    assert isinstance(division.left, ast.Object)
+    assert isinstance(program.statements[1][0].expr, ast.BinOp)
+
+    # Elsewhere a '/' which doesn't start a regex is still an error
+    try:
+        parser.parse("x = (/[a) / 2;")
+    except LexerError, e:
+        assert e.msg.startswith("Unterminated regular expression")
+    else:
+        assert False, "LexerError not raised"
     
 
 def test_object():
@@ -96,4 +180,55 @@ def test_array():
     """
     parser = Parser()
     program = parser.parse(input)
-    
\ No newline at end of file
+    
+def test_string_value():
+    input = r"""
+        "plain";
+        'it\'s';
+        "tab\there\nnew \x41é \101\0 \q";
+        "café";
+    """
+    parser = Parser()
+    program = parser.parse(input)
+    plain, quoted, escaped, accented = [
+        statement[0] for statement in program.statements]
+
+    assert plain.value == 'plain'
+    assert accented.value == u'caf\xe9'
+    assert type(plain.value) is type(accented.value) is unicode
+    assert quoted.value == "it's"
+    assert escaped.value == u'tab\there\nnew A\xe9 A\x00 q'
+    assert escaped.value is escaped.value
+
+def test_decode_strings():
+    input = r"""
+        var messages = {'greeting': "hello", 'farewell': "bye\x21"};
+    """
+    parser = Parser()
+    program = parser.parse(input)
+    assert ast.decode_strings(program) == [
+        'greeting', 'hello', 'farewell', 'bye!']
+
+def test_number_value():
+    input = r"""
+        [42, 2.5, .5, 2., 1E3, 1e-2, 2.5e+1, 0x1F, 0XfF, 010, 09, 0,
+         9007199254740993, 0x20000000000001];
+    """
+    parser = Parser()
+    program = parser.parse(input)
+    numbers = program.statements[0][0].items
+    values = [number.numeric for number in numbers]
+
+    assert values == [42, 2.5, 0.5, 2.0, 1000.0, 0.01, 25.0, 31, 255, 8, 9,
+                      0, 9007199254740992.0, 9007199254740992.0]
+    assert [type(value) for value in values[:4]] == [int, float, float, float]
+    assert isinstance(values[-1], float)
+
+def test_decode_numbers():
+    parser = Parser()
+    program = parser.parse("var table = [0, 1, 22, 333, 4444];")
+    assert ast.decode_numbers(program) == [0, 1, 22, 333, 4444]
+
+    program = parser.parse("var table = [0, 0x10, 1.5, 010];")
+    assert ast.decode_numbers(program) == [0, 16, 1.5, 8]
+    assert program.statements[0][0].expr.items[1].numeric == 16
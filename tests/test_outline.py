@@ -0,0 +1,115 @@
+from pyjsparser import ast, outline
+from pyjsparser.outliner import FUNCTION, VARIABLE, PROPERTY
+from pyjsparser.parser import Parser
+
+INPUT = r"""
+/**
+ * Module
+ */
+var module = (function(global) {
+    var cache = {}, count = 0, name = "module"
+    var re = /[{]/g, s = '}'
+
+    function lookup(key, fallback) {
+        if (key in cache && cache[key] !== null) {
+            return cache[key];
+        } else if (typeof fallback == 'function') {
+            return fallback.call(this, key);
+        }
+        return fallback || false;
+    }
+
+    for (var i = 0; i < 10; i++) {
+        count += i * 2 / (i + 1) % 3;
+    }
+    for (var key in cache) {
+        label: {
+            break label;
+        }
+    }
+    switch (name.length) {
+        case 1: {
+            break;
+        }
+        default:
+            count++;
+    }
+
+    return {
+        lookup: lookup,
+        'size': function size() { return count; },
+        3: count ? {nested: 1} : {other: [1, {deep: 2}]},
+        name: name
+    };
+})(this);
+"""
+
+def flatten(entries):
+    for entry in entries:
+        yield entry
+        for child in flatten(entry.children):
+            yield child
+
+def test_outline():
+    entries = outline(INPUT)
+    assert [entry.kind for entry in entries] == [VARIABLE]
+
+    module = entries[0]
+    assert module.name == 'module'
+    assert INPUT[module.lexpos:module.endlexpos].endswith('})(this)')
+
+    function = module.children[0]
+    assert function.kind == FUNCTION and function.name is None
+    assert [(entry.kind, entry.name) for entry in function.children] == [
+        (VARIABLE, 'cache'), (VARIABLE, 'count'), (VARIABLE, 'name'),
+        (VARIABLE, 're'), (VARIABLE, 's'), (FUNCTION, 'lookup'),
+        (VARIABLE, 'i'), (VARIABLE, 'key'), (PROPERTY, 'lookup'),
+        (PROPERTY, "'size'"), (PROPERTY, '3'), (PROPERTY, 'name')]
+    assert INPUT[function.children[2].lexpos:
+                 function.children[2].endlexpos] == 'name = "module"'
+    assert INPUT[function.children[4].lexpos:
+                 function.children[4].endlexpos] == "s = '}'"
+
+    for entry in flatten(entries):
+        for child in entry.children:
+            assert entry.lexpos <= child.lexpos
+            assert child.endlexpos <= entry.endlexpos
+
+def test_outline_matches_ast():
+    program = Parser(tracking=True).parse(INPUT)
+    entries = list(flatten(outline(INPUT)))
+
+    functions = [(node.node and node.node.name, node.lexpos, node.endlexpos)
+                 for node in ast.walk(program)
+                 if isinstance(node, ast.FuncDecl)]
+    assert [(entry.name, entry.lexpos, entry.endlexpos)
+            for entry in entries if entry.kind == FUNCTION] == functions
+
+    assigns = set()
+    for node in ast.walk(program):
+        if isinstance(node, ast.Object):
+            assigns.update(id(assign) for assign in node.properties)
+    properties = []
+    for node in ast.walk(program):
+        if id(node) in assigns:
+            name = getattr(node.node, 'name', None) or \
+                getattr(node.node, 'data', None) or node.node.value
+            properties.append((name, node.lexpos, node.endlexpos))
+    assert [(entry.name, entry.lexpos, entry.endlexpos)
+            for entry in entries if entry.kind == PROPERTY] == properties
+
+    variables = []
+    for node in ast.walk(program):
+        if isinstance(node, ast.VariableDeclaration):
+            identifier = node.node
+            if isinstance(identifier, tuple):
+                identifier = identifier[0]
+            variables.append((identifier.name, identifier.lexpos))
+    assert [(entry.name, entry.lexpos)
+            for entry in entries if entry.kind == VARIABLE] == variables
+
+def test_outline_increment_on_next_line():
+    # An automatic semicolon ends the variable before the ++ or --
+    for source in ("var q = x\n++y", "var q = x\n--y"):
+        entry, = outline(source)
+        assert source[entry.lexpos:entry.endlexpos] == 'q = x'
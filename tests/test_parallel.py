@@ -0,0 +1,59 @@
+from pyjsparser import ast, parallel
+from pyjsparser.lexer import LexerError
+from pyjsparser.parser import Parser
+
+INPUT = """
+var foo = 1;
+if (foo) bar(); else baz();
+do foo++; while (foo < 10);
+function qux(a) { return a; }
+for (var i = 0; i < 10; i++) { foo += /;/.test(i) ? 1 : 2; }
+foo = "a;b";
+qux(foo);
+"""
+
+def dump(program):
+    return [(repr(node), node.lexpos, node.endlexpos)
+            for statement in ast.iter_child_nodes(program)
+            for node in ast.walk(statement)]
+
+def test_split_statements():
+    offsets = parallel.split_statements(INPUT, 1)
+
+    assert offsets[0] == 0
+    assert offsets[-1] == len(INPUT)
+    chunks = [INPUT[start:end] for start, end in zip(offsets, offsets[1:])]
+    assert chunks[1] == '\nif (foo) bar(); else baz();'
+    assert chunks[2] == '\ndo foo++; while (foo < 10);'
+    assert chunks[3] == ('\nfunction qux(a) { return a; }\n'
+                         'for (var i = 0; i < 10; i++) '
+                         '{ foo += /;/.test(i) ? 1 : 2; }\nfoo = "a;b";')
+
+def test_parallel_parse():
+    expected = Parser(tracking=True).parse(INPUT)
+    for processes in (1, 2):
+        program = parallel.parse(INPUT, processes=processes, tracking=True,
+                                 chunks_per_process=3)
+        assert dump(program) == dump(expected)
+
+def test_parallel_syntax_error():
+    input = INPUT + "\nvar = 1;\nfoo();"
+    try:
+        parallel.parse(input, processes=2)
+    except SyntaxError, e:
+        assert e.lineno == 10
+        assert input[e.lexpos] == '='
+    else:
+        assert False, "SyntaxError not raised"
+
+def test_parallel_lexer_error():
+    input = INPUT + "\nfoo();\nbar(#);\nfoo();"
+    expected = Parser().validate(input)
+    for processes in (1, 2):
+        try:
+            parallel.parse(input, processes=processes, chunks_per_process=3)
+        except LexerError, e:
+            assert (e.lineno, e.lexpos, str(e)) == expected[0]
+            assert input[e.lexpos] == '#'
+        else:
+            assert False, "LexerError not raised"
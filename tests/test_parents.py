@@ -0,0 +1,78 @@
+import gc
+import weakref
+
+from pyjsparser import ast
+from pyjsparser.parser import Parser
+
+INPUT = """
+function outer(a) {
+    var inner = function () { return f(a); };
+    g(inner);
+}
+h();
+"""
+
+def calls(program):
+    return dict((node.node.name, node) for node in ast.walk(program)
+                if isinstance(node, ast.FuncCall))
+
+def test_parent_map():
+    program = Parser().parse(INPUT)
+    parents = ast.ParentMap(program)
+    found = calls(program)
+
+    assert len(parents) == len(list(ast.walk(program)))
+    assert program in parents
+    assert parents.parent(program) is None
+    for node in ast.walk(program):
+        for child in ast.iter_child_nodes(node):
+            assert parents.parent(child) is node
+
+    ancestors = list(parents.ancestors(found['f']))
+    assert ancestors[-1] is program
+    assert isinstance(ancestors[0], ast.Return)
+    assert list(parents.ancestors(program)) == []
+
+def test_enclosing():
+    program = Parser().parse(INPUT)
+    parents = ast.ParentMap(program)
+    found = calls(program)
+    outer = program.statements[0]
+
+    assert parents.enclosing(found['g'], ast.FuncDecl) is outer
+    inner = parents.enclosing(found['f'], ast.FuncDecl)
+    assert inner is not outer
+    assert parents.enclosing(inner, ast.FuncDecl) is outer
+    assert parents.enclosing(found['h'], ast.FuncDecl) is None
+    assert parents.enclosing(found['h'], ast.Program) is program
+
+def test_lazy_functions():
+    program = Parser(lazy_functions=True).parse(INPUT)
+    parents = ast.ParentMap(program)
+    outer = program.statements[0]
+
+    assert isinstance(outer, ast.LazyFuncDecl)
+    assert parents.enclosing(calls(program)['g'], ast.FuncDecl) is outer
+
+def test_unknown_node():
+    parents = ast.ParentMap(Parser().parse(INPUT))
+    other = Parser().parse(INPUT)
+
+    assert other not in parents
+    try:
+        parents.parent(other)
+    except KeyError:
+        pass
+    else:
+        assert False, "KeyError not raised"
+
+def test_no_cycles():
+    program = Parser().parse(INPUT)
+    parents = ast.ParentMap(program)
+    refs = [weakref.ref(node) for node in ast.walk(program)]
+    gc.disable()
+    try:
+        del program, parents, node
+        assert [ref for ref in refs if ref() is not None] == []
+    finally:
+        gc.enable()
@@ -0,0 +1,105 @@
+from pyjsparser import ast, query
+from pyjsparser.parser import Parser
+
+INPUT = """
+window.eval(code);
+eval(other);
+function run(a) {
+    var f = function () { return a.eval(1); };
+    do { f(); } while (check(f));
+}
+x.y.eval = 1;
+onload = function () { document.write("<b>"); };
+"""
+
+def names(nodes):
+    result = []
+    for node in nodes:
+        if isinstance(node, (ast.FuncCall, ast.FuncDecl)):
+            node = node.node
+        if isinstance(node, ast.PropertyAccessor):
+            node = node.element
+        result.append(getattr(node, 'name', None))
+    return result
+
+def check(selector, expected):
+    for parser in (Parser(), Parser(index=True),
+                   Parser(lazy_functions=True)):
+        program = parser.parse(INPUT)
+        found = query.select(program, selector)
+        assert sorted(names(found)) == sorted(expected), (selector, parser)
+        compiled = query.compile(selector)
+        assert map(id, compiled.select(program)) == map(id, found)
+        # The same nodes as matching every node with its ancestors
+        parents = ast.ParentMap(program)
+        matched = [node for node in ast.walk(program) if compiled.match(
+            node, reversed(list(parents.ancestors(node))))]
+        assert sorted(map(id, matched)) == sorted(map(id, found))
+
+def test_type():
+    check('FuncCall', ['eval', 'eval', 'eval', 'f', 'check', 'write'])
+    check('DotAccessor', ['eval', 'eval', 'eval', 'y', 'write'])
+    check('PropertyAccessor', ['eval', 'eval', 'eval', 'y', 'write'])
+    check('Switch', [])
+    assert len(query.select(Parser().parse(INPUT), '*')) == \
+           len(list(ast.walk(Parser().parse(INPUT))))
+
+def test_attributes():
+    check('FuncCall[node.element.name=eval]', ['eval', 'eval'])
+    check('FuncCall[node.name="eval"]', ['eval'])
+    check('FuncCall[node.name!="eval"]', ['f', 'check'])
+    check('Identifier[name=/^(ch|d)/]', ['check', 'document'])
+    check('Identifier[name=/^CH/i]', ['check'])
+    check('FuncDecl[node]', ['run'])
+    check('Number[value=1]', [None, None])
+    check("String[value='<b>']", [None])
+
+def test_combinators():
+    check('FuncDecl FuncCall', ['eval', 'f', 'check', 'write'])
+    check('FuncDecl > DoWhile FuncCall', ['f', 'check'])
+    check('FuncDecl FuncDecl FuncCall', ['eval'])
+    check('Program > FuncDecl', ['run'])
+    check('FuncCall > Identifier', ['code', 'eval', 'other', 'f', 'check', 'f'])
+    check('Assign > FuncDecl FuncCall DotAccessor', ['write'])
+
+def test_has():
+    check('FuncDecl:has(FuncCall[node.element.name=eval])', [None, 'run'])
+    check('FuncDecl:has(FuncDecl FuncCall)', ['run'])
+    check('FuncDecl:has(> Return)', [None])
+    check('FuncDecl:has(> DoWhile FuncCall)', ['run'])
+    check('DoWhile:has(> FuncCall)', [None])
+    check('*:has(String)', [None, None, None, 'write'])
+    check('DoWhile:has(FuncCall > Identifier[name=f])', [None])
+
+def test_errors():
+    for selector in ('', 'Foo', 'FuncCall[', 'FuncCall[name=]',
+                     'FuncCall:not(Foo)', 'FuncCall >', 'FuncCall)',
+                     'FuncCall[name!=/x/]', 'FuncCall ; x'):
+        try:
+            query.compile(selector)
+        except query.SelectorError, e:
+            assert e.selector == selector
+        else:
+            assert False, "SelectorError not raised for %r" % selector
+
+def test_cache_bounded():
+    program = Parser().parse(INPUT)
+    for count in xrange(query._MAXCACHE * 3):
+        query.select(program, 'Identifier[name=v%d]' % count)
+        assert len(query._cache) <= query._MAXCACHE
+    assert names(query.select(program, 'Identifier[name=f]')) == \
+        ['f', 'f', 'f']
+
+def test_deep_nesting():
+    input = "function f() {\n" * 30 + "with (a) { x; }\n" + "}\n" * 30
+    program = Parser().parse(input)
+    parents = ast.ParentMap(program)
+    for count in xrange(1, 5):
+        selector = 'FuncDecl ' * count + 'Identifier'
+        expected = [node for node in ast.walk(program)
+                    if isinstance(node, ast.Identifier) and
+                    len([ancestor for ancestor in parents.ancestors(node)
+                         if isinstance(ancestor, ast.FuncDecl)]) >= count]
+        assert map(id, query.select(program, selector)) == map(id, expected)
+        # Fails for every node, the With isn't above the functions
+        assert query.select(program, 'With ' + selector) == []
@@ -0,0 +1,48 @@
+import threading
+
+from pyjsparser import ast
+from pyjsparser.parser import Parser
+
+INPUTS = [
+    "var foo = [1, 2, 3];\nfunction bar(a) { return a + foo[0]; }",
+    "for (var i = 0; i < 10; i++) { foo += /;/.test(i) ? 1 : 2; }",
+    "var baz = {a: function (b) { return b; }, 'c': \"d\"};\nbaz.a(1);",
+    "switch (x) { case 1: y(); break; default: z = x / 2; }",
+]
+
+def dump(program):
+    return [repr(node) for node in ast.walk(program)]
+
+def test_instances_share_tables():
+    attributes = dict(vars(Parser))
+    first, second = Parser(), Parser(tracking=True)
+
+    # Creating a parser doesn't change the class
+    assert dict(vars(Parser)) == attributes
+    assert first.yacc.action is second.yacc.action
+    assert first.yacc.productions is not second.yacc.productions
+    assert first.lexer.lexer.lexre is not second.lexer.lexer.lexre
+
+def test_concurrent_parsers():
+    expected = [dump(Parser().parse(input)) for input in INPUTS]
+    start = threading.Event()
+    errors = []
+
+    def work(offset):
+        try:
+            start.wait()
+            parser = Parser(tracking=offset % 2 == 0)
+            for i in range(20):
+                index = (offset + i) % len(INPUTS)
+                assert dump(parser.parse(INPUTS[index])) == expected[index]
+        except Exception, e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(offset,))
+               for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    start.set()
+    for thread in threads:
+        thread.join()
+    assert errors == []
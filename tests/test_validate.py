@@ -0,0 +1,66 @@
+from pyjsparser.lexer import LexerError
+from pyjsparser.parser import Parser
+
+def test_validate():
+    input = """
+    function foo(bar) {
+        return bar / 2;
+    }
+    var p = foo(/re/g)
+    """
+    parser = Parser()
+    assert parser.validate(input) == []
+
+def test_validate_syntax_error():
+    input = """
+    var p = 100;
+    var = 100;
+    """
+    parser = Parser()
+    errors = parser.validate(input)
+
+    assert len(errors) == 1
+    lineno, lexpos, message = errors[0]
+    assert lineno == 3
+    assert input[lexpos] == '='
+    assert 'unexpected' in message
+
+def test_validate_lexer_error():
+    input = """
+    var p = "unterminated;
+    """
+    parser = Parser()
+    errors = parser.validate(input)
+
+    assert len(errors) == 1
+    assert errors[0][0] == 2
+    assert input[errors[0][1]] == '"'
+
+def test_parse_after_validate():
+    parser = Parser()
+    assert parser.validate("foo(;") != []
+
+    program = parser.parse("foo();")
+    assert len(program.statements) == 1
+
+def test_validate_end_of_input():
+    input = "foo(\n    bar"
+    parser = Parser()
+    errors = parser.validate(input)
+
+    assert len(errors) == 1
+    lineno, lexpos, message = errors[0]
+    assert (lineno, lexpos) == (2, len(input))
+
+def test_validate_internal_error():
+    parser = Parser()
+    parser.validate("foo();")
+    def action(p):
+        raise TypeError("internal")
+    parser._validator = parser._copy_yacc(lambda original: action)
+    try:
+        parser.validate("foo();")
+    except TypeError, e:
+        assert not isinstance(e, LexerError)
+    else:
+        assert False, "TypeError not raised"